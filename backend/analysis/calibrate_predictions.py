@@ -1,15 +1,11 @@
-import os
-import psycopg2
 import pandas as pd
 from dotenv import load_dotenv
 
 load_dotenv("backend/.env")
 
-def get_conn():
-    return psycopg2.connect(os.getenv("DATABASE_URL"))
+from backend.db.connection import get_read_connection
 
 def main():
-    conn = get_conn()
 
     query = """
     SELECT
@@ -23,8 +19,9 @@ def main():
     ORDER BY p.date;
     """
 
-    df = pd.read_sql(query, conn)
-    conn.close()
+    # Analysis tolerates replica lag, so it stays off the primary
+    with get_read_connection() as conn:
+        df = pd.read_sql(query, conn)
 
     if df.empty:
         print("No overlapping prediction + mood label days.")
@@ -0,0 +1,62 @@
+"""
+Columnar (format=columns) responses for long date ranges.
+
+Instead of one object per day, each field is an array over the whole
+range, index i being start + i days, with status codes STATUS_AVAILABLE /
+STATUS_MISSING. Arrays are filled straight from the query rows and
+encoded with orjson, so no per-day Pydantic models are built or
+validated. Bodies are cached as encoded bytes.
+"""
+
+from datetime import date, timedelta
+from typing import Literal
+
+import orjson
+from fastapi import Response
+
+ResponseFormat = Literal["days", "columns"]
+
+STATUS_MISSING = 0
+STATUS_AVAILABLE = 1
+
+
+def range_dates(start: date, end: date) -> list[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def scatter_rows(start: date, end: date, rows, fields: list[str]) -> dict[str, list]:
+    """
+    Parallel arrays over start..end from rows of (date, *fields): each row
+    lands at its day's offset, days without a row stay None / missing.
+    """
+    size = (end - start).days + 1
+    columns = {name: [None] * size for name in fields}
+    status = [STATUS_MISSING] * size
+    arrays = [columns[name] for name in fields]
+
+    for row in rows:
+        i = (row[0] - start).days
+        status[i] = STATUS_AVAILABLE
+        for j, array in enumerate(arrays, 1):
+            array[i] = row[j]
+
+    return {
+        "start": start,
+        "end": end,
+        "dates": range_dates(start, end),
+        **columns,
+        "status": status,
+    }
+
+
+def encode_columns(payload: dict) -> bytes:
+    return orjson.dumps(payload)
+
+
+def columnar_response(body: bytes, response: Response) -> Response:
+    """
+    Send an encoded body as is, keeping headers already set on the route's
+    response (ETag, Last-Modified); returning a Response bypasses them.
+    """
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return Response(content=body, media_type="application/json", headers=headers)
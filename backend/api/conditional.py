@@ -0,0 +1,102 @@
+"""
+Conditional GET support (ETag / Last-Modified) for range endpoints.
+
+Routes pass a version token, (row count, newest created_at) for the
+requested range, before building the body. When the client's cached copy
+is current they get a bodiless 304; otherwise the validators are set on
+the normal response.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(count: int, last_modified: Optional[datetime], variant: str = "") -> str:
+    """
+    Strong validator for version. variant names the representation (e.g.
+    the response format) so different bodies for the same data never share
+    an ETag.
+    """
+    stamp = last_modified.isoformat() if last_modified is not None else ""
+    digest = hashlib.blake2b(f"{variant}:{count}:{stamp}".encode(), digest_size=8).hexdigest()
+    return f'"{digest}"'
+
+
+def combine_versions(*versions: tuple) -> tuple:
+    """Version token for a response built from several ranges."""
+    count = sum(v[0] for v in versions)
+    stamps = [v[1] for v in versions if v[1] is not None]
+    return count, max(stamps) if stamps else None
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite timestamps are naive UTC; Postgres ones are aware
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return etag in tags
+
+
+def _not_modified_since(header: str, last_modified: Optional[datetime]) -> bool:
+    if last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    # HTTP dates have whole-second precision
+    return _as_utc(last_modified).replace(microsecond=0) <= since
+
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    version: tuple,
+    variant: str = "",
+) -> Optional[Response]:
+    """
+    Return a 304 response if the request's validators match version;
+    otherwise set ETag and Last-Modified on response and return None.
+    Routes with several representations pass the one requested as variant.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted
+    when the client sent no ETag.
+    """
+    count, last_modified = version
+    etag = make_etag(count, last_modified, variant)
+
+    headers = {
+        "ETag": etag,
+        # Let browsers keep the body but always revalidate it
+        "Cache-Control": "private, no-cache",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = if_modified_since is not None and _not_modified_since(
+            if_modified_since, last_modified
+        )
+
+    if fresh:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
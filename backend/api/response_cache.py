@@ -0,0 +1,240 @@
+"""
+Per-user cache of built responses and version tokens for the read endpoints.
+
+Entries are keyed by (user, route, params), expire after
+RESPONSE_CACHE_TTL_SECONDS and are evicted least-recently-used beyond
+RESPONSE_CACHE_MAX_ENTRIES. Concurrent misses on the same key share one
+load. A user's entries are dropped as soon as a commit changes their
+predictions or mood labels (see backend.storage.base.add_commit_listener).
+
+The cache is in-process: commits made by another process (e.g. a separate
+upload worker) only show up once the TTL expires.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from backend.storage.base import add_commit_listener
+
+# 0 disables caching
+CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+
+
+_MISSING = object()
+
+
+class _Flight:
+    """One in-progress load that identical misses wait on."""
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+    def settle(self, value: Any = None, error: Optional[BaseException] = None):
+        self.value = value
+        self.error = error
+        self.done.set()
+
+    def result(self) -> Any:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class _AsyncFlight:
+    """_Flight for async handlers: waiters await a future instead of blocking."""
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class ResponseCache:
+    """TTL + LRU cache with single-flight loads and per-user invalidation."""
+
+    def __init__(self, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._user_keys: dict[str, set[tuple]] = {}
+        # Bumped on invalidation so loads that started earlier are not stored
+        self._generations: dict[str, int] = {}
+        self._flights: dict[tuple, Any] = {}
+        self._stats: dict[str, dict[str, int]] = {}
+        self._evictions = 0
+        self._invalidations = 0
+
+    # ── lookups ───────────────────────────────
+
+    def get_or_load(self, user_id: str, route: str, params: Hashable, loader: Callable[[], Any]):
+        """
+        Return the cached value for (user_id, route, params), calling loader
+        on a miss. Concurrent misses on the same key wait for one loader.
+        """
+        if self.ttl <= 0:
+            return loader()
+
+        key = (user_id, route, params)
+        with self._lock:
+            hit, value = self._lookup(key)
+            if hit:
+                return value
+            flight = self._flights.get(key)
+            # A flight from an async handler cannot be waited on; load separately
+            leader = not isinstance(flight, _Flight)
+            if leader:
+                flight = _Flight(self._generations.get(user_id, 0))
+                self._flights[key] = flight
+            self._count(route, "misses" if leader else "coalesced")
+
+        if not leader:
+            return flight.result()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            self._land(key, flight)
+            flight.settle(error=e)
+            raise
+
+        self._land(key, flight, value)
+        flight.settle(value)
+        return value
+
+    async def aget_or_load(
+        self, user_id: str, route: str, params: Hashable, loader: Callable[[], Awaitable[Any]]
+    ):
+        """get_or_load for async handlers; waiters await instead of blocking."""
+        if self.ttl <= 0:
+            return await loader()
+
+        key = (user_id, route, params)
+        with self._lock:
+            hit, value = self._lookup(key)
+            if hit:
+                return value
+            flight = self._flights.get(key)
+            leader = not isinstance(flight, _AsyncFlight)
+            if leader:
+                flight = _AsyncFlight(self._generations.get(user_id, 0))
+                self._flights[key] = flight
+            self._count(route, "misses" if leader else "coalesced")
+
+        if not leader:
+            return await asyncio.shield(flight.future)
+
+        try:
+            value = await loader()
+        except BaseException as e:
+            self._land(key, flight)
+            flight.future.set_exception(e)
+            # Mark retrieved so a failure nobody awaited is not logged as lost
+            flight.future.exception()
+            raise
+
+        self._land(key, flight, value)
+        flight.future.set_result(value)
+        return value
+
+    def _lookup(self, key: tuple) -> tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+
+        expires, value = entry
+        if expires <= time.monotonic():
+            self._drop(key)
+            return False, None
+
+        self._entries.move_to_end(key)
+        self._count(key[1], "hits")
+        return True, value
+
+    def _land(self, key: tuple, flight, value: Any = _MISSING):
+        """
+        Finish a flight, storing value (if the load succeeded) unless the
+        user was invalidated while it ran.
+        """
+        user_id = key[0]
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if value is _MISSING or flight.generation != self._generations.get(user_id, 0):
+                return
+
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._user_keys.setdefault(user_id, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._evictions += 1
+
+    def _drop(self, key: tuple):
+        del self._entries[key]
+        keys = self._user_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[key[0]]
+
+    # ── invalidation ──────────────────────────
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+                for key in self._user_keys.pop(user_id, ()):
+                    del self._entries[key]
+                # Later misses must not join loads that may predate the write
+                for key in [k for k in self._flights if k[0] == user_id]:
+                    del self._flights[key]
+                self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self._flights.clear()
+
+    # ── metrics ───────────────────────────────
+
+    def _count(self, route: str, outcome: str):
+        counts = self._stats.setdefault(route, {"hits": 0, "misses": 0, "coalesced": 0})
+        counts[outcome] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {}
+            for route, counts in self._stats.items():
+                lookups = sum(counts.values())
+                routes[route] = {
+                    **counts,
+                    # Coalesced misses were served without a query, like hits
+                    "hit_ratio": round(
+                        (counts["hits"] + counts["coalesced"]) / lookups, 4
+                    ) if lookups else None,
+                }
+            return {
+                "ttl_seconds": self.ttl,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "routes": routes,
+            }
+
+
+response_cache = ResponseCache()
+add_commit_listener(response_cache.invalidate)
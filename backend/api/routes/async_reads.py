@@ -0,0 +1,185 @@
+"""
+async versions of the read endpoints (/today, /history, /history/summary,
+GET /mood, /dashboard), backed by the asyncpg pool. Enabled with
+DB_ASYNC_READS=1; see backend.main.
+
+Queries (from the Postgres repository), response building, replica
+routing, the response cache and conditional GETs are shared with the
+sync routes, so the two modes only differ in how they wait on Postgres.
+Authentication uses get_current_user_async, so requests with a cached
+token never touch the threadpool.
+"""
+from fastapi import APIRouter, Query, Depends, Request, Response
+from datetime import date
+
+from backend.db.async_pool import fetch, fetchrow, get_async_read_pool_for
+from backend.api.response_cache import response_cache
+from backend.api.conditional import check_not_modified, combine_versions
+from backend.api.columnar import ResponseFormat, columnar_response
+from backend.api.schemas import (
+    TodayResponse,
+    HistoryResponse,
+    MoodHistoryResponse,
+    DashboardResponse,
+    HistorySummaryResponse,
+)
+from backend.api.routes.today import build_today_response
+from backend.api.routes.history import (
+    Granularity,
+    build_history_columns,
+    build_history_response,
+    build_summary_response,
+    check_range,
+    rollup_window,
+)
+from backend.api.routes.mood import build_mood_columns, build_mood_history
+from backend.api.routes.dashboard import build_dashboard_response
+from backend.storage.postgres import (
+    DASHBOARD_SQL,
+    HISTORY_SQL,
+    MOOD_HISTORY_SQL,
+    MOODS_VERSION_SQL,
+    PREDICTIONS_VERSION_SQL,
+    ROLLUPS_SQL,
+    TODAY_SQL,
+)
+from backend.auth.supabase import get_current_user_async
+
+router = APIRouter()
+
+
+@router.get("/today", response_model=TodayResponse)
+async def get_today(user=Depends(get_current_user_async)):
+    today = date.today()
+    user_id = user["sub"]
+
+    async def load():
+        pool = await get_async_read_pool_for(user_id)
+        row = await fetchrow(TODAY_SQL, user_id, today, pool=pool)
+        return build_today_response(today, row)
+
+    return await response_cache.aget_or_load(user_id, "today", today, load)
+
+
+@router.get("/history", response_model=HistoryResponse)
+async def get_history(
+    request: Request,
+    response: Response,
+    start: date = Query(...),
+    end: date = Query(...),
+    format: ResponseFormat = Query("days"),
+    user=Depends(get_current_user_async),
+):
+    check_range(start, end)
+    user_id = user["sub"]
+
+    async def load_version():
+        pool = await get_async_read_pool_for(user_id)
+        return tuple(await fetchrow(PREDICTIONS_VERSION_SQL, user_id, start, end, pool=pool))
+
+    version = await response_cache.aget_or_load(
+        user_id, "history_version", (start, end), load_version
+    )
+    not_modified = check_not_modified(request, response, version, variant=format)
+    if not_modified is not None:
+        return not_modified
+
+    async def load():
+        pool = await get_async_read_pool_for(user_id)
+        rows = await fetch(HISTORY_SQL, user_id, start, end, pool=pool)
+        if format == "columns":
+            return build_history_columns(start, end, rows)
+        return build_history_response(start, end, rows)
+
+    body = await response_cache.aget_or_load(user_id, "history", (start, end, format), load)
+    if format == "columns":
+        return columnar_response(body, response)
+    return body
+
+
+@router.get("/history/summary", response_model=HistorySummaryResponse)
+async def get_history_summary(
+    start: date = Query(...),
+    end: date = Query(...),
+    granularity: Granularity = Query(...),
+    user=Depends(get_current_user_async),
+):
+    check_range(start, end)
+    user_id = user["sub"]
+
+    async def load():
+        first, last = rollup_window(granularity, start, end)
+        pool = await get_async_read_pool_for(user_id)
+        rows = await fetch(ROLLUPS_SQL, user_id, granularity, first, last, pool=pool)
+        return build_summary_response(granularity, start, end, rows)
+
+    return await response_cache.aget_or_load(
+        user_id, "history_summary", (start, end, granularity), load
+    )
+
+
+@router.get("/mood", response_model=MoodHistoryResponse)
+async def get_mood_history(
+    request: Request,
+    response: Response,
+    start: date = Query(...),
+    end: date = Query(...),
+    format: ResponseFormat = Query("days"),
+    user=Depends(get_current_user_async),
+):
+    check_range(start, end)
+    user_id = user["sub"]
+
+    async def load_version():
+        pool = await get_async_read_pool_for(user_id)
+        return tuple(await fetchrow(MOODS_VERSION_SQL, user_id, start, end, pool=pool))
+
+    version = await response_cache.aget_or_load(
+        user_id, "mood_version", (start, end), load_version
+    )
+    not_modified = check_not_modified(request, response, version, variant=format)
+    if not_modified is not None:
+        return not_modified
+
+    pool = await get_async_read_pool_for(user_id)
+    rows = await fetch(MOOD_HISTORY_SQL, user_id, start, end, pool=pool)
+    if format == "columns":
+        return columnar_response(build_mood_columns(start, end, rows), response)
+    return build_mood_history(start, end, rows)
+
+
+@router.get(
+    "/dashboard",
+    response_model=DashboardResponse,
+    response_model_exclude_none=True,
+)
+async def get_dashboard(
+    request: Request,
+    response: Response,
+    start: date = Query(...),
+    end: date = Query(...),
+    user=Depends(get_current_user_async),
+):
+    check_range(start, end)
+    user_id = user["sub"]
+
+    async def load_version():
+        pool = await get_async_read_pool_for(user_id)
+        return combine_versions(
+            tuple(await fetchrow(PREDICTIONS_VERSION_SQL, user_id, start, end, pool=pool)),
+            tuple(await fetchrow(MOODS_VERSION_SQL, user_id, start, end, pool=pool)),
+        )
+
+    version = await response_cache.aget_or_load(
+        user_id, "dashboard_version", (start, end), load_version
+    )
+    not_modified = check_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+
+    async def load():
+        pool = await get_async_read_pool_for(user_id)
+        rows = await fetch(DASHBOARD_SQL, start, end, user_id, user_id, pool=pool)
+        return build_dashboard_response(start, end, rows)
+
+    return await response_cache.aget_or_load(user_id, "dashboard", (start, end), load)
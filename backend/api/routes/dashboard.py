@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Query, Depends, Request, Response
+from datetime import date
+
+from backend.storage import use_read_repository
+from backend.api.response_cache import response_cache
+from backend.api.conditional import check_not_modified, combine_versions
+from backend.api.schemas import DashboardResponse, DashboardDay
+from backend.api.routes.history import check_range
+from backend.auth.supabase import get_current_user
+
+router = APIRouter()
+
+
+def build_dashboard_response(start: date, end: date, rows) -> DashboardResponse:
+    # Rows already cover every day of the range, in order
+    return DashboardResponse(
+        start=start,
+        end=end,
+        days=[
+            DashboardDay(
+                date=day,
+                predicted_mood=predicted_mood,
+                confidence=confidence,
+                explanation=explanation,
+                mood=mood,
+                note=note,
+            )
+            for day, predicted_mood, confidence, explanation, mood, note in rows
+        ],
+    )
+
+
+@router.get(
+    "/dashboard",
+    response_model=DashboardResponse,
+    response_model_exclude_none=True,
+)
+def get_dashboard(
+    request: Request,
+    response: Response,
+    start: date = Query(...),
+    end: date = Query(...),
+    user=Depends(get_current_user),
+):
+    """
+    Predictions and mood labels for a range in one response, replacing
+    separate /history and /mood calls. Empty fields are omitted: a day
+    with neither is just {"date": ...}.
+    """
+    check_range(start, end)
+    user_id = user["sub"]
+
+    def load_version():
+        with use_read_repository(user_id) as repo:
+            return combine_versions(
+                repo.fetch_predictions_version(user_id, start, end),
+                repo.fetch_moods_version(user_id, start, end),
+            )
+
+    version = response_cache.get_or_load(user_id, "dashboard_version", (start, end), load_version)
+    not_modified = check_not_modified(request, response, version)
+    if not_modified is not None:
+        return not_modified
+
+    def load():
+        with use_read_repository(user_id) as repo:
+            rows = repo.fetch_dashboard(user_id, start, end)
+        return build_dashboard_response(start, end, rows)
+
+    return response_cache.get_or_load(user_id, "dashboard", (start, end), load)
@@ -0,0 +1,91 @@
+import io
+import os
+import csv
+from datetime import date, datetime
+from typing import Iterable, Iterator, Literal
+
+import orjson
+from fastapi import APIRouter, Query, Depends
+from fastapi.responses import StreamingResponse
+
+from backend.storage import use_read_repository
+from backend.storage.base import EXPORT_COLUMNS
+from backend.auth.supabase import get_current_user
+
+router = APIRouter()
+
+# Rows fetched from the database (and encoded) per step of the stream
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def encode_ndjson(batches: Iterable[list[tuple]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield b"".join(
+            orjson.dumps(dict(zip(EXPORT_COLUMNS, row))) + b"\n" for row in batch
+        )
+
+
+def _csv_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, list):
+        return orjson.dumps(value).decode()
+    return value
+
+
+def encode_csv(batches: Iterable[list[tuple]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+
+    for batch in batches:
+        for row in batch:
+            writer.writerow([_csv_value(v) for v in row])
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+
+    # Header only, for a user with no data
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+ENCODERS = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+}
+
+
+def stream_export(user_id: str, format: ExportFormat) -> Iterator[bytes]:
+    # The connection is held until the last batch has been sent
+    with use_read_repository(user_id) as repo:
+        yield from ENCODERS[format](repo.export_batches(user_id, EXPORT_BATCH_SIZE))
+
+
+@router.get("/export")
+def export(
+    format: ExportFormat = Query("ndjson"),
+    user=Depends(get_current_user),
+):
+    """
+    Everything stored for the user, one row per day (raw metrics, features,
+    prediction and mood label; see EXPORT_TABLES), streamed in batches of
+    EXPORT_BATCH_SIZE so memory use does not grow with history length.
+    """
+    user_id = user["sub"]
+
+    return StreamingResponse(
+        stream_export(user_id, format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="export.{format}"',
+            "Cache-Control": "private, no-store",
+        },
+    )
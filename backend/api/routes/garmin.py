@@ -1,23 +1,84 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from typing import List
 from pathlib import Path
-import tempfile
-import zipfile
+import os
 import shutil
 import hashlib
+import uuid
 
 from backend.auth.supabase import get_current_user
+from backend.api.schemas import (
+    ChunkedUploadCreate,
+    ChunkedUploadResponse,
+    UploadCheckRequest,
+    UploadCheckResponse,
+    UploadJobResponse,
+)
 from backend.db.connection import get_db_connection
-from backend.garmin.orchestrator import process_garmin_upload
+from backend.storage import STORAGE_BACKEND, use_repository
+from backend.garmin.files import UPLOAD_DIR, copy_and_hash, extract_zip
+from backend.garmin.jobs import (
+    enqueue_assembled_upload,
+    enqueue_job,
+    get_job,
+    notify_workers,
+    track_uploads,
+)
+from backend.garmin.chunked_uploads import (
+    MAX_CHUNK_BYTES,
+    ChunkOffsetError,
+    create_upload,
+    get_upload,
+    mark_finalized,
+    running_sha256,
+    set_received_bytes,
+    write_chunk,
+)
 
-router = APIRouter(prefix="/garmin", tags=["garmin"])
+def require_postgres():
+    # Jobs and chunked uploads are stored in Postgres tables only
+    if STORAGE_BACKEND != "postgres":
+        raise HTTPException(
+            status_code=501,
+            detail=f"Garmin uploads need the postgres storage backend (STORAGE_BACKEND={STORAGE_BACKEND})",
+        )
+
+
+router = APIRouter(
+    prefix="/garmin",
+    tags=["garmin"],
+    dependencies=[Depends(require_postgres)],
+)
 
 # ─────────────────────────────────────────────
 # Helpers: file handling
 # ─────────────────────────────────────────────
 
-def extract_uploads(files: List[UploadFile], tmpdir: Path) -> list[Path]:
-    extracted: list[Path] = []
+def extract_uploads(
+    files: List[UploadFile],
+    tmpdir: Path,
+) -> tuple[list[tuple[Path, str]], list[tuple[Path, str, list[str]]]]:
+    """
+    Write uploaded JSON files (direct or inside ZIPs) to tmpdir.
+
+    Returns (path, sha256) pairs for the JSON files, and (path, sha256,
+    member hashes) for the ZIP archives themselves; hashes are computed
+    during the copy. Archive hashes let clients skip re-sending a whole
+    export (see /garmin/upload/check).
+    """
+    extracted: list[tuple[Path, str]] = []
+    archives: list[tuple[Path, str, list[str]]] = []
 
     for f in files:
         if not f.filename:
@@ -25,17 +86,15 @@ def extract_uploads(files: List[UploadFile], tmpdir: Path) -> list[Path]:
 
         if f.filename.endswith(".zip"):
             zip_path = tmpdir / f.filename
-            with open(zip_path, "wb") as out:
-                shutil.copyfileobj(f.file, out)
-
-            with zipfile.ZipFile(zip_path) as z:
-                z.extractall(tmpdir)
+            archive_hash = copy_and_hash(f.file, zip_path)
+            members = extract_zip(zip_path, tmpdir)
+            archives.append((zip_path, archive_hash, [fh for _, fh in members]))
+            extracted.extend(members)
+            zip_path.unlink()
 
         elif f.filename.endswith(".json"):
             path = tmpdir / f.filename
-            with open(path, "wb") as out:
-                shutil.copyfileobj(f.file, out)
-            extracted.append(path)
+            extracted.append((path, copy_and_hash(f.file, path)))
 
         else:
             raise HTTPException(
@@ -43,141 +102,321 @@ def extract_uploads(files: List[UploadFile], tmpdir: Path) -> list[Path]:
                 detail=f"Unsupported file type: {f.filename}",
             )
 
-    # Collect all JSON files (zip or direct)
-    extracted.extend(tmpdir.rglob("*.json"))
-    return extracted
-
-
-def hash_file(path: Path) -> str:
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            h.update(chunk)
-    return h.hexdigest()
+    return extracted, archives
 
 # ─────────────────────────────────────────────
-# Helpers: upload tracking / idempotency
+# Helpers: queueing
 # ─────────────────────────────────────────────
 
-def record_upload(user_id: str, filename: str, file_hash: str) -> bool:
+def queue_upload(
+    conn,
+    user_id: str,
+    job_id: str,
+    workdir: Path,
+    all_json: list[tuple[Path, str]],
+    archives: list[tuple[Path, str, list[str]]] = (),
+) -> list[tuple[Path, str]]:
     """
-    Insert upload record.
-    Returns True if inserted (new file), False if already exists.
+    Record uploads (JSON files and the archives they came from) and enqueue
+    a job for the JSON files not seen before. Returns those new files.
+    The caller commits.
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO garmin_uploads (
-                    user_id,
-                    filename,
-                    file_hash,
-                    status
-                )
-                VALUES (%s, %s, %s, 'processing')
-                ON CONFLICT (user_id, file_hash)
-                DO NOTHING;
-                """,
-                (user_id, filename, file_hash),
-            )
-            inserted = cur.rowcount == 1
-        conn.commit()
-        return inserted
-    finally:
-        conn.close()
+    if not all_json:
+        raise HTTPException(
+            status_code=400,
+            detail="No JSON files found in upload",
+        )
 
+    new_uploads = track_uploads(conn, user_id, all_json, archives)
+    if new_uploads:
+        enqueue_job(conn, job_id, user_id, workdir, new_uploads)
 
-def mark_upload_success(file_hash: str):
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                UPDATE garmin_uploads
-                SET status = 'success', error_message = NULL
-                WHERE file_hash = %s;
-                """,
-                (file_hash,),
-            )
-        conn.commit()
-    finally:
-        conn.close()
+    return new_uploads
 
 
-def mark_upload_failed(file_hash: str, error: str):
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                UPDATE garmin_uploads
-                SET status = 'failed', error_message = %s
-                WHERE file_hash = %s;
-                """,
-                (error, file_hash),
-            )
-        conn.commit()
-    finally:
-        conn.close()
+def queued_response(job_id: str, workdir: Path, new_uploads: list[tuple[Path, str]]):
+    if not new_uploads:
+        shutil.rmtree(workdir, ignore_errors=True)
+        return JSONResponse(
+            status_code=200,
+            content={
+                "job_id": None,
+                "days_ingested": 0,
+                "days_predicted": 0,
+                "message": "All files were already processed",
+            },
+        )
+
+    # Wake in-process workers; a standalone worker picks it up on its next poll
+    notify_workers()
+
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "files_queued": len(new_uploads),
+    }
 
 # ─────────────────────────────────────────────
-# Route
+# Routes
 # ─────────────────────────────────────────────
 
-@router.post("/upload")
+@router.post("/upload", status_code=202)
 def upload_garmin_files(
     files: List[UploadFile] = File(...),
     user=Depends(get_current_user),
 ):
+    """
+    Accept a Garmin upload and queue it for processing.
+    Returns 202 with a job id; poll GET /garmin/jobs/{job_id} for progress.
+    """
     user_id = user["sub"]
 
     if not files:
         raise HTTPException(status_code=400, detail="No files uploaded")
 
-    processed_files: list[Path] = []
-    file_hashes: list[str] = []
-
-    with tempfile.TemporaryDirectory() as tmp:
-        tmpdir = Path(tmp)
+    job_id = str(uuid.uuid4())
+    workdir = UPLOAD_DIR / job_id
+    workdir.mkdir(parents=True)
 
+    try:
         # 1️⃣ Extract uploads
-        all_json = extract_uploads(files, tmpdir)
-        if not all_json:
+        all_json, archives = extract_uploads(files, workdir)
+
+        # 2️⃣ Idempotency check + tracking, and the job, in one transaction
+        with get_db_connection() as conn:
+            new_uploads = queue_upload(
+                conn, user_id, job_id, workdir, all_json, archives
+            )
+            conn.commit()
+
+    except BaseException:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+
+    return queued_response(job_id, workdir, new_uploads)
+
+
+@router.post("/upload/check", response_model=UploadCheckResponse)
+def check_garmin_uploads(
+    body: UploadCheckRequest,
+    user=Depends(get_current_user),
+):
+    """
+    Tell the client which files (by SHA-256) still need uploading.
+    Files that previously failed count as unknown so they can be retried.
+    """
+    with use_repository() as repo:
+        known = repo.fetch_known_hashes(
+            user["sub"], [f.sha256 for f in body.files]
+        )
+
+    return UploadCheckResponse(
+        unknown=[f for f in body.files if f.sha256 not in known],
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=UploadJobResponse)
+def get_upload_job(
+    job_id: uuid.UUID,
+    user=Depends(get_current_user),
+):
+    with get_db_connection() as conn:
+        job = get_job(conn, user["sub"], str(job_id))
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return UploadJobResponse(
+        job_id=job["id"],
+        status=job["status"],
+        stage=job["stage"],
+        progress=job["progress"],
+        stage_timings=job["stage_timings"],
+        result=job["result"],
+        error=job["error_message"],
+        created_at=job["created_at"],
+        started_at=job["started_at"],
+        finished_at=job["finished_at"],
+    )
+
+
+# ─────────────────────────────────────────────
+# Routes: resumable chunked uploads
+#
+#   POST /garmin/uploads                       → upload_id
+#   PUT  /garmin/uploads/{id}/chunks?offset=N  (X-Chunk-SHA256 header)
+#   GET  /garmin/uploads/{id}                  → received_bytes, to resume
+#   POST /garmin/uploads/{id}/finalize         → 202 + job id
+#
+# The file is assembled in place under UPLOAD_DIR/<id>, which becomes the
+# job's working directory, so finalize does not copy it again. Uploads left
+# open for GARMIN_CHUNKED_UPLOAD_TTL_SECONDS are removed by the workers.
+# ─────────────────────────────────────────────
+
+def chunked_upload_response(upload_id: str, upload: dict) -> ChunkedUploadResponse:
+    return ChunkedUploadResponse(
+        upload_id=upload_id,
+        filename=upload["filename"],
+        total_size=upload["total_size"],
+        received_bytes=upload["received_bytes"],
+        status=upload["status"],
+        max_chunk_bytes=MAX_CHUNK_BYTES,
+    )
+
+
+def load_open_upload(conn, user_id: str, upload_id: str) -> dict:
+    upload = get_upload(conn, user_id, upload_id, for_update=True)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if upload["status"] != "open":
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+    return upload
+
+
+@router.post("/uploads", response_model=ChunkedUploadResponse, status_code=201)
+def create_chunked_upload(
+    body: ChunkedUploadCreate,
+    user=Depends(get_current_user),
+):
+    filename = body.filename
+    if Path(filename).name != filename or not filename.endswith((".zip", ".json")):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file name: {filename}",
+        )
+
+    upload_id = str(uuid.uuid4())
+    (UPLOAD_DIR / upload_id).mkdir(parents=True)
+
+    with get_db_connection() as conn:
+        create_upload(conn, upload_id, user["sub"], filename, body.total_size)
+        conn.commit()
+
+    return chunked_upload_response(
+        upload_id,
+        {
+            "filename": filename,
+            "total_size": body.total_size,
+            "received_bytes": 0,
+            "status": "open",
+        },
+    )
+
+
+@router.get("/uploads/{upload_id}", response_model=ChunkedUploadResponse)
+def get_chunked_upload(
+    upload_id: uuid.UUID,
+    user=Depends(get_current_user),
+):
+    with get_db_connection() as conn:
+        upload = get_upload(conn, user["sub"], str(upload_id))
+
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    return chunked_upload_response(str(upload_id), upload)
+
+
+def store_chunk(user_id: str, upload_id: str, offset: int, data: bytes) -> ChunkedUploadResponse:
+    with get_db_connection() as conn:
+        # Row lock serialises concurrent chunks for the same upload
+        upload = load_open_upload(conn, user_id, upload_id)
+
+        total_size = upload["total_size"]
+        if total_size is not None and offset + len(data) > total_size:
             raise HTTPException(
                 status_code=400,
-                detail="No JSON files found in upload",
+                detail="Chunk extends past the declared total_size",
             )
 
-        # 2️⃣ Idempotency check + tracking
-        for path in all_json:
-            fh = hash_file(path)
-            is_new = record_upload(user_id, path.name, fh)
-            if is_new:
-                processed_files.append(path)
-                file_hashes.append(fh)
+        path = UPLOAD_DIR / upload_id / upload["filename"]
+        try:
+            received = write_chunk(path, upload_id, upload["received_bytes"], offset, data)
+        except ChunkOffsetError as e:
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "message": "Chunk offset does not match received bytes",
+                    "received_bytes": e.received_bytes,
+                },
+            )
 
-        if not processed_files:
-            return {
-                "days_ingested": 0,
-                "days_predicted": 0,
-                "message": "All files were already processed",
-            }
+        set_received_bytes(conn, upload_id, received)
+        conn.commit()
 
-        try:
-            # 3️⃣ Orchestrate full pipeline
-            result = process_garmin_upload(
-                user_id=user_id,
-                files=processed_files,
+    upload["received_bytes"] = received
+    return chunked_upload_response(upload_id, upload)
+
+
+@router.put("/uploads/{upload_id}/chunks", response_model=ChunkedUploadResponse)
+async def put_upload_chunk(
+    upload_id: uuid.UUID,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    x_chunk_sha256: str = Header(...),
+    user=Depends(get_current_user),
+):
+    # Hash while receiving; reject oversized chunks before buffering them
+    h = hashlib.sha256()
+    parts: list[bytes] = []
+    size = 0
+
+    async for part in request.stream():
+        size += len(part)
+        if size > MAX_CHUNK_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Chunk larger than {MAX_CHUNK_BYTES} bytes",
+            )
+        h.update(part)
+        parts.append(part)
+
+    if h.hexdigest() != x_chunk_sha256.lower():
+        raise HTTPException(status_code=400, detail="Chunk checksum mismatch")
+
+    return await run_in_threadpool(
+        store_chunk, user["sub"], str(upload_id), offset, b"".join(parts)
+    )
+
+
+@router.post("/uploads/{upload_id}/finalize", status_code=202)
+def finalize_chunked_upload(
+    upload_id: uuid.UUID,
+    user=Depends(get_current_user),
+):
+    user_id = user["sub"]
+    upload_id = str(upload_id)
+    workdir = UPLOAD_DIR / upload_id
+
+    with get_db_connection() as conn:
+        upload = load_open_upload(conn, user_id, upload_id)
+
+        received = upload["received_bytes"]
+        if received == 0:
+            raise HTTPException(status_code=400, detail="Upload is empty")
+        if upload["total_size"] is not None and received != upload["total_size"]:
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "message": "Upload is incomplete",
+                    "received_bytes": received,
+                },
             )
 
-            # 4️⃣ Mark uploads successful
-            for fh in file_hashes:
-                mark_upload_success(fh)
+        # Drop bytes past received_bytes left by a chunk that never committed
+        path = workdir / upload["filename"]
+        os.truncate(path, received)
+
+        # Hashing, extraction and tracking happen in the job, so finalize
+        # returns quickly whatever the file size. The chunked upload id
+        # doubles as the job id.
+        enqueue_assembled_upload(
+            conn, upload_id, user_id, workdir, path, running_sha256(upload_id, received)
+        )
+        mark_finalized(conn, upload_id)
+        conn.commit()
 
-        except Exception as e:
-            for fh in file_hashes:
-                mark_upload_failed(fh, str(e))
-            raise
+    # Wake in-process workers; a standalone worker picks it up on its next poll
+    notify_workers()
 
-    return result
+    return {"job_id": upload_id, "status": "queued"}
@@ -1,44 +1,28 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
 from datetime import date, timedelta
+from typing import Literal, Optional
 
-from backend.db.connection import get_db_connection
-from backend.api.schemas import HistoryResponse, HistoryDay
+from backend.storage import use_read_repository
+from backend.storage.base import ROLLUP_FEATURES, period_end, period_start
+from backend.api.response_cache import response_cache
+from backend.api.conditional import check_not_modified
+from backend.api.columnar import (
+    ResponseFormat,
+    columnar_response,
+    encode_columns,
+    scatter_rows,
+)
+from backend.api.schemas import (
+    HistoryResponse,
+    HistoryDay,
+    HistorySummaryResponse,
+    SummaryPeriod,
+)
 from backend.auth.supabase import get_current_user
 
 router = APIRouter()
 
-@router.get("/history", response_model=HistoryResponse)
-def get_history(
-    start: date = Query(...),
-    end: date = Query(...),
-    user=Depends(get_current_user),
-):
-    if start > end:
-        raise HTTPException(
-            status_code=400,
-            detail="start date must be before end date",
-        )
-
-    user_id = user["sub"]
-
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        SELECT date, predicted_mood::float, confidence, explanation
-        FROM predictions
-        WHERE user_id = %s
-          AND date BETWEEN %s AND %s
-        ORDER BY date
-        """,
-        (user_id, start, end),
-    )
-
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-
+def build_history_response(start: date, end: date, rows) -> HistoryResponse:
     rows_by_date = {
         row[0]: (row[1], row[2], row[3]) for row in rows
     }
@@ -76,3 +60,147 @@ def get_history(
         end=end,
         days=days,
     )
+
+
+def build_history_columns(start: date, end: date, rows) -> bytes:
+    return encode_columns(
+        scatter_rows(start, end, rows, ["predicted_mood", "confidence", "explanation"])
+    )
+
+
+# Periods (the current one included) averaged into the rolling means
+ROLLING_PERIODS = 4
+
+Granularity = Literal["week", "month"]
+
+
+def rollup_window(granularity: str, start: date, end: date) -> tuple[date, date]:
+    """
+    period_start bounds of the rollup rows a summary of start..end needs:
+    the periods overlapping the range plus the ROLLING_PERIODS - 1 before.
+    """
+    first = period_start(granularity, start)
+    for _ in range(ROLLING_PERIODS - 1):
+        first = period_start(granularity, first - timedelta(days=1))
+    return first, end
+
+
+def _weighted_mean(pairs) -> Optional[float]:
+    days = sum(n for n, _ in pairs if n)
+    if not days:
+        return None
+    return sum(n * avg for n, avg in pairs if n) / days
+
+
+def build_summary_response(
+    granularity: str, start: date, end: date, rows
+) -> HistorySummaryResponse:
+    """
+    Rows are fetch_rollups rows over rollup_window(); only periods that
+    overlap start..end are returned, the earlier ones feed the rolling means.
+    """
+    first_shown = period_start(granularity, start)
+    periods = []
+
+    for i, row in enumerate(rows):
+        begins = row[0]
+        if begins < first_shown:
+            continue
+
+        window_start = rollup_window(granularity, begins, begins)[0]
+        window = [r for r in rows[: i + 1] if r[0] >= window_start]
+
+        periods.append(
+            SummaryPeriod(
+                period_start=begins,
+                period_end=period_end(granularity, begins),
+                predicted_days=row[1],
+                predicted_mood=row[2],
+                predicted_mood_rolling=_weighted_mean([(r[1], r[2]) for r in window]),
+                mood_days=row[3],
+                mood=row[4],
+                mood_rolling=_weighted_mean([(r[3], r[4]) for r in window]),
+                feature_days=row[5],
+                features=dict(zip(ROLLUP_FEATURES, row[6:])),
+            )
+        )
+
+    return HistorySummaryResponse(
+        start=start,
+        end=end,
+        granularity=granularity,
+        rolling_periods=ROLLING_PERIODS,
+        periods=periods,
+    )
+
+
+def check_range(start: date, end: date):
+    if start > end:
+        raise HTTPException(
+            status_code=400,
+            detail="start date must be before end date",
+        )
+
+
+@router.get("/history", response_model=HistoryResponse)
+def get_history(
+    request: Request,
+    response: Response,
+    start: date = Query(...),
+    end: date = Query(...),
+    format: ResponseFormat = Query("days"),
+    user=Depends(get_current_user),
+):
+    """
+    Predictions for each day of the range. format=columns returns parallel
+    arrays instead of day objects (see backend.api.columnar); cheaper for
+    ranges of years.
+    """
+    check_range(start, end)
+    user_id = user["sub"]
+
+    def load_version():
+        with use_read_repository(user_id) as repo:
+            return repo.fetch_predictions_version(user_id, start, end)
+
+    version = response_cache.get_or_load(user_id, "history_version", (start, end), load_version)
+    not_modified = check_not_modified(request, response, version, variant=format)
+    if not_modified is not None:
+        return not_modified
+
+    def load():
+        with use_read_repository(user_id) as repo:
+            rows = repo.fetch_predictions(user_id, start, end)
+        if format == "columns":
+            return build_history_columns(start, end, rows)
+        return build_history_response(start, end, rows)
+
+    body = response_cache.get_or_load(user_id, "history", (start, end, format), load)
+    if format == "columns":
+        return columnar_response(body, response)
+    return body
+
+
+@router.get("/history/summary", response_model=HistorySummaryResponse)
+def get_history_summary(
+    start: date = Query(...),
+    end: date = Query(...),
+    granularity: Granularity = Query(...),
+    user=Depends(get_current_user),
+):
+    """
+    Weekly or monthly averages and day counts of predicted mood, logged
+    mood and key features, read from the mood_rollups table.
+    """
+    check_range(start, end)
+    user_id = user["sub"]
+
+    def load():
+        first, last = rollup_window(granularity, start, end)
+        with use_read_repository(user_id) as repo:
+            rows = repo.fetch_rollups(user_id, granularity, first, last)
+        return build_summary_response(granularity, start, end, list(rows))
+
+    return response_cache.get_or_load(
+        user_id, "history_summary", (start, end, granularity), load
+    )
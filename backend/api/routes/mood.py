@@ -1,17 +1,36 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+import io
+import csv
+import logging
+
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response, UploadFile, File
 from datetime import date, timedelta
 
-from backend.db.connection import get_db_connection
+from backend.storage import use_read_repository, use_repository
 from backend.api.schemas import (
     MoodCreate,
     MoodResponse,
+    MoodBulkCreate,
+    MoodBulkResult,
+    MoodBulkResponse,
     MoodHistoryResponse,
     MoodDay,
+    MoodImportResponse,
+)
+from backend.api.routes.history import check_range
+from backend.api.response_cache import response_cache
+from backend.api.conditional import check_not_modified
+from backend.api.columnar import (
+    ResponseFormat,
+    columnar_response,
+    encode_columns,
+    scatter_rows,
 )
 from backend.auth.supabase import get_current_user
 
 router = APIRouter()
 
+logger = logging.getLogger("api.mood")
+
 @router.post("/mood", response_model=MoodResponse)
 def upsert_mood(
     mood: MoodCreate,
@@ -19,43 +38,16 @@ def upsert_mood(
 ):
     user_id = user["sub"]
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-
     try:
-        cur.execute(
-            """
-            INSERT INTO mood_labels (
-                user_id,
-                date,
-                mood,
-                note,
-                created_at
-            )
-            VALUES (%s, %s, %s, %s, NOW())
-            ON CONFLICT (user_id, date)
-            DO UPDATE SET
-                mood = EXCLUDED.mood,
-                note = EXCLUDED.note
-            RETURNING date, mood, note, created_at
-            """,
-            (user_id, mood.date, mood.mood, mood.note),
-        )
-
-        row = cur.fetchone()
-        conn.commit()
+        with use_repository() as repo:
+            row = repo.upsert_mood(user_id, mood.date, mood.mood, mood.note)
 
     except Exception as e:
-        conn.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to save mood label: {str(e)}",
         )
 
-    finally:
-        cur.close()
-        conn.close()
-
     return MoodResponse(
         date=row[0],
         mood=row[1],
@@ -64,39 +56,74 @@ def upsert_mood(
     )
 
 
-@router.get("/mood", response_model=MoodHistoryResponse)
-def get_mood_history(
-    start: date = Query(...),
-    end: date = Query(...),
+@router.post("/mood/bulk", response_model=MoodBulkResponse)
+def upsert_moods(
+    body: MoodBulkCreate,
     user=Depends(get_current_user),
 ):
-    if start > end:
+    """
+    Save a batch of check-ins (e.g. an offline client's backlog) in one
+    transaction. When a date repeats, the later entry wins and earlier
+    ones are reported as superseded.
+    """
+    user_id = user["sub"]
+
+    latest = {}
+    for index, entry in enumerate(body.entries):
+        latest[entry.date] = index
+    kept = sorted(latest.values())
+
+    try:
+        with use_repository() as repo:
+            rows = repo.upsert_moods(
+                user_id,
+                [(e.date, e.mood, e.note) for e in (body.entries[i] for i in kept)],
+            )
+
+    except Exception as e:
         raise HTTPException(
-            status_code=400,
-            detail="start date must be before end date",
+            status_code=500,
+            detail=f"Failed to save mood labels: {str(e)}",
         )
 
-    user_id = user["sub"]
+    stored = dict(zip(kept, rows))
+    results = []
+    for index, entry in enumerate(body.entries):
+        if index not in stored:
+            results.append(
+                MoodBulkResult(
+                    index=index,
+                    date=entry.date,
+                    mood=entry.mood,
+                    note=entry.note,
+                    created_at=None,
+                    status="superseded",
+                )
+            )
+            continue
+
+        day, mood, note, created_at, inserted = stored[index]
+        results.append(
+            MoodBulkResult(
+                index=index,
+                date=day,
+                mood=mood,
+                note=note,
+                created_at=created_at,
+                status="created" if inserted else "updated",
+            )
+        )
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        SELECT date, mood, note, created_at
-        FROM mood_labels
-        WHERE user_id = %s
-          AND date BETWEEN %s AND %s
-        ORDER BY date
-        """,
-        (user_id, start, end),
+    return MoodBulkResponse(
+        created=sum(r.status == "created" for r in results),
+        updated=sum(r.status == "updated" for r in results),
+        superseded=sum(r.status == "superseded" for r in results),
+        results=results,
     )
 
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
 
-    rows_by_date = {row[0]: row[1:] for row in rows}
+def build_mood_history(start: date, end: date, rows) -> MoodHistoryResponse:
+    rows_by_date = {row[0]: (row[1], row[2], row[3]) for row in rows}
 
     days = []
     current = start
@@ -131,3 +158,77 @@ def get_mood_history(
         end=end,
         days=days,
     )
+
+
+def build_mood_columns(start: date, end: date, rows) -> bytes:
+    return encode_columns(scatter_rows(start, end, rows, ["mood", "note", "created_at"]))
+
+
+@router.get("/mood", response_model=MoodHistoryResponse)
+def get_mood_history(
+    request: Request,
+    response: Response,
+    start: date = Query(...),
+    end: date = Query(...),
+    format: ResponseFormat = Query("days"),
+    user=Depends(get_current_user),
+):
+    """
+    Mood labels for each day of the range; format=columns as for /history.
+    """
+    check_range(start, end)
+    user_id = user["sub"]
+
+    def load_version():
+        with use_read_repository(user_id) as repo:
+            return repo.fetch_moods_version(user_id, start, end)
+
+    version = response_cache.get_or_load(user_id, "mood_version", (start, end), load_version)
+    not_modified = check_not_modified(request, response, version, variant=format)
+    if not_modified is not None:
+        return not_modified
+
+    with use_read_repository(user_id) as repo:
+        rows = repo.fetch_moods(user_id, start, end)
+
+    if format == "columns":
+        return columnar_response(build_mood_columns(start, end, rows), response)
+    return build_mood_history(start, end, rows)
+
+
+@router.post("/mood/import", response_model=MoodImportResponse)
+def import_mood_csv(
+    file: UploadFile = File(...),
+    user=Depends(get_current_user),
+):
+    """
+    Bulk-import mood labels from a CSV with columns date, mood[, note].
+    Rows are imported for the caller; invalid rows are reported, not fatal.
+    """
+    user_id = user["sub"]
+
+    try:
+        with use_repository() as repo:
+            text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+            report = repo.import_mood_labels(text, user_id=user_id)
+
+    # Nothing is committed unless the whole import succeeds
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Malformed CSV (e.g. a field over the csv module's size limit)
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CSV: {e}")
+
+    except Exception:
+        # Driver messages can quote the uploaded data; keep them in the log
+        logger.exception("Mood import failed")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to import mood labels",
+        )
+
+    return MoodImportResponse(**report)
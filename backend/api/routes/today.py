@@ -1,35 +1,14 @@
 from fastapi import APIRouter, Depends
 from datetime import date
 
-from backend.db.connection import get_db_connection
+from backend.storage import use_read_repository
+from backend.api.response_cache import response_cache
 from backend.api.schemas import TodayResponse
 from backend.auth.supabase import get_current_user
 
 router = APIRouter()
 
-@router.get("/today", response_model=TodayResponse)
-def get_today(user=Depends(get_current_user)):
-    today = date.today()
-    user_id = user["sub"]
-
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        SELECT predicted_mood, confidence, explanation, model_version
-        FROM predictions
-        WHERE user_id = %s
-          AND date = %s
-        LIMIT 1
-        """,
-        (user_id, today)
-    )
-
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-
+def build_today_response(today: date, row) -> TodayResponse:
     if row is None:
         return TodayResponse(
             date=today,
@@ -51,3 +30,16 @@ def get_today(user=Depends(get_current_user)):
         model_version=model_version,
         status="available",
     )
+
+
+@router.get("/today", response_model=TodayResponse)
+def get_today(user=Depends(get_current_user)):
+    today = date.today()
+    user_id = user["sub"]
+
+    def load():
+        with use_read_repository(user_id) as repo:
+            row = repo.fetch_prediction(user_id, today)
+        return build_today_response(today, row)
+
+    return response_cache.get_or_load(user_id, "today", today, load)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import date, datetime
 
 
@@ -40,6 +40,31 @@ class MoodResponse(BaseModel):
 
 
 
+# Largest batch POST /mood/bulk accepts
+MOOD_BULK_MAX_ENTRIES = 1000
+
+
+class MoodBulkCreate(BaseModel):
+    entries: List[MoodCreate] = Field(min_length=1, max_length=MOOD_BULK_MAX_ENTRIES)
+
+
+class MoodBulkResult(BaseModel):
+    # Position of the entry in the request
+    index: int
+    date: date
+    mood: int
+    note: Optional[str]
+    created_at: Optional[datetime]
+    status: str  # created | updated | superseded
+
+
+class MoodBulkResponse(BaseModel):
+    created: int
+    updated: int
+    superseded: int
+    results: List[MoodBulkResult]
+
+
 class MoodDay(BaseModel):
     date: date
     mood: Optional[int]
@@ -52,4 +77,94 @@ class MoodDay(BaseModel):
 class MoodHistoryResponse(BaseModel):
     start: date
     end: date
-    days: List[MoodDay]
\ No newline at end of file
+    days: List[MoodDay]
+
+
+class DashboardDay(BaseModel):
+    # Fields that are None are left out of the response (see /dashboard)
+    date: date
+    predicted_mood: Optional[float] = None
+    confidence: Optional[str] = None
+    explanation: Optional[List[str]] = None
+    mood: Optional[int] = None
+    note: Optional[str] = None
+
+
+class DashboardResponse(BaseModel):
+    start: date
+    end: date
+    days: List[DashboardDay]
+
+
+class SummaryPeriod(BaseModel):
+    period_start: date
+    period_end: date
+    predicted_days: int
+    predicted_mood: Optional[float]
+    # Day-weighted mean over this and the preceding periods (rolling_periods)
+    predicted_mood_rolling: Optional[float]
+    mood_days: int
+    mood: Optional[float]
+    mood_rolling: Optional[float]
+    feature_days: int
+    features: Dict[str, Optional[float]]
+
+
+class HistorySummaryResponse(BaseModel):
+    start: date
+    end: date
+    granularity: str
+    rolling_periods: int
+    periods: List[SummaryPeriod]
+
+
+class MoodImportError(BaseModel):
+    line: int
+    error: str
+
+
+class MoodImportResponse(BaseModel):
+    accepted: int
+    imported: int
+    rejected: int
+    errors: List[MoodImportError]
+
+
+class UploadJobResponse(BaseModel):
+    job_id: str
+    status: str
+    stage: Optional[str]
+    progress: float
+    stage_timings: Dict[str, float]
+    result: Optional[dict]
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+
+class ChunkedUploadCreate(BaseModel):
+    filename: str
+    total_size: Optional[int] = Field(default=None, ge=0)
+
+
+class ChunkedUploadResponse(BaseModel):
+    upload_id: str
+    filename: str
+    total_size: Optional[int]
+    received_bytes: int
+    status: str
+    max_chunk_bytes: int
+
+
+class UploadCheckFile(BaseModel):
+    filename: str
+    sha256: str = Field(pattern=r"^[0-9a-f]{64}$")
+
+
+class UploadCheckRequest(BaseModel):
+    files: List[UploadCheckFile]
+
+
+class UploadCheckResponse(BaseModel):
+    unknown: List[UploadCheckFile]
@@ -0,0 +1,184 @@
+import os
+import time
+import logging
+import threading
+from typing import Callable, Optional
+
+from jose import jwk
+from jose.backends.base import Key
+
+logger = logging.getLogger("auth.jwks")
+
+# The key set is refetched in the background this often
+JWKS_REFRESH_SECONDS = float(os.getenv("JWKS_REFRESH_SECONDS", "600"))
+
+# Fetches triggered by requests (unknown kid, no keys yet) start at most
+# this often, however many requests ask
+JWKS_MIN_REFRESH_SECONDS = float(os.getenv("JWKS_MIN_REFRESH_SECONDS", "30"))
+
+# Requests waiting on a fetch another request started give up after this
+JWKS_FETCH_WAIT_SECONDS = 10.0
+
+
+def build_keys(jwks: dict) -> dict[str, Key]:
+    """Key objects by kid, constructed once per fetched key set."""
+    return {
+        key["kid"]: jwk.construct(key)
+        for key in jwks.get("keys", [])
+        if "kid" in key
+    }
+
+
+class KeySet:
+    """
+    Signing keys from a JWKS endpoint, kept fresh off the request path.
+
+    A background thread refetches the set every refresh_interval; requests
+    keep using the keys they have meanwhile (stale-while-revalidate), and
+    a failed fetch leaves the previous set in place. Only two cases make a
+    request wait on a fetch: there are no keys yet, or its kid is unknown
+    (a rotation). Those fetches are coalesced, so concurrent requests share
+    one, and rate limited to one per min_refresh_interval, so a flood of
+    tokens with bogus kids costs at most that many outbound calls.
+
+    fetch returns the parsed JWKS document; pass a stand-in for tests.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], dict],
+        refresh_interval: float = JWKS_REFRESH_SECONDS,
+        min_refresh_interval: float = JWKS_MIN_REFRESH_SECONDS,
+    ):
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+
+        self._lock = threading.Lock()
+        self._keys: dict[str, Key] = {}
+        self._fetched_at: Optional[float] = None
+        self._attempted_at: Optional[float] = None
+        # Set when the fetch in progress finishes; None when idle
+        self._flight: Optional[threading.Event] = None
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"fetches": 0, "fetch_failures": 0, "rate_limited": 0}
+
+    # ── lookups ───────────────────────────────
+
+    def get(self, kid: Optional[str]) -> Optional[Key]:
+        """
+        The key for kid, or None if the key set does not have it even
+        after any refresh the rate limit allows.
+        """
+        with self._lock:
+            key = self._keys.get(kid)
+            stale = (
+                self._fetched_at is not None
+                and time.monotonic() - self._fetched_at > self.refresh_interval
+            )
+
+        if key is not None:
+            # No refresher running (e.g. scripts, tests); revalidate behind the request
+            if stale and not self._running():
+                self._refresh_in_background()
+            return key
+
+        if not self.refresh(rate_limited=True):
+            return None
+        with self._lock:
+            return self._keys.get(kid)
+
+    # ── fetching ──────────────────────────────
+
+    def refresh(self, rate_limited: bool = False) -> bool:
+        """
+        Fetch the key set, or wait for the fetch already in progress.
+        Returns False without fetching when rate_limited and the last
+        attempt was under min_refresh_interval ago.
+        """
+        now = time.monotonic()
+        with self._lock:
+            flight = self._flight
+            if flight is None:
+                recent = (
+                    self._attempted_at is not None
+                    and now - self._attempted_at < self.min_refresh_interval
+                )
+                if rate_limited and recent:
+                    self._stats["rate_limited"] += 1
+                    return False
+                flight = self._flight = threading.Event()
+                self._attempted_at = now
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            flight.wait(JWKS_FETCH_WAIT_SECONDS)
+            return True
+
+        try:
+            keys = build_keys(self.fetch())
+        except Exception:
+            logger.warning("JWKS fetch failed; keeping the previous keys", exc_info=True)
+            with self._lock:
+                self._stats["fetch_failures"] += 1
+        else:
+            with self._lock:
+                self._keys = keys
+                self._fetched_at = time.monotonic()
+                self._stats["fetches"] += 1
+        finally:
+            with self._lock:
+                self._flight = None
+            flight.set()
+
+        return True
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._flight is not None:
+                return
+        threading.Thread(target=self.refresh, name="jwks-refresh", daemon=True).start()
+
+    # ── scheduled refresh ─────────────────────
+
+    def start(self):
+        """Fetch the keys now (warm-up), then keep refreshing them in the background."""
+        if self._running():
+            return
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="jwks-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                ok = self._fetched_at is not None
+            # Retry sooner while there are no keys at all
+            if self._stop.wait(self.refresh_interval if ok else self.min_refresh_interval):
+                return
+            self.refresh()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["keys"] = len(self._keys)
+            stats["age_seconds"] = (
+                round(time.monotonic() - self._fetched_at, 1)
+                if self._fetched_at is not None else None
+            )
+        stats["refresher_running"] = self._running()
+        return stats
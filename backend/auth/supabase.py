@@ -1,13 +1,20 @@
 # backend/auth/supabase.py
 
+import os
+import time
+import hashlib
 import logging
+import threading
 import requests
-from functools import lru_cache
+from collections import OrderedDict
 
-from jose import jwt, jwk
+from jose import jwt
 from fastapi import Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+from backend.auth.jwks import KeySet
+
 # -----------------------------------------------------------------------------
 # Config
 # -----------------------------------------------------------------------------
@@ -16,6 +23,10 @@ SUPABASE_PROJECT_ID = "orbgbbrltetcvbjpqsim"
 SUPABASE_ISSUER = f"https://{SUPABASE_PROJECT_ID}.supabase.co/auth/v1"
 JWKS_URL = f"{SUPABASE_ISSUER}/.well-known/jwks.json"
 
+# Verified tokens remembered until they expire; least recently used
+# tokens are evicted beyond this many
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_TOKEN_CACHE_MAX_ENTRIES", "10000"))
+
 security = HTTPBearer()
 
 logging.basicConfig(level=logging.INFO)
@@ -25,48 +36,91 @@ logger = logging.getLogger("auth")
 # JWKS handling
 # -----------------------------------------------------------------------------
 
-@lru_cache(maxsize=1)
-def get_jwks():
+def fetch_jwks() -> dict:
     resp = requests.get(JWKS_URL, timeout=5)
     resp.raise_for_status()
     return resp.json()
 
 
-def get_public_key(token: str):
-    header = jwt.get_unverified_header(token)
-    kid = header.get("kid")
-
+# Refreshed in the background once started (see backend.main); tests can
+# swap key_set.fetch for a local stand-in
+key_set = KeySet(fetch_jwks)
 
-    jwks = get_jwks()
 
-    for key in jwks.get("keys", []):
-        if key.get("kid") == kid:
-            return jwk.construct(key)
+def get_public_key(token: str):
+    header = jwt.get_unverified_header(token)
 
+    # Unknown kids (e.g. after a rotation) trigger a rate-limited refresh
+    key = key_set.get(header.get("kid"))
+    if key is None:
+        raise HTTPException(status_code=401, detail="Public key not found")
+    return key
 
-    # Supabase may have rotated keys — refresh once
-    get_jwks.cache_clear()
-    jwks = get_jwks()
 
-    for key in jwks.get("keys", []):
-        if key.get("kid") == kid:
-            return jwk.construct(key)
+# -----------------------------------------------------------------------------
+# Verified tokens
+# -----------------------------------------------------------------------------
 
-    raise HTTPException(status_code=401, detail="Public key not found")
+class TokenCache:
+    """
+    Claims of tokens whose signature and claims already checked out, keyed
+    by a digest of the token, so repeat requests skip verification. An
+    entry is only served before the token's exp.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str):
+        digest = self._digest(token)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            expires, payload = entry
+            if expires <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+        # Callers may modify the claims they are given
+        return dict(payload)
+
+    def put(self, token: str, payload: dict):
+        expires = payload.get("exp")
+        if not isinstance(expires, (int, float)) or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[self._digest(token)] = (expires, dict(payload))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
 
 
 # -----------------------------------------------------------------------------
 # FastAPI dependency
 # -----------------------------------------------------------------------------
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-):
-
-    if credentials is None:
-        raise HTTPException(status_code=401, detail="Missing credentials")
+def verify_token(token: str) -> dict:
+    """
+    Claims of a valid token, from the cache or by checking its signature
+    and claims. May block on a JWKS fetch when the token's kid is unknown.
+    """
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
 
-    token = credentials.credentials
     try:
         public_key = get_public_key(token)
 
@@ -80,6 +134,7 @@ def get_current_user(
 
 
         logger.info("Authenticated user %s", payload.get("sub"))
+        token_cache.put(token, payload)
         return payload
 
     except Exception as e:
@@ -88,3 +143,32 @@ def get_current_user(
             status_code=401,
             detail=f"Invalid or expired token: {str(e)}",
         )
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Missing credentials")
+
+    return verify_token(credentials.credentials)
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    """
+    get_current_user for async routes. A sync dependency costs every request
+    a threadpool hop; here cached tokens are answered on the event loop and
+    only a full verification (which may fetch JWKS) goes to the threadpool.
+    """
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Missing credentials")
+
+    token = credentials.credentials
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
+    return await run_in_threadpool(verify_token, token)
@@ -0,0 +1,148 @@
+import os
+import re
+import json
+import asyncio
+from typing import Optional
+
+import asyncpg
+from dotenv import load_dotenv
+
+from backend.db.replica import REPLICA_LAG_SQL, router
+
+load_dotenv()
+
+ASYNC_POOL_MIN = int(os.getenv("DB_ASYNC_POOL_MIN", "1"))
+ASYNC_POOL_MAX = int(os.getenv("DB_ASYNC_POOL_MAX", "20"))
+
+# Seconds to wait for a free connection before giving up
+ASYNC_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+_PLACEHOLDER = re.compile(r"%s")
+
+
+def to_asyncpg(sql: str) -> str:
+    """
+    Rewrite psycopg2-style %s placeholders as asyncpg's $1, $2, ... so
+    both access paths can share the same query text.
+    """
+    counter = iter(range(1, sql.count("%s") + 1))
+    return _PLACEHOLDER.sub(lambda _: f"${next(counter)}", sql)
+
+
+async def _init_connection(conn):
+    # Decode json/jsonb like psycopg2 does instead of returning strings
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(
+            typename,
+            encoder=json.dumps,
+            decoder=json.loads,
+            schema="pg_catalog",
+        )
+
+
+async def _create_pool(dsn: str) -> asyncpg.Pool:
+    return await asyncpg.create_pool(
+        dsn,
+        min_size=ASYNC_POOL_MIN,
+        max_size=ASYNC_POOL_MAX,
+        init=_init_connection,
+    )
+
+
+_pool: Optional[asyncpg.Pool] = None
+_read_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_async_pool() -> asyncpg.Pool:
+    """
+    Process-wide asyncpg pool, created on first use from DATABASE_URL.
+    """
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                db_url = os.getenv("DATABASE_URL")
+                if not db_url:
+                    raise RuntimeError("DATABASE_URL not set")
+                _pool = await _create_pool(db_url)
+    return _pool
+
+
+async def get_async_read_pool() -> Optional[asyncpg.Pool]:
+    """
+    asyncpg pool on the read replica at DATABASE_READ_URL, created on first
+    use; None when no replica is configured.
+    """
+    global _read_pool
+    if _read_pool is None:
+        read_url = os.getenv("DATABASE_READ_URL")
+        if not read_url:
+            return None
+        async with _pool_lock:
+            if _read_pool is None:
+                _read_pool = await _create_pool(read_url)
+    return _read_pool
+
+
+async def _check_replica_lag(read_pool: asyncpg.Pool):
+    try:
+        async with read_pool.acquire(timeout=ASYNC_POOL_TIMEOUT) as conn:
+            lag = await conn.fetchval(REPLICA_LAG_SQL)
+    except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError, asyncio.TimeoutError):
+        lag = None
+    router.record_lag(lag)
+
+
+async def get_async_read_pool_for(user_id: Optional[str] = None) -> asyncpg.Pool:
+    """
+    Pool for a read-only query on behalf of user_id: the replica when
+    backend.db.replica allows it, otherwise the primary.
+    """
+    read_pool = await get_async_read_pool()
+    if read_pool is not None:
+        if router.lag_check_due():
+            await _check_replica_lag(read_pool)
+        if router.use_replica(user_id):
+            return read_pool
+    return await get_async_pool()
+
+
+async def fetch(sql: str, *args, pool: Optional[asyncpg.Pool] = None) -> list:
+    pool = pool or await get_async_pool()
+    async with pool.acquire(timeout=ASYNC_POOL_TIMEOUT) as conn:
+        return await conn.fetch(to_asyncpg(sql), *args)
+
+
+async def fetchrow(sql: str, *args, pool: Optional[asyncpg.Pool] = None):
+    pool = pool or await get_async_pool()
+    async with pool.acquire(timeout=ASYNC_POOL_TIMEOUT) as conn:
+        return await conn.fetchrow(to_asyncpg(sql), *args)
+
+
+def _stats(pool: Optional[asyncpg.Pool]) -> Optional[dict]:
+    if pool is None:
+        return None
+    return {
+        "min_size": pool.get_min_size(),
+        "max_size": pool.get_max_size(),
+        "open": pool.get_size(),
+        "idle": pool.get_idle_size(),
+    }
+
+
+def async_pool_stats() -> Optional[dict]:
+    return _stats(_pool)
+
+
+def async_read_pool_stats() -> Optional[dict]:
+    return _stats(_read_pool)
+
+
+async def close_async_pool():
+    global _pool, _read_pool
+    for pool in (_pool, _read_pool):
+        if pool is not None:
+            await pool.close()
+    _pool = None
+    _read_pool = None
@@ -0,0 +1,92 @@
+"""
+Fail when a hot query can no longer be answered from an index.
+
+    python -m backend.db.check_query_plans
+
+Runs EXPLAIN for each query in HOT_QUERIES against DATABASE_URL (a local
+Postgres with migrations applied; data is optional) and exits non-zero if
+any plan still contains a sequential scan.
+
+Sequential scans are disabled for the check, not just discouraged: on a
+small or empty database the planner would rightly prefer them, so a seq
+scan that survives enable_seqscan = off means no usable index exists.
+"""
+
+import sys
+import uuid
+from datetime import date, timedelta
+
+from backend.db.connection import get_db_connection
+from backend.storage.postgres import (
+    BASELINE_SQL,
+    DASHBOARD_SQL,
+    HISTORY_SQL,
+    MOOD_HISTORY_SQL,
+    MOODS_VERSION_SQL,
+    PREDICTIONS_VERSION_SQL,
+    ROLLUPS_SQL,
+    TODAY_SQL,
+    UNPREDICTED_DAYS_SQL,
+)
+
+_user = str(uuid.uuid4())
+_today = date.today()
+_year_ago = _today - timedelta(days=365)
+
+# name → (sql, params)
+HOT_QUERIES = {
+    "today": (TODAY_SQL, (_user, _today)),
+    "history": (HISTORY_SQL, (_user, _year_ago, _today)),
+    "mood_history": (MOOD_HISTORY_SQL, (_user, _year_ago, _today)),
+    "history_version": (PREDICTIONS_VERSION_SQL, (_user, _year_ago, _today)),
+    "mood_version": (MOODS_VERSION_SQL, (_user, _year_ago, _today)),
+    "dashboard": (DASHBOARD_SQL, (_year_ago, _today, _user, _user)),
+    "history_summary": (ROLLUPS_SQL, (_user, "week", _year_ago, _today)),
+    "unpredicted_days": (UNPREDICTED_DAYS_SQL, (_user,)),
+    "baseline": (
+        BASELINE_SQL,
+        (_user,) * 8 + (_today - timedelta(days=28), _today),
+    ),
+}
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def seq_scans(conn, sql: str, params: tuple) -> list[str]:
+    """
+    Relations read by sequential scan in the plan for sql.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL enable_seqscan = off;")
+        cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cur.fetchone()[0][0]["Plan"]
+    conn.rollback()
+
+    return [
+        node.get("Relation Name", "?")
+        for node in plan_nodes(plan)
+        if node["Node Type"] == "Seq Scan"
+    ]
+
+
+def main() -> int:
+    failures = 0
+
+    with get_db_connection() as conn:
+        for name, (sql, params) in HOT_QUERIES.items():
+            scanned = seq_scans(conn, sql, params)
+            if scanned:
+                failures += 1
+                print(f"FAIL  {name}: sequential scan on {', '.join(scanned)}")
+            else:
+                print(f"ok    {name}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,49 @@
-import os
+from contextlib import contextmanager
+from typing import Optional
+
 import psycopg2
-from dotenv import load_dotenv
 
-load_dotenv()
+from backend.db.pool import PoolTimeout, get_pool, get_read_pool
+from backend.db.replica import REPLICA_LAG_SQL, router
+
 
+@contextmanager
 def get_db_connection():
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
-        raise RuntimeError("DATABASE_URL not set")
+    """
+    Lease a connection from the process-wide pool for the duration of the
+    with-block. Uncommitted work is rolled back when it is returned.
+    """
+    with get_pool().connection() as conn:
+        yield conn
+
+
+def _check_replica_lag(read_pool):
+    try:
+        with read_pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(REPLICA_LAG_SQL)
+                lag = cur.fetchone()[0]
+            conn.rollback()
+    except (psycopg2.Error, PoolTimeout):
+        lag = None
+    router.record_lag(lag)
+
+
+@contextmanager
+def get_read_connection(user_id: Optional[str] = None):
+    """
+    Lease a connection for read-only work: from the read replica when
+    DATABASE_READ_URL is set and backend.db.replica allows it (lag within
+    tolerance, no recent write by user_id), otherwise from the primary.
+    """
+    read_pool = get_read_pool()
+    if read_pool is not None:
+        if router.lag_check_due():
+            _check_replica_lag(read_pool)
+        if router.use_replica(user_id):
+            with read_pool.connection() as conn:
+                yield conn
+            return
 
-    return psycopg2.connect(db_url)
+    with get_pool().connection() as conn:
+        yield conn
@@ -0,0 +1,62 @@
+from datetime import date
+from typing import Optional
+
+import numpy as np
+
+from scripts.ingest.garmin_intraday import decode_series
+
+# Supported downsampling buckets, in seconds
+RESOLUTIONS = {
+    "1min": 60,
+    "5min": 300,
+    "1h": 3600,
+}
+
+
+def downsample(timestamps: np.ndarray, values: np.ndarray, bucket_seconds: int):
+    """
+    Average samples into fixed, epoch-aligned buckets. Empty buckets are
+    omitted. Returns (bucket start seconds, mean values as float64).
+    """
+    buckets = timestamps - timestamps % bucket_seconds
+    starts, index, counts = np.unique(buckets, return_inverse=True, return_counts=True)
+    sums = np.bincount(index, weights=values, minlength=len(starts))
+    return starts, sums / counts
+
+
+def fetch_intraday(
+    repo,
+    user_id: str,
+    metric: str,
+    start: date,
+    end: date,
+    resolution: Optional[str] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Intraday samples for one metric between two dates (inclusive).
+
+    Returns (timestamps as datetime64[s] UTC, values). Raw samples come
+    back as int32; with a resolution from RESOLUTIONS they are averaged
+    per bucket and returned as float64.
+    """
+    if resolution is not None and resolution not in RESOLUTIONS:
+        raise ValueError(f"Unsupported resolution: {resolution}")
+
+    rows = repo.fetch_intraday_rows(user_id, metric, start, end)
+
+    parts = [
+        decode_series(int(start_ts.timestamp()), sample_count, bytes(payload))
+        for start_ts, sample_count, payload in rows
+    ]
+
+    if parts:
+        timestamps = np.concatenate([ts for ts, _ in parts])
+        values = np.concatenate([v for _, v in parts])
+    else:
+        timestamps = np.empty(0, dtype=np.int64)
+        values = np.empty(0, dtype=np.int32)
+
+    if resolution is not None and len(timestamps):
+        timestamps, values = downsample(timestamps, values, RESOLUTIONS[resolution])
+
+    return timestamps.astype("datetime64[s]"), values
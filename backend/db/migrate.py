@@ -0,0 +1,89 @@
+"""
+Apply pending schema migrations.
+
+    python -m backend.db.migrate           # apply everything pending
+    python -m backend.db.migrate --list    # show applied / pending
+
+Migrations are the NNNN_name.sql files in backend/db/migrations, applied in
+order, each in its own transaction, and recorded in schema_migrations.
+"""
+
+import sys
+import logging
+from pathlib import Path
+
+from backend.db.connection import get_db_connection
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(message)s",
+)
+logger = logging.getLogger("db.migrate")
+
+
+def available_migrations() -> list[Path]:
+    return sorted(MIGRATIONS_DIR.glob("[0-9][0-9][0-9][0-9]_*.sql"))
+
+
+def applied_versions(conn) -> set[str]:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version text PRIMARY KEY,
+                applied_at timestamptz NOT NULL DEFAULT now()
+            );
+            """
+        )
+        cur.execute("SELECT version FROM schema_migrations;")
+        versions = {row[0] for row in cur.fetchall()}
+    conn.commit()
+    return versions
+
+
+def migrate(conn) -> list[str]:
+    """
+    Apply every migration not yet recorded. Returns the versions applied.
+    """
+    done = applied_versions(conn)
+    applied = []
+
+    for path in available_migrations():
+        version = path.stem
+        if version in done:
+            continue
+
+        logger.info("Applying %s", version)
+        with conn.cursor() as cur:
+            cur.execute(path.read_text())
+            cur.execute(
+                "INSERT INTO schema_migrations (version) VALUES (%s);",
+                (version,),
+            )
+        conn.commit()
+        applied.append(version)
+
+    return applied
+
+
+def main():
+    with get_db_connection() as conn:
+        if "--list" in sys.argv[1:]:
+            done = applied_versions(conn)
+            for path in available_migrations():
+                mark = "applied" if path.stem in done else "pending"
+                print(f"{mark:>8}  {path.stem}")
+            return
+
+        applied = migrate(conn)
+
+    if applied:
+        logger.info("Applied %d migrations", len(applied))
+    else:
+        logger.info("Schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+-- Core tables as the code reads and writes them. They predate the numbered
+-- migrations, so every statement is IF NOT EXISTS: existing databases are
+-- left untouched and fresh ones get the same shape.
+
+CREATE TABLE IF NOT EXISTS users (
+    id uuid PRIMARY KEY,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- ─────────────────────────────────────────────
+-- Raw Garmin data, one row per (user, day)
+-- ─────────────────────────────────────────────
+
+CREATE TABLE IF NOT EXISTS sleep_summary (
+    user_id uuid NOT NULL,
+    date date NOT NULL,
+    total_sleep_minutes integer,
+    deep_sleep_minutes integer,
+    light_sleep_minutes integer,
+    rem_sleep_minutes integer,
+    awake_minutes integer,
+    sleep_score integer,
+    bedtime timestamp,                      -- GMT
+    wake_time timestamp,
+    source text NOT NULL DEFAULT 'garmin',
+    PRIMARY KEY (user_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS daily_physiology (
+    user_id uuid NOT NULL,
+    date date NOT NULL,
+    resting_hr integer,
+    respiration_rate real,
+    hrv_rmssd real,
+    source text NOT NULL DEFAULT 'garmin',
+    PRIMARY KEY (user_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS daily_activity (
+    user_id uuid NOT NULL,
+    date date NOT NULL,
+    steps integer,
+    active_minutes integer,
+    calories_burned real,
+    distance_meters real,
+    source text NOT NULL DEFAULT 'garmin',
+    PRIMARY KEY (user_id, date)
+);
+
+-- ─────────────────────────────────────────────
+-- Derived data
+-- ─────────────────────────────────────────────
+
+CREATE TABLE IF NOT EXISTS daily_features (
+    user_id uuid NOT NULL,
+    date date NOT NULL,
+    sleep_debt_minutes integer,
+    sleep_vs_baseline_pct double precision,
+    hrv_rmssd_zscore double precision,
+    resting_hr_delta double precision,
+    stress_percentile double precision,
+    steps_vs_baseline_pct double precision,
+    active_minutes_delta double precision,
+    baseline_window_days integer,
+    computed_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS predictions (
+    user_id uuid NOT NULL,
+    date date NOT NULL,
+    predicted_mood numeric(4, 2),
+    confidence text,
+    explanation text[] NOT NULL DEFAULT '{}',
+    model_version text,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, date)
+);
+
+-- ─────────────────────────────────────────────
+-- User input and upload tracking
+-- ─────────────────────────────────────────────
+
+CREATE TABLE IF NOT EXISTS mood_labels (
+    user_id uuid NOT NULL,
+    date date NOT NULL,
+    mood smallint NOT NULL CHECK (mood BETWEEN 1 AND 5),
+    note text,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS garmin_uploads (
+    id bigserial PRIMARY KEY,
+    user_id uuid NOT NULL,
+    filename text NOT NULL,
+    file_hash text NOT NULL,
+    status text NOT NULL DEFAULT 'processing',  -- processing | success | failed
+    error_message text,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    UNIQUE (user_id, file_hash)
+);
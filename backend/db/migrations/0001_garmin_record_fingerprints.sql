@@ -0,0 +1,12 @@
+-- Content fingerprints of raw Garmin records, one per (user, source, day).
+-- Ingest compares incoming records against these and skips unchanged days,
+-- so overlapping cumulative exports only rewrite what actually changed.
+
+CREATE TABLE IF NOT EXISTS garmin_record_fingerprints (
+    user_id uuid NOT NULL,
+    source text NOT NULL,
+    date date NOT NULL,
+    fingerprint text NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, source, date)
+);
@@ -0,0 +1,27 @@
+-- Queue of accepted Garmin uploads waiting for (or going through) the
+-- ingest → features → inference pipeline. Workers claim rows with
+-- FOR UPDATE SKIP LOCKED, so several workers can share the table.
+
+CREATE TABLE IF NOT EXISTS garmin_upload_jobs (
+    id uuid PRIMARY KEY,
+    user_id uuid NOT NULL,
+    status text NOT NULL DEFAULT 'queued',  -- queued | running | success | failed
+    stage text,
+    progress real NOT NULL DEFAULT 0,
+    workdir text NOT NULL,
+    files jsonb NOT NULL,                   -- [{"path": ..., "sha256": ...}]
+    stage_timings jsonb NOT NULL DEFAULT '{}'::jsonb,
+    result jsonb,
+    error_message text,
+    attempts integer NOT NULL DEFAULT 0,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    started_at timestamptz,
+    finished_at timestamptz
+);
+
+CREATE INDEX IF NOT EXISTS garmin_upload_jobs_queued_idx
+    ON garmin_upload_jobs (created_at)
+    WHERE status = 'queued';
+
+CREATE INDEX IF NOT EXISTS garmin_upload_jobs_user_idx
+    ON garmin_upload_jobs (user_id, created_at DESC);
@@ -0,0 +1,14 @@
+-- Resumable uploads assembled chunk by chunk under GARMIN_UPLOAD_DIR/<id>.
+-- received_bytes is the committed length of the server-side file; clients
+-- resume by sending the next chunk at that offset.
+
+CREATE TABLE IF NOT EXISTS garmin_chunked_uploads (
+    id uuid PRIMARY KEY,
+    user_id uuid NOT NULL,
+    filename text NOT NULL,
+    total_size bigint,
+    received_bytes bigint NOT NULL DEFAULT 0,
+    status text NOT NULL DEFAULT 'open',  -- open | finalized
+    created_at timestamptz NOT NULL DEFAULT now(),
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
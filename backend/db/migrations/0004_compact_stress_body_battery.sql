@@ -0,0 +1,90 @@
+-- One row per (user, day) for stress and body battery, replacing the
+-- row-per-aggregate daily_stress and row-per-stat daily_body_battery.
+--
+-- The TOTAL stress aggregate (the only one features read) gets fixed
+-- columns; every aggregator type, TOTAL included, is also kept as parallel
+-- typed arrays indexed like agg_types. Body battery stats use the same
+-- layout keyed by stat_types.
+
+CREATE TABLE IF NOT EXISTS daily_stress_summary (
+    user_id uuid NOT NULL,
+    date date NOT NULL,
+    avg_stress smallint,
+    max_stress smallint,
+    stress_duration integer,
+    rest_duration integer,
+    activity_duration integer,
+    total_duration integer,
+    agg_types text[] NOT NULL,
+    agg_avg_stress smallint[] NOT NULL,
+    agg_max_stress smallint[] NOT NULL,
+    agg_stress_duration integer[] NOT NULL,
+    agg_rest_duration integer[] NOT NULL,
+    agg_activity_duration integer[] NOT NULL,
+    agg_total_duration integer[] NOT NULL,
+    PRIMARY KEY (user_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS daily_body_battery_summary (
+    user_id uuid NOT NULL,
+    date date NOT NULL,
+    stat_types text[] NOT NULL,
+    stat_values smallint[] NOT NULL,
+    stat_timestamps timestamp[] NOT NULL,
+    PRIMARY KEY (user_id, date)
+);
+
+-- Backfill from the narrow tables where they exist, then drop them
+DO $$
+BEGIN
+    IF to_regclass('daily_stress') IS NOT NULL THEN
+        INSERT INTO daily_stress_summary
+        SELECT
+            user_id,
+            date,
+            max(avg_stress) FILTER (WHERE stress_type = 'TOTAL'),
+            max(max_stress) FILTER (WHERE stress_type = 'TOTAL'),
+            max(stress_duration) FILTER (WHERE stress_type = 'TOTAL'),
+            max(rest_duration) FILTER (WHERE stress_type = 'TOTAL'),
+            max(activity_duration) FILTER (WHERE stress_type = 'TOTAL'),
+            max(total_duration) FILTER (WHERE stress_type = 'TOTAL'),
+            array_agg(stress_type ORDER BY stress_type),
+            array_agg(avg_stress ORDER BY stress_type),
+            array_agg(max_stress ORDER BY stress_type),
+            array_agg(stress_duration ORDER BY stress_type),
+            array_agg(rest_duration ORDER BY stress_type),
+            array_agg(activity_duration ORDER BY stress_type),
+            array_agg(total_duration ORDER BY stress_type)
+        FROM (
+            SELECT DISTINCT ON (user_id, date, stress_type) *
+            FROM daily_stress
+            WHERE stress_type IS NOT NULL
+            ORDER BY user_id, date, stress_type
+        ) s
+        GROUP BY user_id, date
+        ON CONFLICT (user_id, date) DO NOTHING;
+
+        DROP TABLE daily_stress;
+    END IF;
+
+    IF to_regclass('daily_body_battery') IS NOT NULL THEN
+        INSERT INTO daily_body_battery_summary
+        SELECT
+            user_id,
+            date,
+            array_agg(stat_type ORDER BY stat_type),
+            array_agg(value ORDER BY stat_type),
+            array_agg(timestamp::timestamp ORDER BY stat_type)
+        FROM (
+            SELECT DISTINCT ON (user_id, date, stat_type) *
+            FROM daily_body_battery
+            WHERE stat_type IS NOT NULL
+            ORDER BY user_id, date, stat_type
+        ) b
+        GROUP BY user_id, date
+        ON CONFLICT (user_id, date) DO NOTHING;
+
+        DROP TABLE daily_body_battery;
+    END IF;
+END
+$$;
@@ -0,0 +1,14 @@
+-- Intraday samples (stress, heart rate, body battery), one row per
+-- (user, metric, day). payload is a format byte followed by a zlib stream
+-- of int32 timestamp deltas (seconds) and int16 value deltas; see
+-- scripts/ingest/garmin_intraday.py.
+
+CREATE TABLE IF NOT EXISTS intraday_series (
+    user_id uuid NOT NULL,
+    metric text NOT NULL,
+    date date NOT NULL,
+    start_ts timestamptz NOT NULL,
+    sample_count integer NOT NULL,
+    payload bytea NOT NULL,
+    PRIMARY KEY (user_id, metric, date)
+);
@@ -0,0 +1,28 @@
+-- Indexes behind the hot read paths. Checked by
+-- `python -m backend.db.check_query_plans`.
+--
+-- Plain CREATE INDEX (not CONCURRENTLY) so each migration can run in one
+-- transaction; on a large live table, create the index concurrently by
+-- hand first and this becomes a no-op.
+
+-- /today and /history read explanation (text[]), which is too large to
+-- carry in an index, so they stay on the predictions primary key.
+
+-- fetch_baseline / fetch_today: the per-table LEFT JOINs read only these
+-- columns, so the joins never touch the heap. The key repeats the primary
+-- key's; only the small INCLUDE columns make these worth keeping.
+CREATE INDEX IF NOT EXISTS sleep_summary_user_date_covering_idx
+    ON sleep_summary (user_id, date)
+    INCLUDE (total_sleep_minutes);
+
+CREATE INDEX IF NOT EXISTS daily_physiology_user_date_covering_idx
+    ON daily_physiology (user_id, date)
+    INCLUDE (hrv_rmssd, resting_hr);
+
+CREATE INDEX IF NOT EXISTS daily_activity_user_date_covering_idx
+    ON daily_activity (user_id, date)
+    INCLUDE (steps, active_minutes);
+
+CREATE INDEX IF NOT EXISTS daily_stress_summary_user_date_covering_idx
+    ON daily_stress_summary (user_id, date)
+    INCLUDE (avg_stress);
@@ -0,0 +1,126 @@
+-- Range-partition the raw daily tables and predictions by month on date.
+-- Every query filters on date (or joins on it), so they keep working
+-- unchanged and prune to the months they touch.
+--
+-- Partitions are named <table>_yYYYYmMM. A <table>_default partition
+-- catches dates no monthly partition covers yet (e.g. years-old history in
+-- a first upload); `python -m backend.db.partitions` moves those rows into
+-- proper partitions, creates future ones and archives expired ones.
+
+CREATE SCHEMA IF NOT EXISTS archive;
+
+-- Create the monthly partition of parent containing month, first moving
+-- any of its rows out of the default partition. No-op if it exists.
+CREATE OR REPLACE FUNCTION ensure_month_partition(parent text, month date)
+RETURNS text
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    lo date := date_trunc('month', month)::date;
+    hi date := (date_trunc('month', month) + interval '1 month')::date;
+    part text := format('%s_y%sm%s', parent, to_char(lo, 'YYYY'), to_char(lo, 'MM'));
+BEGIN
+    IF to_regclass(part) IS NOT NULL THEN
+        RETURN part;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        part, parent
+    );
+
+    IF to_regclass(parent || '_default') IS NOT NULL THEN
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM %I WHERE date >= %L AND date < %L RETURNING *)
+             INSERT INTO %I SELECT * FROM moved',
+            parent || '_default', lo, hi, part
+        );
+    END IF;
+
+    EXECUTE format(
+        'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        parent, part, lo, hi
+    );
+
+    RETURN part;
+END
+$$;
+
+-- Swap each table for a partitioned copy: same columns, defaults and
+-- primary key, secondary indexes recreated on the parent, data moved over
+DO $$
+DECLARE
+    t text;
+    old text;
+    pkey text;
+    month date;
+    index_defs text[];
+    def text;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'sleep_summary',
+        'daily_physiology',
+        'daily_activity',
+        'daily_stress_summary',
+        'daily_body_battery_summary',
+        'predictions'
+    ]
+    LOOP
+        IF (SELECT relkind FROM pg_class WHERE oid = to_regclass(t)) IS DISTINCT FROM 'r' THEN
+            CONTINUE;
+        END IF;
+
+        old := t || '_unpartitioned';
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', t, old);
+
+        -- Free the primary key's name (<t>_pkey) for the new parent
+        SELECT conname INTO pkey
+        FROM pg_constraint
+        WHERE conrelid = to_regclass(old)
+          AND contype = 'p';
+        IF pkey IS NOT NULL THEN
+            EXECUTE format('ALTER TABLE %I RENAME CONSTRAINT %I TO %I', old, pkey, old || '_pkey');
+        END IF;
+
+        SELECT coalesce(array_agg(pg_get_indexdef(indexrelid)), '{}')
+        INTO index_defs
+        FROM pg_index
+        WHERE indrelid = to_regclass(old)
+          AND NOT indisprimary;
+
+        EXECUTE format(
+            'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+                              CONSTRAINT %I PRIMARY KEY (user_id, date))
+             PARTITION BY RANGE (date)',
+            t, old, t || '_pkey'
+        );
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', t || '_default', t);
+
+        FOR month IN EXECUTE format(
+            'SELECT DISTINCT date_trunc(''month'', date)::date FROM %I', old
+        )
+        LOOP
+            PERFORM ensure_month_partition(t, month);
+        END LOOP;
+
+        EXECUTE format('INSERT INTO %I SELECT * FROM %I', t, old);
+        EXECUTE format('DROP TABLE %I', old);
+
+        FOREACH def IN ARRAY index_defs
+        LOOP
+            EXECUTE regexp_replace(def, ' ON \S+ USING ', format(' ON %I USING ', t));
+        END LOOP;
+
+        -- A few months ahead so new data does not land in the default
+        FOR month IN
+            SELECT generate_series(
+                date_trunc('month', now()),
+                date_trunc('month', now()) + interval '3 months',
+                interval '1 month'
+            )::date
+        LOOP
+            PERFORM ensure_month_partition(t, month);
+        END LOOP;
+    END LOOP;
+END
+$$;
@@ -0,0 +1,11 @@
+-- Conditional GETs on /history and /mood compute a version token per range
+-- (count and max(created_at)); carry created_at in an index so the token
+-- comes from an index-only scan.
+
+CREATE INDEX IF NOT EXISTS predictions_user_date_created_idx
+    ON predictions (user_id, date)
+    INCLUDE (created_at);
+
+CREATE INDEX IF NOT EXISTS mood_labels_user_date_created_idx
+    ON mood_labels (user_id, date)
+    INCLUDE (created_at);
@@ -0,0 +1,75 @@
+-- Weekly and monthly aggregates behind /history/summary, so a multi-year
+-- summary reads a few hundred rows instead of every day in the range.
+--
+-- Rows are kept current by the application: each repository commit first
+-- recomputes the periods containing the days it wrote (see
+-- Repository.refresh_rollups). Weeks start on Monday (date_trunc('week')).
+
+CREATE TABLE IF NOT EXISTS mood_rollups (
+    user_id uuid NOT NULL,
+    granularity text NOT NULL CHECK (granularity IN ('week', 'month')),
+    period_start date NOT NULL,
+
+    predicted_days integer NOT NULL,
+    predicted_mood_avg float8,
+    mood_days integer NOT NULL,
+    mood_avg float8,
+
+    feature_days integer NOT NULL,
+    sleep_debt_minutes_avg float8,
+    hrv_rmssd_zscore_avg float8,
+    resting_hr_delta_avg float8,
+    stress_percentile_avg float8,
+    steps_vs_baseline_pct_avg float8,
+
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, granularity, period_start)
+);
+
+-- Backfill from existing history
+WITH days AS (
+    SELECT user_id, date FROM predictions
+    UNION
+    SELECT user_id, date FROM mood_labels
+    UNION
+    SELECT user_id, date FROM daily_features
+)
+INSERT INTO mood_rollups (
+    user_id,
+    granularity,
+    period_start,
+    predicted_days,
+    predicted_mood_avg,
+    mood_days,
+    mood_avg,
+    feature_days,
+    sleep_debt_minutes_avg,
+    hrv_rmssd_zscore_avg,
+    resting_hr_delta_avg,
+    stress_percentile_avg,
+    steps_vs_baseline_pct_avg
+)
+SELECT
+    d.user_id,
+    g.granularity,
+    date_trunc(g.granularity, d.date)::date,
+    count(p.date),
+    avg(p.predicted_mood)::float8,
+    count(m.date),
+    avg(m.mood)::float8,
+    count(f.date),
+    avg(f.sleep_debt_minutes)::float8,
+    avg(f.hrv_rmssd_zscore)::float8,
+    avg(f.resting_hr_delta)::float8,
+    avg(f.stress_percentile)::float8,
+    avg(f.steps_vs_baseline_pct)::float8
+FROM days d
+CROSS JOIN (VALUES ('week'), ('month')) AS g (granularity)
+LEFT JOIN predictions p
+  ON p.user_id = d.user_id AND p.date = d.date
+LEFT JOIN mood_labels m
+  ON m.user_id = d.user_id AND m.date = d.date
+LEFT JOIN daily_features f
+  ON f.user_id = d.user_id AND f.date = d.date
+GROUP BY 1, 2, 3
+ON CONFLICT (user_id, granularity, period_start) DO NOTHING;
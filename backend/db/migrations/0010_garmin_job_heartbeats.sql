@@ -0,0 +1,6 @@
+-- Running upload jobs send a heartbeat while their worker is alive; a job
+-- is only requeued once its heartbeat goes quiet (see
+-- backend.garmin.jobs.requeue_stale_jobs), not merely for running long.
+
+ALTER TABLE garmin_upload_jobs
+    ADD COLUMN IF NOT EXISTS heartbeat_at timestamptz;
@@ -0,0 +1,16 @@
+-- JSON files (by hash) extracted from each uploaded archive. An archive's
+-- garmin_uploads row is settled from its members' rows rather than by the
+-- job that received it: its files may be processed by several jobs (or
+-- were already processed), and it must only count as known once all of
+-- them succeeded, so a failed file can still be retried by re-uploading
+-- the archive.
+
+CREATE TABLE IF NOT EXISTS garmin_upload_archive_members (
+    user_id uuid NOT NULL,
+    archive_hash text NOT NULL,
+    member_hash text NOT NULL,
+    PRIMARY KEY (user_id, archive_hash, member_hash)
+);
+
+CREATE INDEX IF NOT EXISTS garmin_upload_archive_members_member_idx
+    ON garmin_upload_archive_members (user_id, member_hash);
@@ -0,0 +1,182 @@
+"""
+Monthly partition maintenance for the raw daily tables and predictions
+(see migrations/0007_monthly_partitions.sql).
+
+    python -m backend.db.partitions [--months-ahead 3] [--retention-months N]
+
+Run it from cron (daily is plenty). Each run:
+  1. moves rows that landed in a <table>_default partition into monthly
+     partitions of their own,
+  2. creates partitions for the next --months-ahead months,
+  3. with --retention-months, detaches partitions that ended more than
+     that many months ago and rewrites them into archive.<partition>.
+"""
+
+import os
+import re
+import argparse
+import logging
+from datetime import date
+from typing import Optional
+
+from psycopg2 import sql
+
+from backend.db.connection import get_db_connection
+
+PARTITIONED_TABLES = (
+    "sleep_summary",
+    "daily_physiology",
+    "daily_activity",
+    "daily_stress_summary",
+    "daily_body_battery_summary",
+    "predictions",
+)
+
+MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+# Months of data kept online; unset keeps everything
+RETENTION_MONTHS = os.getenv("PARTITION_RETENTION_MONTHS")
+
+ARCHIVE_SCHEMA = "archive"
+
+_PARTITION_NAME = re.compile(r"_y(\d{4})m(\d{2})$")
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(message)s",
+)
+logger = logging.getLogger("db.partitions")
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def list_partitions(conn, table: str) -> dict[str, date]:
+    """
+    Monthly partitions of table, as {name: first day of month}.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s);
+            """,
+            (table,),
+        )
+        names = [row[0] for row in cur.fetchall()]
+
+    partitions = {}
+    for name in names:
+        m = _PARTITION_NAME.search(name)
+        if m:
+            partitions[name] = date(int(m.group(1)), int(m.group(2)), 1)
+    return partitions
+
+
+def ensure_partition(conn, table: str, month: date) -> str:
+    with conn.cursor() as cur:
+        cur.execute("SELECT ensure_month_partition(%s, %s);", (table, month))
+        name = cur.fetchone()[0]
+    conn.commit()
+    return name
+
+
+# ─────────────────────────────────────────────
+# Maintenance steps
+# ─────────────────────────────────────────────
+
+def split_default_partition(conn, table: str) -> list[str]:
+    """
+    Give every month with rows in the default partition its own partition.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            sql.SQL(
+                "SELECT DISTINCT date_trunc('month', date)::date FROM {} ORDER BY 1;"
+            ).format(sql.Identifier(f"{table}_default"))
+        )
+        months = [row[0] for row in cur.fetchall()]
+    conn.commit()
+
+    return [ensure_partition(conn, table, month) for month in months]
+
+
+def create_future_partitions(conn, table: str, months_ahead: int = MONTHS_AHEAD) -> list[str]:
+    existing = set(list_partitions(conn, table))
+    this_month = date.today().replace(day=1)
+
+    created = []
+    for n in range(months_ahead + 1):
+        name = ensure_partition(conn, table, add_months(this_month, n))
+        if name not in existing:
+            created.append(name)
+    return created
+
+
+def archive_expired_partitions(conn, table: str, retention_months: int) -> list[str]:
+    """
+    Detach partitions whose month ended more than retention_months ago and
+    rewrite each into a compact archive table: a fresh heap sorted by
+    (user_id, date), with no indexes and no dead tuples.
+    """
+    cutoff = add_months(date.today().replace(day=1), -retention_months)
+    archived = []
+
+    for name, month in sorted(list_partitions(conn, table).items(), key=lambda p: p[1]):
+        if add_months(month, 1) > cutoff:
+            continue
+
+        with conn.cursor() as cur:
+            cur.execute(
+                sql.SQL("ALTER TABLE {} DETACH PARTITION {};").format(
+                    sql.Identifier(table), sql.Identifier(name)
+                )
+            )
+            cur.execute(
+                sql.SQL(
+                    "CREATE TABLE {} AS SELECT * FROM {} ORDER BY user_id, date;"
+                ).format(
+                    sql.Identifier(ARCHIVE_SCHEMA, name), sql.Identifier(name)
+                )
+            )
+            cur.execute(sql.SQL("DROP TABLE {};").format(sql.Identifier(name)))
+        conn.commit()
+
+        archived.append(name)
+
+    return archived
+
+
+def maintain(conn, months_ahead: int = MONTHS_AHEAD, retention_months: Optional[int] = None):
+    for table in PARTITIONED_TABLES:
+        for name in split_default_partition(conn, table):
+            logger.info("%s: moved default rows into %s", table, name)
+
+        for name in create_future_partitions(conn, table, months_ahead):
+            logger.info("%s: created %s", table, name)
+
+        if retention_months is not None:
+            for name in archive_expired_partitions(conn, table, retention_months):
+                logger.info("%s: archived %s to %s.%s", table, name, ARCHIVE_SCHEMA, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition maintenance")
+    parser.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    parser.add_argument(
+        "--retention-months",
+        type=int,
+        default=int(RETENTION_MONTHS) if RETENTION_MONTHS else None,
+    )
+    args = parser.parse_args()
+
+    with get_db_connection() as conn:
+        maintain(conn, args.months_ahead, args.retention_months)
+
+
+if __name__ == "__main__":
+    main()
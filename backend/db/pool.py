@@ -0,0 +1,226 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("db.pool")
+
+POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+
+# Seconds to wait for a free connection before giving up
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Connections idle for longer than this are pinged before being handed out
+HEALTHCHECK_IDLE_SECONDS = float(os.getenv("DB_POOL_HEALTHCHECK_IDLE_SECONDS", "30"))
+
+
+class PoolTimeout(RuntimeError):
+    """No connection became available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe, bounded Postgres connection pool.
+
+    Checkout blocks (up to timeout) when all connections are leased, pings
+    connections that have sat idle, and replaces broken ones. Leases are
+    rolled back on return so no transaction leaks into the next borrower.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        minconn: int = POOL_MIN,
+        maxconn: int = POOL_MAX,
+        timeout: float = POOL_TIMEOUT,
+        healthcheck_idle: float = HEALTHCHECK_IDLE_SECONDS,
+    ):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_idle = healthcheck_idle
+
+        self._pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, dsn)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used: dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+            "in_use": 0,
+            "healthcheck_failures": 0,
+            "discarded": 0,
+        }
+
+    # ── checkout / return ──────────────────────
+
+    @contextmanager
+    def connection(self):
+        conn = self._checkout()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self._return(conn, broken)
+
+    def _checkout(self):
+        started = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["waits"] += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise PoolTimeout(f"No database connection available after {self.timeout}s")
+
+        try:
+            conn = self._healthy_connection()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["wait_seconds"] += time.monotonic() - started
+        return conn
+
+    def _healthy_connection(self):
+        # Stale connections are dropped until a healthy or fresh one turns up
+        for _ in range(self.maxconn):
+            conn = self._pool.getconn()
+            if self._is_healthy(conn):
+                return conn
+
+            with self._lock:
+                self._stats["healthcheck_failures"] += 1
+            self._discard(conn)
+
+        return self._pool.getconn()
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.healthcheck_idle:
+            return True
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            logger.warning("Discarding unhealthy pooled connection")
+            return False
+
+    def _return(self, conn, broken: bool):
+        try:
+            if broken or conn.closed:
+                self._discard(conn)
+                return
+
+            if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    self._discard(conn)
+                    return
+
+            self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn)
+        finally:
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        with self._lock:
+            self._stats["discarded"] += 1
+        try:
+            self._pool.putconn(conn, close=True)
+        except psycopg2.pool.PoolError:
+            conn.close()
+
+    # ── metrics / lifecycle ───────────────────
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["max_size"] = self.maxconn
+        stats["open"] = len(self._pool._used) + len(self._pool._pool)
+        stats["idle"] = len(self._pool._pool)
+        return stats
+
+    def close(self):
+        self._pool.closeall()
+
+
+_pool: Optional[ConnectionPool] = None
+_read_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Process-wide pool, created on first use from DATABASE_URL.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                db_url = os.getenv("DATABASE_URL")
+                if not db_url:
+                    raise RuntimeError("DATABASE_URL not set")
+                _pool = ConnectionPool(db_url)
+    return _pool
+
+
+def get_read_pool() -> Optional[ConnectionPool]:
+    """
+    Process-wide pool on the read replica at DATABASE_READ_URL, created on
+    first use; None when no replica is configured.
+    """
+    global _read_pool
+    if _read_pool is None:
+        read_url = os.getenv("DATABASE_READ_URL")
+        if not read_url:
+            return None
+        with _pool_lock:
+            if _read_pool is None:
+                _read_pool = ConnectionPool(read_url)
+    return _read_pool
+
+
+def pool_stats() -> Optional[dict]:
+    return _pool.stats() if _pool is not None else None
+
+
+def read_pool_stats() -> Optional[dict]:
+    return _read_pool.stats() if _read_pool is not None else None
+
+
+def close_pool():
+    global _pool, _read_pool
+    with _pool_lock:
+        for pool in (_pool, _read_pool):
+            if pool is not None:
+                pool.close()
+        _pool = None
+        _read_pool = None
@@ -0,0 +1,157 @@
+import os
+import time
+import logging
+import threading
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("db.replica")
+
+# Reads go to the primary while the replica is further behind than this
+MAX_REPLICA_LAG = float(os.getenv("DB_READ_MAX_LAG_SECONDS", "5"))
+
+# Seconds a measured replica lag is trusted before it is measured again
+LAG_CHECK_INTERVAL = float(os.getenv("DB_READ_LAG_CHECK_SECONDS", "5"))
+
+# After a user's own write, their reads stay on the primary this long.
+# Keep it above MAX_REPLICA_LAG so they never read past their own write.
+STICKY_SECONDS = float(os.getenv("DB_READ_STICKY_SECONDS", "30"))
+
+# Seconds of replay lag on the replica; 0 when it has replayed everything
+# it received (an idle primary would otherwise look like a lagging replica).
+# That only means anything while WAL is still arriving, so a replica whose
+# WAL receiver is not streaming (disconnected, or restarting) counts as
+# infinitely behind. Reading the receiver's status needs pg_read_all_stats;
+# without it the status is NULL and reads stay on the primary.
+REPLICA_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN NOT EXISTS (
+        SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming'
+    ) THEN 'Infinity'::float8
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(
+        EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8,
+        'Infinity'::float8
+    )
+END;
+"""
+
+
+class ReplicaRouter:
+    """
+    Decides whether a read may be served by the replica.
+
+    A read goes to the primary when its user wrote within STICKY_SECONDS
+    (read-your-writes) or when the replica's last measured lag exceeds
+    MAX_REPLICA_LAG. Lag is measured by the caller (sync or async) whenever
+    lag_check_due() says so, and a failed check counts as too stale.
+
+    Writes are reported by repository commits (see backend.storage) and
+    tracked per process, so writes made by a separate worker process are
+    only bounded by the lag tolerance.
+    """
+
+    def __init__(
+        self,
+        max_lag: float = MAX_REPLICA_LAG,
+        check_interval: float = LAG_CHECK_INTERVAL,
+        sticky_seconds: float = STICKY_SECONDS,
+    ):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+
+        self._lock = threading.Lock()
+        self._last_write: dict[str, float] = {}
+        self._lag: Optional[float] = None
+        self._lag_checked_at: Optional[float] = None
+        self._stats = {
+            "replica_reads": 0,
+            "primary_reads": 0,
+            "sticky_reads": 0,
+            "stale_reads": 0,
+            "lag_check_failures": 0,
+        }
+
+    # ── read-your-writes ──────────────────────
+
+    def mark_write(self, user_id: str):
+        now = time.monotonic()
+        with self._lock:
+            self._last_write[user_id] = now
+            # Forget users whose window has passed so the map stays small
+            if len(self._last_write) > 1024:
+                cutoff = now - self.sticky_seconds
+                self._last_write = {
+                    u: t for u, t in self._last_write.items() if t >= cutoff
+                }
+
+    def is_sticky(self, user_id: Optional[str]) -> bool:
+        if user_id is None:
+            return False
+        with self._lock:
+            written = self._last_write.get(user_id)
+        return written is not None and time.monotonic() - written < self.sticky_seconds
+
+    # ── staleness ─────────────────────────────
+
+    def lag_check_due(self) -> bool:
+        with self._lock:
+            checked = self._lag_checked_at
+        return checked is None or time.monotonic() - checked >= self.check_interval
+
+    def record_lag(self, lag: Optional[float]):
+        """Store a measured lag; None records a failed measurement."""
+        with self._lock:
+            self._lag = lag
+            self._lag_checked_at = time.monotonic()
+            if lag is None:
+                self._stats["lag_check_failures"] += 1
+
+        if lag is None:
+            logger.warning("Replica lag check failed; reading from the primary")
+        elif lag > self.max_lag:
+            logger.warning("Replica is %.1fs behind; reading from the primary", lag)
+
+    # ── routing ───────────────────────────────
+
+    def use_replica(self, user_id: Optional[str]) -> bool:
+        """
+        Route one read and count the decision. Call after any due lag check.
+        """
+        if self.is_sticky(user_id):
+            reason = "sticky_reads"
+        else:
+            with self._lock:
+                lag = self._lag
+            reason = "stale_reads" if lag is None or lag > self.max_lag else None
+
+        with self._lock:
+            if reason is None:
+                self._stats["replica_reads"] += 1
+                return True
+            self._stats[reason] += 1
+            self._stats["primary_reads"] += 1
+            return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["lag_seconds"] = self._lag
+        stats["max_lag_seconds"] = self.max_lag
+        return stats
+
+
+router = ReplicaRouter()
+
+
+def mark_user_write(user_id: str):
+    """
+    Record that user_id just committed a write, so their reads skip the
+    replica until it has had time to catch up.
+    """
+    router.mark_write(user_id)
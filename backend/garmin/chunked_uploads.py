@@ -0,0 +1,173 @@
+import os
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional
+
+import psycopg2.extras
+
+from backend.garmin.files import UPLOAD_DIR
+
+# Largest chunk accepted by a single PUT
+MAX_CHUNK_BYTES = int(os.getenv("GARMIN_MAX_CHUNK_BYTES", str(64 * 1024 * 1024)))
+
+# Open uploads without a chunk for this long are abandoned; the row and its
+# partial file are removed
+UPLOAD_TTL = int(os.getenv("GARMIN_CHUNKED_UPLOAD_TTL_SECONDS", str(24 * 3600)))
+
+
+class ChunkOffsetError(Exception):
+    """Chunk does not start where the assembled file currently ends."""
+
+    def __init__(self, received_bytes: int):
+        super().__init__(f"Expected offset {received_bytes}")
+        self.received_bytes = received_bytes
+
+
+# Running SHA-256 of each assembled file, fed as chunks arrive so the file
+# need not be read back. Lost on restart or when another process took a
+# chunk; the job worker then hashes it from disk.
+_running_hashes: dict[str, tuple[int, "hashlib._Hash"]] = {}
+_running_hashes_lock = threading.Lock()
+
+
+# ─────────────────────────────────────────────
+# State
+# ─────────────────────────────────────────────
+
+def create_upload(conn, upload_id: str, user_id: str, filename: str, total_size: Optional[int]):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO garmin_chunked_uploads (
+                id,
+                user_id,
+                filename,
+                total_size
+            )
+            VALUES (%s, %s, %s, %s);
+            """,
+            (upload_id, user_id, filename, total_size),
+        )
+
+
+def get_upload(conn, user_id: str, upload_id: str, for_update: bool = False) -> Optional[dict]:
+    """
+    Fetch an upload owned by user_id. With for_update the row stays locked
+    until the caller commits, serialising chunk writes for this upload.
+    """
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(
+            f"""
+            SELECT id, filename, total_size, received_bytes, status
+            FROM garmin_chunked_uploads
+            WHERE id = %s
+              AND user_id = %s
+            {"FOR UPDATE" if for_update else ""};
+            """,
+            (upload_id, user_id),
+        )
+        return cur.fetchone()
+
+
+def set_received_bytes(conn, upload_id: str, received_bytes: int):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE garmin_chunked_uploads
+            SET received_bytes = %s, updated_at = now()
+            WHERE id = %s;
+            """,
+            (received_bytes, upload_id),
+        )
+
+
+def expire_stale_uploads(conn) -> int:
+    """
+    Delete open uploads that have not received a chunk in UPLOAD_TTL
+    seconds, and their partial files. Commits; returns how many expired.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            DELETE FROM garmin_chunked_uploads
+            WHERE status = 'open'
+              AND updated_at < now() - %s * interval '1 second'
+            RETURNING id;
+            """,
+            (UPLOAD_TTL,),
+        )
+        expired = [str(row[0]) for row in cur.fetchall()]
+    conn.commit()
+
+    for upload_id in expired:
+        shutil.rmtree(UPLOAD_DIR / upload_id, ignore_errors=True)
+        forget_upload(upload_id)
+    return len(expired)
+
+
+def mark_finalized(conn, upload_id: str):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE garmin_chunked_uploads
+            SET status = 'finalized', updated_at = now()
+            WHERE id = %s;
+            """,
+            (upload_id,),
+        )
+
+
+# ─────────────────────────────────────────────
+# Assembly
+# ─────────────────────────────────────────────
+
+def write_chunk(path: Path, upload_id: str, received_bytes: int, offset: int, data: bytes) -> int:
+    """
+    Write data at offset and return the new assembled length.
+
+    Only offset == received_bytes is accepted. Anything past that offset is
+    left over from a write that was never committed, so it is truncated.
+    """
+    if offset != received_bytes:
+        raise ChunkOffsetError(received_bytes)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "r+b" if path.exists() else "wb") as out:
+        out.seek(offset)
+        out.write(data)
+        out.truncate()
+
+    end = offset + len(data)
+
+    with _running_hashes_lock:
+        running = _running_hashes.get(upload_id)
+        if offset == 0:
+            running = (0, hashlib.sha256())
+        if running is not None and running[0] == offset:
+            h = running[1]
+            h.update(data)
+            _running_hashes[upload_id] = (end, h)
+        else:
+            _running_hashes.pop(upload_id, None)
+
+    return end
+
+
+def running_sha256(upload_id: str, size: int) -> Optional[str]:
+    """
+    SHA-256 of the assembled file from the running hash, or None unless it
+    covers exactly size bytes. Consumes the running hash.
+    """
+    with _running_hashes_lock:
+        running = _running_hashes.pop(upload_id, None)
+
+    if running is not None and running[0] == size:
+        return running[1].hexdigest()
+    return None
+
+
+def forget_upload(upload_id: str):
+    with _running_hashes_lock:
+        _running_hashes.pop(upload_id, None)
@@ -0,0 +1,101 @@
+"""
+Upload files on disk: where they are kept, and copying, hashing and
+extracting them. Shared by the upload routes and the job workers.
+"""
+
+import os
+import hashlib
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO
+
+# Bytes read per iteration when streaming uploads to disk. hashlib and zlib
+# release the GIL on large buffers, so bigger chunks also parallelise better.
+UPLOAD_BUFFER_SIZE = int(os.getenv("GARMIN_UPLOAD_BUFFER_SIZE", str(1024 * 1024)))
+HASH_WORKERS = int(os.getenv("GARMIN_HASH_WORKERS", "4"))
+
+# Accepted uploads wait here until a worker has processed them. Standalone
+# workers must see the same directory.
+UPLOAD_DIR = Path(
+    os.getenv("GARMIN_UPLOAD_DIR", Path(tempfile.gettempdir()) / "happyapp-uploads")
+)
+
+# ─────────────────────────────────────────────
+# Copying and extraction
+# ─────────────────────────────────────────────
+
+def copy_and_hash(src: BinaryIO, dst: Path, buffer_size: int = UPLOAD_BUFFER_SIZE) -> str:
+    """
+    Stream src into dst, hashing bytes as they are written.
+    Returns the SHA-256 hex digest of the copied content.
+    """
+    h = hashlib.sha256()
+    with open(dst, "wb") as out:
+        while chunk := src.read(buffer_size):
+            h.update(chunk)
+            out.write(chunk)
+    return h.hexdigest()
+
+
+def file_sha256(path: Path, buffer_size: int = UPLOAD_BUFFER_SIZE) -> str:
+    """SHA-256 hex digest of a file on disk, read in buffer_size chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(buffer_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def zip_member_target(tmpdir: Path, name: str) -> Path:
+    """
+    Resolve a ZIP member name below tmpdir, dropping absolute and ".." parts
+    the same way ZipFile.extractall does.
+    """
+    parts = [
+        p for p in PurePosixPath(name.replace("\\", "/")).parts
+        if p not in ("/", ".", "..")
+    ]
+    return tmpdir.joinpath(*parts)
+
+
+def _extract_members(zip_path: Path, members: list[tuple[str, Path]]) -> list[str]:
+    # One ZipFile handle per worker; handles are not shared across threads.
+    hashes: list[str] = []
+    with zipfile.ZipFile(zip_path) as z:
+        for name, target in members:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with z.open(name) as src:
+                hashes.append(copy_and_hash(src, target))
+    return hashes
+
+
+def extract_zip(zip_path: Path, tmpdir: Path) -> list[tuple[Path, str]]:
+    """
+    Extract JSON members of a ZIP archive, hashing each while it is written.
+    Members are spread over a thread pool; decompression and hashing both
+    release the GIL.
+    """
+    with zipfile.ZipFile(zip_path) as z:
+        members = [
+            (info.filename, zip_member_target(tmpdir, info.filename))
+            for info in z.infolist()
+            if not info.is_dir() and info.filename.endswith(".json")
+        ]
+
+    if not members:
+        return []
+
+    workers = max(1, min(HASH_WORKERS, len(members)))
+    batches = [members[i::workers] for i in range(workers)]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_extract_members, [zip_path] * workers, batches)
+
+    extracted: list[tuple[Path, str]] = []
+    for batch, hashes in zip(batches, results):
+        extracted.extend(
+            (target, fh) for (_, target), fh in zip(batch, hashes)
+        )
+    return extracted
@@ -0,0 +1,606 @@
+import os
+import time
+import shutil
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+import psycopg2.extras
+
+from backend.db.connection import get_db_connection
+from backend.db.pool import POOL_MAX
+from backend.garmin.files import extract_zip, file_sha256
+from backend.garmin.chunked_uploads import expire_stale_uploads
+from backend.garmin.orchestrator import STAGES, process_garmin_upload
+from backend.storage.postgres import PostgresRepository
+
+logger = logging.getLogger("garmin.jobs")
+
+# Seconds an idle worker sleeps before polling the queue again
+POLL_INTERVAL = float(os.getenv("GARMIN_JOB_POLL_SECONDS", "5"))
+
+# Running jobs send a heartbeat this often
+HEARTBEAT_INTERVAL = float(os.getenv("GARMIN_JOB_HEARTBEAT_SECONDS", "30"))
+
+# Running jobs without a heartbeat for this long are assumed orphaned by a
+# dead worker and requeued
+JOB_TIMEOUT = int(os.getenv("GARMIN_JOB_TIMEOUT_SECONDS", "300"))
+
+# A job whose worker died this many times is failed instead of requeued,
+# so an upload that crashes workers cannot loop forever
+MAX_ATTEMPTS = int(os.getenv("GARMIN_JOB_MAX_ATTEMPTS", "3"))
+
+# Seconds between sweeps (stale jobs, abandoned chunked uploads) by each
+# worker pool
+MAINTENANCE_INTERVAL = float(os.getenv("GARMIN_JOB_MAINTENANCE_SECONDS", "60"))
+
+
+# ─────────────────────────────────────────────
+# Queue operations
+# ─────────────────────────────────────────────
+
+def track_uploads(
+    conn,
+    user_id: str,
+    all_json: list[tuple[Path, str]],
+    archives: list[tuple[Path, str, list[str]]] = (),
+) -> list[tuple[Path, str]]:
+    """
+    Record uploads as processing: JSON files, and the archives they came
+    from as (path, sha256, member hashes). Returns the JSON files not seen
+    before; the caller commits.
+
+    Archives are not part of any job. They settle from their members (see
+    Repository.settle_archives), here if those were all processed before,
+    otherwise once the jobs processing them finish.
+    """
+    uploads = PostgresRepository(conn)
+
+    # Identical content in several files only needs processing once
+    files = list({fh: (path, fh) for path, fh in all_json}.values())
+    new_hashes = uploads.record_uploads(
+        user_id, files + [(path, fh) for path, fh, _ in archives]
+    )
+
+    for _, archive_hash, members in archives:
+        if archive_hash in new_hashes:
+            uploads.record_archive_members(user_id, archive_hash, members)
+    uploads.settle_archives(
+        user_id, [fh for _, archive_hash, members in archives for fh in members]
+    )
+
+    return [(path, fh) for path, fh in files if fh in new_hashes]
+
+
+def job_files(files: list[tuple[Path, str]]) -> list[dict]:
+    """The files column of a job."""
+    return [{"path": str(path), "sha256": fh} for path, fh in files]
+
+
+def _insert_job(conn, job_id: str, user_id: str, workdir: Path, files: list[dict]):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO garmin_upload_jobs (
+                id,
+                user_id,
+                workdir,
+                files
+            )
+            VALUES (%s, %s, %s, %s);
+            """,
+            (job_id, user_id, str(workdir), psycopg2.extras.Json(files)),
+        )
+
+
+def enqueue_job(
+    conn,
+    job_id: str,
+    user_id: str,
+    workdir: Path,
+    files: list[tuple[Path, str]],
+):
+    """
+    Insert a queued job for tracked files. The caller commits, so the job
+    can be created in the same transaction as its upload records.
+    """
+    _insert_job(conn, job_id, user_id, workdir, job_files(files))
+
+
+def enqueue_assembled_upload(
+    conn,
+    job_id: str,
+    user_id: str,
+    workdir: Path,
+    path: Path,
+    sha256: Optional[str] = None,
+):
+    """
+    Insert a queued job for a file that has not been hashed, extracted or
+    tracked yet (a finalized chunked upload). The worker does all three
+    before running the pipeline; see unpack_assembled_upload. sha256 may be
+    passed when it is already known. The caller commits.
+    """
+    _insert_job(
+        conn,
+        job_id,
+        user_id,
+        workdir,
+        [{"path": str(path), "sha256": sha256, "assembled": True}],
+    )
+
+
+def claim_next_job(conn) -> Optional[dict]:
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(
+            """
+            UPDATE garmin_upload_jobs
+            SET status = 'running',
+                stage = NULL,
+                progress = 0,
+                attempts = attempts + 1,
+                started_at = now(),
+                heartbeat_at = now()
+            WHERE id = (
+                SELECT id
+                FROM garmin_upload_jobs
+                WHERE status = 'queued'
+                ORDER BY created_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, user_id, workdir, files, attempts;
+            """
+        )
+        job = cur.fetchone()
+    conn.commit()
+    return job
+
+
+# Status writes below match on (id, attempts), the claim that started the
+# run: once a job has been requeued and claimed again, the earlier run can
+# no longer report on it.
+_OWN_RUN = "id = %s AND attempts = %s AND status = 'running'"
+
+
+def update_job_stage(conn, job: dict, stage: str, progress: float, timings: dict):
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE garmin_upload_jobs
+            SET stage = %s,
+                progress = %s,
+                stage_timings = %s,
+                heartbeat_at = now()
+            WHERE {_OWN_RUN};
+            """,
+            (stage, progress, psycopg2.extras.Json(timings), job["id"], job["attempts"]),
+        )
+    conn.commit()
+
+
+def heartbeat(conn, job: dict) -> bool:
+    """Refresh the job's heartbeat; False once the run no longer owns it."""
+    with conn.cursor() as cur:
+        cur.execute(
+            f"UPDATE garmin_upload_jobs SET heartbeat_at = now() WHERE {_OWN_RUN};",
+            (job["id"], job["attempts"]),
+        )
+        owned = cur.rowcount == 1
+    conn.commit()
+    return owned
+
+
+def finish_job(
+    conn,
+    job: dict,
+    status: str,
+    timings: dict,
+    result: Optional[dict] = None,
+    error: Optional[str] = None,
+) -> bool:
+    """
+    Settle the run's job and commit, together with anything else the caller
+    wrote on conn. Returns False and rolls all of it back if the job was
+    requeued meanwhile (another run now owns it).
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE garmin_upload_jobs
+            SET status = %s,
+                stage = NULL,
+                progress = CASE WHEN %s = 'success' THEN 1 ELSE progress END,
+                stage_timings = %s,
+                result = %s,
+                error_message = %s,
+                finished_at = now()
+            WHERE {_OWN_RUN};
+            """,
+            (
+                status,
+                status,
+                psycopg2.extras.Json(timings),
+                psycopg2.extras.Json(result) if result is not None else None,
+                error,
+                job["id"],
+                job["attempts"],
+            ),
+        )
+        owned = cur.rowcount == 1
+
+    if owned:
+        conn.commit()
+    else:
+        conn.rollback()
+    return owned
+
+
+def requeue_stale_jobs(conn) -> tuple[int, int]:
+    """
+    Requeue running jobs whose heartbeat stopped JOB_TIMEOUT seconds ago,
+    or fail them (and their uploads) once they have used MAX_ATTEMPTS.
+    Returns (requeued, failed).
+    """
+    # Jobs claimed before heartbeats existed only have started_at
+    stale = (
+        "status = 'running' "
+        "AND coalesce(heartbeat_at, started_at) < now() - %s * interval '1 second'"
+    )
+
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(
+            f"""
+            UPDATE garmin_upload_jobs
+            SET status = 'failed',
+                stage = NULL,
+                error_message = %s,
+                finished_at = now()
+            WHERE {stale}
+              AND attempts >= %s
+            RETURNING id, user_id, workdir, files;
+            """,
+            (
+                f"Worker stopped responding on {MAX_ATTEMPTS} attempts",
+                JOB_TIMEOUT,
+                MAX_ATTEMPTS,
+            ),
+        )
+        failed = cur.fetchall()
+
+        cur.execute(
+            f"""
+            UPDATE garmin_upload_jobs
+            SET status = 'queued'
+            WHERE {stale};
+            """,
+            (JOB_TIMEOUT,),
+        )
+        requeued = cur.rowcount
+
+    uploads = PostgresRepository(conn)
+    for job in failed:
+        file_hashes = [f["sha256"] for f in job["files"] if f["sha256"]]
+        uploads.mark_uploads(
+            job["user_id"],
+            file_hashes,
+            "failed",
+            "Processing repeatedly stopped responding",
+        )
+        uploads.settle_archives(job["user_id"], file_hashes)
+    conn.commit()
+
+    for job in failed:
+        shutil.rmtree(job["workdir"], ignore_errors=True)
+
+    return requeued, len(failed)
+
+
+def get_job(conn, user_id: str, job_id: str) -> Optional[dict]:
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(
+            """
+            SELECT
+                id,
+                status,
+                stage,
+                progress,
+                stage_timings,
+                result,
+                error_message,
+                created_at,
+                started_at,
+                finished_at
+            FROM garmin_upload_jobs
+            WHERE id = %s
+              AND user_id = %s;
+            """,
+            (job_id, user_id),
+        )
+        return cur.fetchone()
+
+
+# ─────────────────────────────────────────────
+# Execution
+# ─────────────────────────────────────────────
+
+def unpack_assembled_upload(conn, job: dict) -> list[dict]:
+    """
+    Hash and extract a job's assembled upload, track what it contains and
+    store the resulting files on the job, all committed together. Returns
+    the job's new files column; raises if the run lost the job meanwhile.
+    """
+    [entry] = job["files"]
+    path = Path(entry["path"])
+    file_hash = entry["sha256"] or file_sha256(path)
+
+    if path.suffix == ".zip":
+        all_json = extract_zip(path, Path(job["workdir"]))
+        archives = [(path, file_hash, [fh for _, fh in all_json])]
+    else:
+        all_json = [(path, file_hash)]
+        archives = []
+
+    if not all_json:
+        raise ValueError("No JSON files found in upload")
+
+    files = job_files(track_uploads(conn, job["user_id"], all_json, archives))
+
+    with conn.cursor() as cur:
+        cur.execute(
+            f"UPDATE garmin_upload_jobs SET files = %s WHERE {_OWN_RUN};",
+            (psycopg2.extras.Json(files), job["id"], job["attempts"]),
+        )
+        owned = cur.rowcount == 1
+    if not owned:
+        conn.rollback()
+        raise RuntimeError("Job was requeued while unpacking its upload")
+    conn.commit()
+
+    if archives:
+        path.unlink(missing_ok=True)
+    return files
+
+
+def run_job(job: dict):
+    """
+    Run the Garmin pipeline for a claimed job (unpacking its assembled
+    upload first, if it has one), recording per-stage timings, then settle
+    the job's upload records and remove its working directory.
+
+    Status writes lease a connection only for as long as they take, like
+    the heartbeat; the pipeline holds the one connection a job keeps for
+    the whole run.
+    """
+    job_id = job["id"]
+    user_id = job["user_id"]
+
+    timings: dict[str, float] = {}
+    current = {"stage": None, "started": time.monotonic()}
+
+    def close_stage():
+        if current["stage"] is not None:
+            timings[current["stage"]] = round(time.monotonic() - current["started"], 3)
+
+    def on_stage(stage: str):
+        close_stage()
+        current["stage"] = stage
+        current["started"] = time.monotonic()
+        # Progress is informational; a failed update must not fail the job
+        try:
+            with get_db_connection() as conn:
+                update_job_stage(conn, job, stage, STAGES.index(stage) / len(STAGES), timings)
+        except Exception:
+            logger.warning("Could not record stage %s of job %s", stage, job_id, exc_info=True)
+
+    def settle(status: str, error: Optional[str] = None, result: Optional[dict] = None):
+        # Uploads are settled in the transaction that finishes the job, so
+        # neither happens unless this run still owns it
+        file_hashes = [f["sha256"] for f in job["files"] if f["sha256"]]
+        with get_db_connection() as conn:
+            uploads = PostgresRepository(conn)
+            uploads.mark_uploads(user_id, file_hashes, status, error)
+            uploads.settle_archives(user_id, file_hashes)
+            if finish_job(conn, job, status, timings, result=result, error=error):
+                return True
+        logger.warning("Job %s was requeued while running; discarding this run's outcome", job_id)
+        return False
+
+    beat = Heartbeat(job)
+    beat.start()
+    settled = False
+
+    try:
+        if any(f.get("assembled") for f in job["files"]):
+            with get_db_connection() as conn:
+                job = {**job, "files": unpack_assembled_upload(conn, job)}
+
+        files = [Path(f["path"]) for f in job["files"] if f["path"]]
+        if files:
+            result = process_garmin_upload(
+                user_id=user_id,
+                files=files,
+                on_stage=on_stage,
+            )
+        else:
+            # Every file inside was already processed or is being processed
+            result = {
+                "days_ingested": 0,
+                "days_changed": 0,
+                "days_predicted": 0,
+                "message": "All files were already processed",
+            }
+        close_stage()
+
+        settled = settle("success", result=result)
+        if settled:
+            logger.info("Job %s finished: %s", job_id, result)
+
+    except Exception as e:
+        close_stage()
+        logger.exception("Job %s failed", job_id)
+        settled = settle("failed", error=str(e))
+
+    finally:
+        beat.stop()
+        # Unless this run settled the job, a requeued run still needs the files
+        if settled:
+            shutil.rmtree(job["workdir"], ignore_errors=True)
+
+
+class Heartbeat:
+    """
+    Background thread refreshing a running job's heartbeat_at every
+    HEARTBEAT_INTERVAL, on short-lived connections of its own (the job's
+    connection is busy with the pipeline).
+    """
+
+    def __init__(self, job: dict):
+        self.job = job
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"garmin-job-heartbeat-{job['id']}", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                with get_db_connection() as conn:
+                    if not heartbeat(conn, self.job):
+                        return
+            except Exception:
+                # A missed beat only matters if they keep failing for JOB_TIMEOUT
+                logger.warning("Heartbeat for job %s failed", self.job["id"], exc_info=True)
+
+
+# ─────────────────────────────────────────────
+# Worker pool
+# ─────────────────────────────────────────────
+
+class JobWorkerPool:
+    """
+    Background threads that drain garmin_upload_jobs.
+
+    Workers poll the queue every POLL_INTERVAL seconds; notify() wakes them
+    immediately after an upload is enqueued in this process. Between jobs,
+    one of them sweeps stale jobs and abandoned chunked uploads every
+    MAINTENANCE_INTERVAL.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._maintenance_lock = threading.Lock()
+        self._maintained_at: Optional[float] = None
+
+    def start(self):
+        # Each running job keeps one pooled connection for the pipeline and
+        # leases another for status writes and heartbeats; with as many
+        # workers as connections they could all wait on each other
+        if self.size >= POOL_MAX:
+            raise RuntimeError(
+                f"{self.size} job workers need DB_POOL_MAX above {self.size} (it is {POOL_MAX})"
+            )
+
+        self._maintain()
+
+        for i in range(self.size):
+            t = threading.Thread(
+                target=self._loop,
+                name=f"garmin-job-worker-{i}",
+                daemon=True,
+            )
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads.clear()
+
+    def notify(self):
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                ran = self._run_once()
+            except Exception:
+                logger.exception("Job worker error")
+                ran = False
+
+            if not ran:
+                self._wake.wait(POLL_INTERVAL)
+                self._wake.clear()
+
+    def _maintain(self):
+        with self._maintenance_lock:
+            now = time.monotonic()
+            due = self._maintained_at is None or now - self._maintained_at >= MAINTENANCE_INTERVAL
+            if not due:
+                return
+            self._maintained_at = now
+
+        try:
+            with get_db_connection() as conn:
+                requeued, failed = requeue_stale_jobs(conn)
+            if requeued:
+                logger.warning("Requeued %d stale upload jobs", requeued)
+            if failed:
+                logger.warning("Failed %d upload jobs after %d attempts", failed, MAX_ATTEMPTS)
+        except Exception:
+            logger.exception("Could not sweep stale upload jobs")
+
+        try:
+            with get_db_connection() as conn:
+                expired = expire_stale_uploads(conn)
+            if expired:
+                logger.info("Expired %d abandoned chunked uploads", expired)
+        except Exception:
+            logger.exception("Could not expire abandoned chunked uploads")
+
+    def _run_once(self) -> bool:
+        self._maintain()
+        with get_db_connection() as conn:
+            job = claim_next_job(conn)
+        if job is None:
+            return False
+        run_job(job)
+        return True
+
+
+# In-process pool owned by the API (see backend.main); None when disabled
+_worker_pool: Optional[JobWorkerPool] = None
+
+
+def start_worker_pool(size: int):
+    global _worker_pool
+    if size <= 0 or _worker_pool is not None:
+        return
+    _worker_pool = JobWorkerPool(size)
+    _worker_pool.start()
+
+
+def stop_worker_pool():
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.stop(timeout=5)
+        _worker_pool = None
+
+
+def notify_workers():
+    if _worker_pool is not None:
+        _worker_pool.notify()
@@ -1,25 +1,44 @@
 from pathlib import Path
-from typing import Iterable, Tuple
+from typing import Callable, Iterable, Optional, Tuple
 
 from scripts.ingest.garmin_sleep import ingest_sleep
 from scripts.ingest.garmin_health_status import ingest_health_status
 from scripts.ingest.garmin_uds import ingest_uds
+from scripts.ingest.garmin_intraday import ingest_intraday
+from scripts.ingest.fingerprints import PendingFingerprints
 
 from scripts.compute_daily_features import compute_daily_features_for_user
 from backend.run_inference import run_inference_for_user
+from backend.storage import use_repository
+from backend.garmin.pipeline import COMMIT_STRATEGY, PipelineContext
+
+
+# Pipeline stages, in order, as reported to on_stage callbacks
+STAGES = ("ingest", "features", "inference")
 
 
 # ─────────────────────────────────────────────
 # Helpers
 # ─────────────────────────────────────────────
 
-def partition_garmin_files(files: Iterable[Path]) -> Tuple[list[Path], list[Path], list[Path]]:
+# Dedicated intraday detail files; UDS files may carry intraday arrays too
+INTRADAY_SUFFIXES = (
+    "stressData.json",
+    "heartRateData.json",
+    "bodyBatteryData.json",
+)
+
+
+def partition_garmin_files(
+    files: Iterable[Path],
+) -> Tuple[list[Path], list[Path], list[Path], list[Path]]:
     """
     Split Garmin JSON files into their respective ingestion buckets.
     """
     sleep: list[Path] = []
     health: list[Path] = []
     uds: list[Path] = []
+    intraday: list[Path] = []
 
     for path in files:
         name = path.name
@@ -30,8 +49,10 @@ def partition_garmin_files(files: Iterable[Path]) -> Tuple[list[Path], list[Path
             health.append(path)
         elif name.startswith("UDSFile_"):
             uds.append(path)
+        elif name.endswith(INTRADAY_SUFFIXES):
+            intraday.append(path)
 
-    return sleep, health, uds
+    return sleep, health, uds, intraday
 
 
 # ─────────────────────────────────────────────
@@ -42,18 +63,29 @@ def process_garmin_upload(
     *,
     user_id: str,
     files: Iterable[Path],
+    on_stage: Optional[Callable[[str], None]] = None,
+    repo=None,
+    commit_strategy: str = COMMIT_STRATEGY,
 ) -> dict:
     """
     End-to-end Garmin ingestion pipeline for a single user.
 
     Steps:
-      1. Ingest raw Garmin JSON files
-      2. Compute daily features
+      1. Ingest raw Garmin JSON files (unchanged days are skipped)
+      2. Compute daily features for days affected by changed data, then
+         record the ingested days' fingerprints
       3. Run mood inference
 
+    on_stage, if given, is called with each name in STAGES as that stage
+    starts, so callers can report progress.
+
+    All stages share one repository (repo, or one opened here) through a
+    PipelineContext; commit_strategy decides when their work is committed.
+
     Returns:
       {
         "days_ingested": int,
+        "days_changed": int,
         "days_predicted": int
       }
     """
@@ -62,29 +94,60 @@ def process_garmin_upload(
     if not files:
         return {
             "days_ingested": 0,
+            "days_changed": 0,
             "days_predicted": 0,
         }
 
+    if repo is None:
+        with use_repository() as repo:
+            return process_garmin_upload(
+                user_id=user_id,
+                files=files,
+                on_stage=on_stage,
+                repo=repo,
+                commit_strategy=commit_strategy,
+            )
+
     # 1️⃣ Partition files
-    sleep_files, health_files, uds_files = partition_garmin_files(files)
+    sleep_files, health_files, uds_files, intraday_files = partition_garmin_files(files)
+
+    ctx = PipelineContext(repo, commit_strategy, on_stage)
 
-    # 2️⃣ Ingest
-    if sleep_files:
-        ingest_sleep(sleep_files, user_id)
+    # 2️⃣ Ingest (collects the days whose raw data actually changed)
+    changed_dates: set = set()
+    pending = PendingFingerprints()
 
-    if health_files:
-        ingest_health_status(health_files, user_id)
+    with ctx.stage("ingest"):
+        if sleep_files:
+            changed_dates |= ingest_sleep(sleep_files, user_id, repo=repo, pending=pending)
 
-    if uds_files:
-        ingest_uds(uds_files, user_id)
+        if health_files:
+            changed_dates |= ingest_health_status(
+                health_files, user_id, repo=repo, pending=pending
+            )
 
-    # 3️⃣ Compute features
-    compute_daily_features_for_user(user_id)
+        if uds_files:
+            changed_dates |= ingest_uds(uds_files, user_id, repo=repo, pending=pending)
+
+        # Intraday series do not feed daily features (yet)
+        if intraday_files:
+            ingest_intraday(intraday_files, user_id, repo=repo, pending=pending)
+
+    # 3️⃣ Compute features. Fingerprints are recorded in the same stage, so
+    # they are never committed without the features of their days.
+    with ctx.stage("features"):
+        if changed_dates:
+            compute_daily_features_for_user(user_id, changed_dates, repo=repo)
+        pending.record(repo, user_id)
 
     # 4️⃣ Run inference
-    days_predicted = run_inference_for_user(user_id)
+    with ctx.stage("inference"):
+        days_predicted = run_inference_for_user(user_id, repo=repo)
+
+    ctx.finish()
 
     return {
         "days_ingested": len(files),
+        "days_changed": len(changed_dates),
         "days_predicted": days_predicted,
     }
@@ -0,0 +1,52 @@
+import os
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+# When pipeline work is committed:
+#   "end"   - once, after the last stage; a failure leaves nothing behind
+#   "stage" - after every stage; a failure keeps earlier stages' rows. Day
+#             fingerprints are only committed with the features stage, so
+#             a rerun reprocesses every day whose features were not written
+#   "none"  - never; the caller owns the transaction
+COMMIT_STRATEGIES = ("end", "stage", "none")
+
+COMMIT_STRATEGY = os.getenv("GARMIN_PIPELINE_COMMIT", "end")
+
+
+class PipelineContext:
+    """
+    One repository (and so one connection) carried through every stage of
+    a pipeline run.
+
+    Each stage runs inside a savepoint: a failing stage is rolled back to
+    where it started, leaving the transaction usable, before its error
+    propagates. Commits follow commit_strategy (see COMMIT_STRATEGIES).
+    """
+
+    def __init__(
+        self,
+        repo,
+        commit_strategy: str = COMMIT_STRATEGY,
+        on_stage: Optional[Callable[[str], None]] = None,
+    ):
+        if commit_strategy not in COMMIT_STRATEGIES:
+            raise ValueError(f"Unknown commit strategy: {commit_strategy!r}")
+
+        self.repo = repo
+        self.commit_strategy = commit_strategy
+        self.on_stage = on_stage
+
+    @contextmanager
+    def stage(self, name: str):
+        if self.on_stage is not None:
+            self.on_stage(name)
+
+        with self.repo.savepoint(f"stage_{name}"):
+            yield self.repo
+
+        if self.commit_strategy == "stage":
+            self.repo.commit()
+
+    def finish(self):
+        if self.commit_strategy == "end":
+            self.repo.commit()
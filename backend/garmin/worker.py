@@ -0,0 +1,46 @@
+"""
+Standalone Garmin upload worker.
+
+    python -m backend.garmin.worker
+
+Drains garmin_upload_jobs alongside (or instead of) the API's in-process
+workers. Needs the same GARMIN_UPLOAD_DIR as the API, since jobs refer to
+files the API wrote there.
+"""
+
+import os
+import sys
+import signal
+import logging
+import threading
+
+from backend.garmin.jobs import JobWorkerPool
+from backend.storage import STORAGE_BACKEND
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(message)s",
+)
+
+
+def main():
+    if STORAGE_BACKEND != "postgres":
+        sys.exit(f"The job queue needs the postgres storage backend (STORAGE_BACKEND={STORAGE_BACKEND})")
+
+    size = int(os.getenv("GARMIN_JOB_WORKERS", "2"))
+    stopped = threading.Event()
+
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+
+    pool = JobWorkerPool(size)
+    pool.start()
+    logging.info("Started %d Garmin job workers", size)
+
+    stopped.wait()
+    logging.info("Stopping Garmin job workers")
+    pool.stop()
+
+
+if __name__ == "__main__":
+    main()
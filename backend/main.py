@@ -1,8 +1,41 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.api.routes import today, history, mood, garmin
+from backend.api.routes import today, history, mood, dashboard, export, garmin, async_reads
+from backend.api.response_cache import response_cache
+from backend.auth.supabase import key_set
+from backend.db.async_pool import async_pool_stats, async_read_pool_stats, close_async_pool
+from backend.db.pool import close_pool, pool_stats, read_pool_stats
+from backend.db.replica import router as replica_router
+from backend.garmin.jobs import start_worker_pool, stop_worker_pool
+from backend.storage import STORAGE_BACKEND
+
+# Upload workers run inside the API process unless set to 0, e.g. when
+# `python -m backend.garmin.worker` runs separately.
+INPROCESS_JOB_WORKERS = int(os.getenv("GARMIN_INPROCESS_WORKERS", "2"))
+
+# Serve /today, /history, GET /mood and /dashboard from async handlers on
+# the asyncpg pool instead of sync handlers on Starlette's threadpool
+ASYNC_READS = os.getenv("DB_ASYNC_READS", "0") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fetch the JWKS before the first request needs it, then keep it fresh
+    key_set.start()
+    # The job queue lives in Postgres; on SQLite /garmin answers 501 instead
+    if STORAGE_BACKEND == "postgres":
+        start_worker_pool(INPROCESS_JOB_WORKERS)
+    yield
+    stop_worker_pool()
+    key_set.stop()
+    close_pool()
+    await close_async_pool()
 
-app = FastAPI(title="Garmin → Mood API")
+
+app = FastAPI(title="Garmin → Mood API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,11 +48,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Starlette matches routes in registration order, so the async read routes
+# must be included first to take precedence over their sync counterparts
+if ASYNC_READS:
+    app.include_router(async_reads.router)
+
 app.include_router(today.router)
 app.include_router(history.router)
 app.include_router(mood.router)
+app.include_router(dashboard.router)
+app.include_router(export.router)
 app.include_router(garmin.router)
 
 @app.get("/")
 def read_root():
     return {"status": "ok"}
+
+@app.get("/health/db")
+def db_health():
+    # Pool metrics; null until the first request opens the pool (or, for
+    # the read pools, when DATABASE_READ_URL is not set)
+    return {
+        "pool": pool_stats(),
+        "read_pool": read_pool_stats(),
+        "async_pool": async_pool_stats(),
+        "async_read_pool": async_read_pool_stats(),
+        "replica_routing": replica_router.stats(),
+    }
+
+@app.get("/health/cache")
+def cache_health():
+    # Response cache size and per-route hit ratios
+    return response_cache.stats()
+
+@app.get("/health/auth")
+def auth_health():
+    # JWKS refresh state: key count, age and fetch / rate-limit counters
+    return key_set.stats()
@@ -1,15 +1,16 @@
-from backend.db.connection import get_db_connection
-from backend.db.fetch_features import fetch_unpredicted_days
-from backend.db.insert_prediction import insert_prediction
+from backend.storage import use_repository
 from backend.inference.infer import infer_mood
 
 
-def run_inference_for_user(user_id: str) -> int:
-    conn = get_db_connection()
+def run_inference_for_user(user_id: str, repo=None) -> int:
+    """
+    Predict mood for every featurised day without a prediction yet and
+    return how many were written. A passed-in repo is left uncommitted.
+    """
+    count = 0
 
-    try:
-        rows = fetch_unpredicted_days(conn, user_id)
-        count = 0
+    with use_repository(repo) as repo:
+        rows = repo.fetch_unpredicted_days(user_id)
 
         for row in rows:
             result = infer_mood(row)
@@ -23,15 +24,12 @@ def run_inference_for_user(user_id: str) -> int:
                 "model_version": result["model_version"],
             }
 
-            insert_prediction(conn, prediction)
+            repo.insert_prediction(prediction)
             count += 1
 
             print(f"✔ Predicted {row['date']} → mood {result['predicted_mood']}")
 
-        conn.commit()
-    finally:
-        conn.close()
-        return count
+    return count
 
 def main():
     USER_ID = "b1101f5b-a68d-4cb9-bf48-bfc4697a761a"
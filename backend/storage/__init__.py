@@ -0,0 +1,79 @@
+"""
+Storage backends behind one Repository interface.
+
+STORAGE_BACKEND selects the implementation:
+  postgres (default) - pooled connections to DATABASE_URL
+  sqlite             - an embedded database file at STORAGE_SQLITE_PATH,
+                       for local runs and benchmarks without Postgres
+
+Read-only work should use use_read_repository(), which on Postgres may be
+served by the read replica (see backend.db.replica).
+
+The upload job queue, chunked uploads, async reads and partition
+maintenance use Postgres features directly and stay Postgres-only.
+"""
+
+import os
+from contextlib import contextmanager
+from typing import Optional
+
+from backend.db.connection import get_db_connection, get_read_connection
+from backend.db.replica import mark_user_write
+from backend.storage.base import Repository, add_commit_listener
+from backend.storage.postgres import PostgresRepository
+from backend.storage.sqlite import SQLiteRepository, connect
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "postgres")
+SQLITE_PATH = os.getenv("STORAGE_SQLITE_PATH", "happyapp.sqlite3")
+
+
+def _stick_to_primary(user_ids: set[str]):
+    # Users who just committed read from the primary until the replica catches up
+    for user_id in user_ids:
+        mark_user_write(user_id)
+
+
+add_commit_listener(_stick_to_primary)
+
+
+@contextmanager
+def use_repository(repo: Optional[Repository] = None):
+    """
+    Yield repo if the caller passed one, leaving the transaction to them.
+    Otherwise open a repository on the configured backend and commit it
+    when the block succeeds (it is rolled back if the block raises).
+    """
+    if repo is not None:
+        yield repo
+        return
+
+    if STORAGE_BACKEND == "sqlite":
+        conn = connect(SQLITE_PATH)
+        try:
+            repo = SQLiteRepository(conn)
+            yield repo
+            repo.commit()
+        finally:
+            conn.close()
+        return
+
+    with get_db_connection() as conn:
+        repo = PostgresRepository(conn)
+        yield repo
+        repo.commit()
+
+
+@contextmanager
+def use_read_repository(user_id: Optional[str] = None):
+    """
+    Open a repository for reads on behalf of user_id. On Postgres it sits
+    on a replica connection when one is configured and fresh enough for
+    that user; nothing is committed, so it must not be written through.
+    """
+    if STORAGE_BACKEND == "sqlite":
+        with use_repository() as repo:
+            yield repo
+        return
+
+    with get_read_connection(user_id) as conn:
+        yield PostgresRepository(conn)
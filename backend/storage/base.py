@@ -0,0 +1,368 @@
+import logging
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Iterator, Optional, TextIO
+
+logger = logging.getLogger("storage")
+
+# Called after each commit with the ids of users whose predictions, mood
+# labels or features it changed (caches, replica stickiness)
+_commit_listeners: list[Callable[[set[str]], None]] = []
+
+
+def add_commit_listener(listener: Callable[[set[str]], None]):
+    _commit_listeners.append(listener)
+
+
+# Rollup periods (mood_rollups.granularity); weeks start on Monday
+GRANULARITIES = ("week", "month")
+
+# daily_features columns averaged per period, as <column>_avg
+ROLLUP_FEATURES = (
+    "sleep_debt_minutes",
+    "hrv_rmssd_zscore",
+    "resting_hr_delta",
+    "stress_percentile",
+    "steps_vs_baseline_pct",
+)
+
+
+def period_start(granularity: str, day: date) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def period_end(granularity: str, day: date) -> date:
+    if granularity == "week":
+        return period_start("week", day) + timedelta(days=6)
+    next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+# error_message of an archive upload settled as failed by one of its files
+ARCHIVE_FAILED_MESSAGE = "A file in this archive failed to process"
+
+
+# Tables in a user's full export (/export) as (table, columns), joined into
+# one row per day. Column names are unique across tables.
+EXPORT_TABLES = (
+    ("sleep_summary", (
+        "total_sleep_minutes",
+        "deep_sleep_minutes",
+        "light_sleep_minutes",
+        "rem_sleep_minutes",
+        "awake_minutes",
+        "sleep_score",
+        "bedtime",
+        "wake_time",
+    )),
+    ("daily_physiology", ("resting_hr", "respiration_rate", "hrv_rmssd")),
+    ("daily_activity", ("steps", "active_minutes", "calories_burned", "distance_meters")),
+    ("daily_stress_summary", (
+        "avg_stress",
+        "max_stress",
+        "stress_duration",
+        "rest_duration",
+        "activity_duration",
+        "total_duration",
+    )),
+    ("daily_features", (
+        "sleep_debt_minutes",
+        "sleep_vs_baseline_pct",
+        "hrv_rmssd_zscore",
+        "resting_hr_delta",
+        "stress_percentile",
+        "steps_vs_baseline_pct",
+        "active_minutes_delta",
+        "baseline_window_days",
+    )),
+    ("predictions", ("predicted_mood", "confidence", "explanation", "model_version")),
+    ("mood_labels", ("mood", "note")),
+)
+
+EXPORT_COLUMNS = ("date",) + tuple(c for _, columns in EXPORT_TABLES for c in columns)
+
+
+class Repository(ABC):
+    """
+    Data access for the ingest → features → inference pipeline and the API,
+    bound to one connection and transaction.
+
+    Nothing is committed until commit(); obtain repositories through
+    backend.storage.use_repository, which commits for you when it owns the
+    connection. Row shapes follow the Postgres tables (see migrations):
+    dict rows for pipeline data, tuples for the API read paths.
+    """
+
+    def __init__(self):
+        self._changed_users: set[str] = set()
+        # user_id → (first, last) day whose rollups need recomputing
+        self._rollup_ranges: dict[str, tuple[date, date]] = {}
+
+    # ── unit of work ───────────────────────────
+
+    def commit(self):
+        """
+        Bring the rollups of changed days up to date, commit, then tell
+        commit listeners which users changed.
+        """
+        self._refresh_pending_rollups()
+        self._commit()
+        changed, self._changed_users = self._changed_users, set()
+        if not changed:
+            return
+
+        for listener in _commit_listeners:
+            try:
+                listener(changed)
+            except Exception:
+                # The data is committed; a failed listener must not undo that
+                logger.exception("Commit listener %r failed", listener)
+
+    def rollback(self):
+        self._rollback()
+        self._changed_users = set()
+        self._rollup_ranges = {}
+
+    def _mark_changed(self, user_id: str, *days: date):
+        """
+        Report user_id to commit listeners once the transaction commits,
+        and recompute the rollups of the periods containing days first.
+        """
+        user_id = str(user_id)
+        self._changed_users.add(user_id)
+        if not days:
+            return
+
+        first, last = min(days), max(days)
+        if user_id in self._rollup_ranges:
+            known_first, known_last = self._rollup_ranges[user_id]
+            first, last = min(first, known_first), max(last, known_last)
+        self._rollup_ranges[user_id] = (first, last)
+
+    def _refresh_pending_rollups(self):
+        ranges, self._rollup_ranges = self._rollup_ranges, {}
+        for user_id, (first, last) in ranges.items():
+            for granularity in GRANULARITIES:
+                self.refresh_rollups(
+                    user_id,
+                    granularity,
+                    period_start(granularity, first),
+                    period_end(granularity, last),
+                )
+
+    @abstractmethod
+    def _commit(self):
+        ...
+
+    @abstractmethod
+    def _rollback(self):
+        ...
+
+    @abstractmethod
+    def _execute(self, statement: str):
+        """Run a parameterless statement (transaction control)."""
+
+    @contextmanager
+    def savepoint(self, name: str):
+        """
+        Roll back to where the block started if it raises; the transaction
+        stays usable either way.
+        """
+        self._execute(f"SAVEPOINT {name}")
+        try:
+            yield
+        except Exception:
+            self._execute(f"ROLLBACK TO SAVEPOINT {name}")
+            raise
+        self._execute(f"RELEASE SAVEPOINT {name}")
+
+    # ── raw Garmin data ───────────────────────
+
+    @abstractmethod
+    def fetch_fingerprints(self, user_id: str, source: str, days: list[str]) -> dict[str, str]:
+        """Stored day fingerprints, keyed by ISO date."""
+
+    @abstractmethod
+    def upsert_fingerprints(self, user_id: str, source: str, fingerprints: dict[str, str]):
+        ...
+
+    @abstractmethod
+    def upsert_sleep(self, rows: list[dict]):
+        ...
+
+    @abstractmethod
+    def upsert_physiology(self, rows: list[dict]):
+        ...
+
+    @abstractmethod
+    def upsert_activity(self, rows: list[dict]):
+        ...
+
+    @abstractmethod
+    def upsert_stress_summaries(self, rows: list[dict]):
+        ...
+
+    @abstractmethod
+    def upsert_body_battery_summaries(self, rows: list[dict]):
+        ...
+
+    @abstractmethod
+    def upsert_intraday(self, rows: list[dict]):
+        ...
+
+    @abstractmethod
+    def fetch_intraday_rows(
+        self, user_id: str, metric: str, start: date, end: date
+    ) -> list[tuple]:
+        """(start_ts, sample_count, payload) rows for [start, end], by date."""
+
+    # ── features ──────────────────────────────
+
+    @abstractmethod
+    def fetch_user_ids(self) -> list[str]:
+        ...
+
+    @abstractmethod
+    def fetch_raw_dates(self, user_id: str) -> list[date]:
+        """Union of all dates where any raw data exists, ascending."""
+
+    @abstractmethod
+    def fetch_baseline(self, user_id: str, start: date, end: date) -> list[dict]:
+        """Raw inputs for every day with data in [start, end)."""
+
+    @abstractmethod
+    def fetch_day(self, user_id: str, day: date) -> dict:
+        """Raw inputs for one day ({} values are None when missing)."""
+
+    @abstractmethod
+    def upsert_features(self, user_id: str, day: date, features: dict):
+        ...
+
+    # ── predictions ───────────────────────────
+
+    @abstractmethod
+    def fetch_unpredicted_days(self, user_id: str) -> list[dict]:
+        ...
+
+    @abstractmethod
+    def insert_prediction(self, prediction: dict):
+        ...
+
+    @abstractmethod
+    def fetch_prediction(self, user_id: str, day: date) -> Optional[tuple]:
+        """(predicted_mood, confidence, explanation, model_version) or None."""
+
+    @abstractmethod
+    def fetch_predictions(self, user_id: str, start: date, end: date) -> list[tuple]:
+        """(date, predicted_mood, confidence, explanation) rows, by date."""
+
+    @abstractmethod
+    def fetch_predictions_version(
+        self, user_id: str, start: date, end: date
+    ) -> tuple[int, Optional[datetime]]:
+        """(row count, newest created_at) for the range; changes on any write."""
+
+    # ── mood labels ───────────────────────────
+
+    @abstractmethod
+    def upsert_mood(self, user_id: str, day: date, mood: int, note: Optional[str]) -> tuple:
+        """Returns the stored (date, mood, note, created_at)."""
+
+    @abstractmethod
+    def upsert_moods(
+        self, user_id: str, entries: list[tuple[date, int, Optional[str]]]
+    ) -> list[tuple]:
+        """
+        Upsert (date, mood, note) entries, whose dates must be distinct, in
+        one statement. Returns (date, mood, note, created_at, inserted) per
+        entry, in entry order; inserted is False for a replaced label.
+        """
+
+    @abstractmethod
+    def fetch_moods(self, user_id: str, start: date, end: date) -> list[tuple]:
+        """(date, mood, note, created_at) rows, by date."""
+
+    @abstractmethod
+    def fetch_moods_version(
+        self, user_id: str, start: date, end: date
+    ) -> tuple[int, Optional[datetime]]:
+        """(row count, newest created_at) for the range; changes on any write."""
+
+    @abstractmethod
+    def import_mood_labels(self, f: TextIO, user_id: Optional[str] = None) -> dict:
+        """Bulk CSV import; see scripts.ingest.mood_labels for the report."""
+
+    # ── dashboard ─────────────────────────────
+
+    @abstractmethod
+    def fetch_dashboard(self, user_id: str, start: date, end: date) -> list[tuple]:
+        """
+        (date, predicted_mood, confidence, explanation, mood, note) for every
+        day in the range, by date, from one query; None where nothing is stored.
+        """
+
+    # ── rollups ───────────────────────────────
+
+    @abstractmethod
+    def refresh_rollups(self, user_id: str, granularity: str, first: date, last: date):
+        """
+        Recompute the user's mood_rollups rows for the periods in first..last,
+        which must be whole periods. Called for changed days before commit.
+        """
+
+    @abstractmethod
+    def fetch_rollups(self, user_id: str, granularity: str, start: date, end: date) -> list[tuple]:
+        """
+        (period_start, predicted_days, predicted_mood_avg, mood_days, mood_avg,
+        feature_days, *feature averages in ROLLUP_FEATURES order) rows for
+        periods starting in start..end, by period.
+        """
+
+    # ── export ────────────────────────────────
+
+    @abstractmethod
+    def export_batches(self, user_id: str, batch_size: int) -> Iterator[list[tuple]]:
+        """
+        Every day with any stored data for the user, by date, as rows of
+        EXPORT_COLUMNS in batches of at most batch_size. Rows are read
+        incrementally, so the repository stays in use until exhausted.
+        """
+
+    # ── upload tracking ───────────────────────
+
+    @abstractmethod
+    def record_uploads(self, user_id: str, uploads: list[tuple[Path, str]]) -> set[str]:
+        """
+        Track (path, sha256) uploads; returns hashes that are new or being
+        retried after a failure.
+        """
+
+    @abstractmethod
+    def mark_uploads(
+        self,
+        user_id: str,
+        file_hashes: list[str],
+        status: str,
+        error: Optional[str] = None,
+    ):
+        ...
+
+    @abstractmethod
+    def fetch_known_hashes(self, user_id: str, file_hashes: list[str]) -> set[str]:
+        """Hashes already uploaded by this user, excluding failed ones."""
+
+    @abstractmethod
+    def record_archive_members(self, user_id: str, archive_hash: str, member_hashes: list[str]):
+        """Remember which JSON files (by hash) an uploaded archive contains."""
+
+    @abstractmethod
+    def settle_archives(self, user_id: str, member_hashes: list[str]):
+        """
+        Settle processing archives that contain any of member_hashes from
+        their members' status: failed once a member failed, success once
+        all members succeeded, otherwise left processing.
+        """
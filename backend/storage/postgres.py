@@ -0,0 +1,975 @@
+from pathlib import Path
+from typing import Optional, TextIO
+
+import psycopg2.extras
+
+from backend.storage.base import (
+    ARCHIVE_FAILED_MESSAGE,
+    EXPORT_TABLES,
+    ROLLUP_FEATURES,
+    Repository,
+)
+from scripts.ingest.mood_labels import import_mood_labels
+
+
+# ─────────────────────────────────────────────
+# SQL
+# ─────────────────────────────────────────────
+
+FINGERPRINT_SELECT_SQL = """
+SELECT date, fingerprint
+FROM garmin_record_fingerprints
+WHERE user_id = %s
+  AND source = %s
+  AND date = ANY(%s::date[]);
+"""
+
+FINGERPRINT_UPSERT_SQL = """
+INSERT INTO garmin_record_fingerprints (
+  user_id,
+  source,
+  date,
+  fingerprint
+)
+VALUES %s
+ON CONFLICT (user_id, source, date)
+DO UPDATE SET
+  fingerprint = EXCLUDED.fingerprint,
+  updated_at = now();
+"""
+
+SLEEP_UPSERT_SQL = """
+INSERT INTO sleep_summary (
+  user_id,
+  date,
+  total_sleep_minutes,
+  deep_sleep_minutes,
+  light_sleep_minutes,
+  rem_sleep_minutes,
+  awake_minutes,
+  sleep_score,
+  bedtime,
+  wake_time,
+  source
+)
+VALUES (
+  %(user_id)s,
+  %(date)s,
+  %(total_sleep_minutes)s,
+  %(deep_sleep_minutes)s,
+  %(light_sleep_minutes)s,
+  %(rem_sleep_minutes)s,
+  %(awake_minutes)s,
+  %(sleep_score)s,
+  %(bedtime)s,
+  %(wake_time)s,
+  %(source)s
+)
+ON CONFLICT (user_id, date)
+DO UPDATE SET
+  total_sleep_minutes = EXCLUDED.total_sleep_minutes,
+  deep_sleep_minutes = EXCLUDED.deep_sleep_minutes,
+  light_sleep_minutes = EXCLUDED.light_sleep_minutes,
+  rem_sleep_minutes = EXCLUDED.rem_sleep_minutes,
+  awake_minutes = EXCLUDED.awake_minutes,
+  sleep_score = EXCLUDED.sleep_score,
+  bedtime = EXCLUDED.bedtime,
+  wake_time = EXCLUDED.wake_time,
+  source = EXCLUDED.source;
+"""
+
+PHYSIOLOGY_UPSERT_SQL = """
+INSERT INTO daily_physiology (
+  user_id,
+  date,
+  resting_hr,
+  respiration_rate,
+  hrv_rmssd,
+  source
+)
+VALUES (
+  %(user_id)s,
+  %(date)s,
+  %(resting_hr)s,
+  %(respiration_rate)s,
+  %(hrv_rmssd)s,
+  %(source)s
+)
+ON CONFLICT (user_id, date)
+DO UPDATE SET
+  resting_hr = COALESCE(EXCLUDED.resting_hr, daily_physiology.resting_hr),
+  respiration_rate = COALESCE(EXCLUDED.respiration_rate, daily_physiology.respiration_rate),
+  hrv_rmssd = COALESCE(EXCLUDED.hrv_rmssd, daily_physiology.hrv_rmssd),
+  source = EXCLUDED.source;
+"""
+
+ACTIVITY_UPSERT_SQL = """
+INSERT INTO daily_activity (
+  user_id,
+  date,
+  steps,
+  active_minutes,
+  calories_burned,
+  distance_meters,
+  source
+)
+VALUES (
+  %(user_id)s,
+  %(date)s,
+  %(steps)s,
+  %(active_minutes)s,
+  %(calories_burned)s,
+  %(distance_meters)s,
+  %(source)s
+)
+ON CONFLICT (user_id, date)
+DO UPDATE SET
+  steps = COALESCE(EXCLUDED.steps, daily_activity.steps),
+  active_minutes = COALESCE(EXCLUDED.active_minutes, daily_activity.active_minutes),
+  calories_burned = COALESCE(EXCLUDED.calories_burned, daily_activity.calories_burned),
+  distance_meters = COALESCE(EXCLUDED.distance_meters, daily_activity.distance_meters),
+  source = EXCLUDED.source;
+"""
+
+STRESS_UPSERT_SQL = """
+INSERT INTO daily_stress_summary (
+  user_id,
+  date,
+  avg_stress,
+  max_stress,
+  stress_duration,
+  rest_duration,
+  activity_duration,
+  total_duration,
+  agg_types,
+  agg_avg_stress,
+  agg_max_stress,
+  agg_stress_duration,
+  agg_rest_duration,
+  agg_activity_duration,
+  agg_total_duration
+)
+VALUES %s
+ON CONFLICT (user_id, date)
+DO UPDATE SET
+  avg_stress = EXCLUDED.avg_stress,
+  max_stress = EXCLUDED.max_stress,
+  stress_duration = EXCLUDED.stress_duration,
+  rest_duration = EXCLUDED.rest_duration,
+  activity_duration = EXCLUDED.activity_duration,
+  total_duration = EXCLUDED.total_duration,
+  agg_types = EXCLUDED.agg_types,
+  agg_avg_stress = EXCLUDED.agg_avg_stress,
+  agg_max_stress = EXCLUDED.agg_max_stress,
+  agg_stress_duration = EXCLUDED.agg_stress_duration,
+  agg_rest_duration = EXCLUDED.agg_rest_duration,
+  agg_activity_duration = EXCLUDED.agg_activity_duration,
+  agg_total_duration = EXCLUDED.agg_total_duration;
+"""
+
+STRESS_TEMPLATE = """(
+  %(user_id)s,
+  %(date)s,
+  %(avg_stress)s,
+  %(max_stress)s,
+  %(stress_duration)s,
+  %(rest_duration)s,
+  %(activity_duration)s,
+  %(total_duration)s,
+  %(agg_types)s::text[],
+  %(agg_avg_stress)s::smallint[],
+  %(agg_max_stress)s::smallint[],
+  %(agg_stress_duration)s::integer[],
+  %(agg_rest_duration)s::integer[],
+  %(agg_activity_duration)s::integer[],
+  %(agg_total_duration)s::integer[]
+)"""
+
+BODY_BATTERY_UPSERT_SQL = """
+INSERT INTO daily_body_battery_summary (
+  user_id,
+  date,
+  stat_types,
+  stat_values,
+  stat_timestamps
+)
+VALUES %s
+ON CONFLICT (user_id, date)
+DO UPDATE SET
+  stat_types = EXCLUDED.stat_types,
+  stat_values = EXCLUDED.stat_values,
+  stat_timestamps = EXCLUDED.stat_timestamps;
+"""
+
+BODY_BATTERY_TEMPLATE = """(
+  %(user_id)s,
+  %(date)s,
+  %(stat_types)s::text[],
+  %(stat_values)s::smallint[],
+  %(stat_timestamps)s::timestamp[]
+)"""
+
+INTRADAY_UPSERT_SQL = """
+INSERT INTO intraday_series (
+  user_id,
+  metric,
+  date,
+  start_ts,
+  sample_count,
+  payload
+)
+VALUES %s
+ON CONFLICT (user_id, metric, date)
+DO UPDATE SET
+  start_ts = EXCLUDED.start_ts,
+  sample_count = EXCLUDED.sample_count,
+  payload = EXCLUDED.payload;
+"""
+
+INTRADAY_SQL = """
+SELECT start_ts, sample_count, payload
+FROM intraday_series
+WHERE user_id = %s
+  AND metric = %s
+  AND date BETWEEN %s AND %s
+ORDER BY date;
+"""
+
+BASELINE_SQL = """
+SELECT
+    d.date,
+    ss.total_sleep_minutes,
+    dp.hrv_rmssd,
+    dp.resting_hr,
+    da.steps,
+    da.active_minutes,
+    ds.avg_stress
+FROM (
+    SELECT date FROM sleep_summary WHERE user_id = %s
+    UNION
+    SELECT date FROM daily_physiology WHERE user_id = %s
+    UNION
+    SELECT date FROM daily_activity WHERE user_id = %s
+    UNION
+    SELECT date FROM daily_stress_summary WHERE user_id = %s
+) d
+LEFT JOIN sleep_summary ss
+    ON ss.user_id = %s AND ss.date = d.date
+LEFT JOIN daily_physiology dp
+    ON dp.user_id = %s AND dp.date = d.date
+LEFT JOIN daily_activity da
+    ON da.user_id = %s AND da.date = d.date
+LEFT JOIN daily_stress_summary ds
+    ON ds.user_id = %s
+   AND ds.date = d.date
+WHERE d.date >= %s
+  AND d.date < %s
+ORDER BY d.date;
+"""
+
+UNPREDICTED_DAYS_SQL = """
+SELECT
+    user_id,
+    date,
+    sleep_debt_minutes,
+    sleep_vs_baseline_pct,
+    hrv_rmssd_zscore,
+    resting_hr_delta,
+    stress_percentile,
+    steps_vs_baseline_pct,
+    active_minutes_delta
+FROM daily_features df
+WHERE user_id = %s
+  AND NOT EXISTS (
+    SELECT 1 FROM predictions p
+    WHERE p.user_id = df.user_id
+      AND p.date = df.date
+  )
+ORDER BY date;
+"""
+
+TODAY_SQL = """
+    SELECT predicted_mood, confidence, explanation, model_version
+    FROM predictions
+    WHERE user_id = %s
+      AND date = %s
+    LIMIT 1
+"""
+
+HISTORY_SQL = """
+    SELECT date, predicted_mood::float, confidence, explanation
+    FROM predictions
+    WHERE user_id = %s
+      AND date BETWEEN %s AND %s
+    ORDER BY date
+"""
+
+MOOD_HISTORY_SQL = """
+    SELECT date, mood, note, created_at
+    FROM mood_labels
+    WHERE user_id = %s
+      AND date BETWEEN %s AND %s
+    ORDER BY date
+"""
+
+# One row per day of the range, whether or not anything is stored for it
+DASHBOARD_SQL = """
+    SELECT
+        day::date,
+        p.predicted_mood::float,
+        p.confidence,
+        p.explanation,
+        m.mood,
+        m.note
+    FROM generate_series(%s::date, %s::date, interval '1 day') AS day
+    LEFT JOIN predictions p
+      ON p.user_id = %s
+     AND p.date = day::date
+    LEFT JOIN mood_labels m
+      ON m.user_id = %s
+     AND m.date = day::date
+    ORDER BY day
+"""
+
+# Recompute a user's rollups for the whole periods in first..last from the
+# daily tables (see Repository.refresh_rollups)
+ROLLUP_REFRESH_SQL = """
+WITH days AS (
+    SELECT date FROM predictions
+    WHERE user_id = %(user_id)s AND date BETWEEN %(first)s AND %(last)s
+    UNION
+    SELECT date FROM mood_labels
+    WHERE user_id = %(user_id)s AND date BETWEEN %(first)s AND %(last)s
+    UNION
+    SELECT date FROM daily_features
+    WHERE user_id = %(user_id)s AND date BETWEEN %(first)s AND %(last)s
+)
+INSERT INTO mood_rollups (
+    user_id,
+    granularity,
+    period_start,
+    predicted_days,
+    predicted_mood_avg,
+    mood_days,
+    mood_avg,
+    feature_days,
+    {feature_columns}
+)
+SELECT
+    %(user_id)s::uuid,
+    %(granularity)s::text,
+    date_trunc(%(granularity)s, d.date)::date,
+    count(p.date),
+    avg(p.predicted_mood)::float8,
+    count(m.date),
+    avg(m.mood)::float8,
+    count(f.date),
+    {feature_averages}
+FROM days d
+LEFT JOIN predictions p
+  ON p.user_id = %(user_id)s AND p.date = d.date
+LEFT JOIN mood_labels m
+  ON m.user_id = %(user_id)s AND m.date = d.date
+LEFT JOIN daily_features f
+  ON f.user_id = %(user_id)s AND f.date = d.date
+GROUP BY 3
+ON CONFLICT (user_id, granularity, period_start) DO UPDATE SET
+    predicted_days = EXCLUDED.predicted_days,
+    predicted_mood_avg = EXCLUDED.predicted_mood_avg,
+    mood_days = EXCLUDED.mood_days,
+    mood_avg = EXCLUDED.mood_avg,
+    feature_days = EXCLUDED.feature_days,
+    {feature_updates},
+    updated_at = now();
+""".format(
+    feature_columns=",\n    ".join(f"{c}_avg" for c in ROLLUP_FEATURES),
+    feature_averages=",\n    ".join(f"avg(f.{c})::float8" for c in ROLLUP_FEATURES),
+    feature_updates=",\n    ".join(f"{c}_avg = EXCLUDED.{c}_avg" for c in ROLLUP_FEATURES),
+)
+
+ROLLUPS_SQL = """
+    SELECT
+        period_start,
+        predicted_days,
+        predicted_mood_avg,
+        mood_days,
+        mood_avg,
+        feature_days,
+        {feature_columns}
+    FROM mood_rollups
+    WHERE user_id = %s
+      AND granularity = %s
+      AND period_start BETWEEN %s AND %s
+    ORDER BY period_start
+""".format(
+    feature_columns=",\n        ".join(f"{c}_avg" for c in ROLLUP_FEATURES),
+)
+
+# Day range of each user's rows in the mood import staging table
+# (scripts.ingest.mood_labels), for rollup maintenance
+MOOD_IMPORT_RANGES_SQL = """
+    SELECT user_id::text, min(date), max(date)
+    FROM mood_labels_staging
+    GROUP BY user_id
+"""
+
+# One row per day with any data, all EXPORT_TABLES columns side by side
+EXPORT_SQL = """
+WITH days AS (
+    {days}
+)
+SELECT
+    d.date,
+    {columns}
+FROM days d
+{joins}
+ORDER BY d.date
+""".format(
+    days="\n    UNION\n    ".join(
+        f"SELECT date FROM {table} WHERE user_id = %(user_id)s"
+        for table, _ in EXPORT_TABLES
+    ),
+    # numeric would come back as Decimal
+    columns=",\n    ".join(
+        f"t{i}.{c}::float8" if c == "predicted_mood" else f"t{i}.{c}"
+        for i, (_, columns) in enumerate(EXPORT_TABLES)
+        for c in columns
+    ),
+    joins="\n".join(
+        f"LEFT JOIN {table} t{i} ON t{i}.user_id = %(user_id)s AND t{i}.date = d.date"
+        for i, (table, _) in enumerate(EXPORT_TABLES)
+    ),
+)
+
+# Version tokens for conditional GETs: every write bumps created_at, so a
+# range is unchanged while its row count and newest created_at are
+PREDICTIONS_VERSION_SQL = """
+    SELECT count(*), max(created_at)
+    FROM predictions
+    WHERE user_id = %s
+      AND date BETWEEN %s AND %s
+"""
+
+MOODS_VERSION_SQL = """
+    SELECT count(*), max(created_at)
+    FROM mood_labels
+    WHERE user_id = %s
+      AND date BETWEEN %s AND %s
+"""
+
+RAW_DATES_SQL = """
+SELECT DISTINCT date FROM (
+    SELECT date FROM sleep_summary WHERE user_id = %s
+    UNION
+    SELECT date FROM daily_physiology WHERE user_id = %s
+    UNION
+    SELECT date FROM daily_activity WHERE user_id = %s
+    UNION
+    SELECT date FROM daily_stress_summary WHERE user_id = %s
+) d
+ORDER BY date;
+"""
+
+DAY_SQL = """
+SELECT
+    ss.total_sleep_minutes,
+    dp.hrv_rmssd,
+    dp.resting_hr,
+    da.steps,
+    da.active_minutes,
+    ds.avg_stress
+FROM (
+    SELECT %s::date AS date
+) d
+LEFT JOIN sleep_summary ss
+    ON ss.user_id = %s AND ss.date = d.date
+LEFT JOIN daily_physiology dp
+    ON dp.user_id = %s AND dp.date = d.date
+LEFT JOIN daily_activity da
+    ON da.user_id = %s AND da.date = d.date
+LEFT JOIN daily_stress_summary ds
+    ON ds.user_id = %s
+   AND ds.date = d.date;
+"""
+
+FEATURES_UPSERT_SQL = """
+INSERT INTO daily_features (
+    user_id,
+    date,
+    sleep_debt_minutes,
+    sleep_vs_baseline_pct,
+    hrv_rmssd_zscore,
+    resting_hr_delta,
+    stress_percentile,
+    steps_vs_baseline_pct,
+    active_minutes_delta,
+    baseline_window_days
+)
+VALUES (
+    %(user_id)s,
+    %(date)s,
+    %(sleep_debt_minutes)s,
+    %(sleep_vs_baseline_pct)s,
+    %(hrv_rmssd_zscore)s,
+    %(resting_hr_delta)s,
+    %(stress_percentile)s,
+    %(steps_vs_baseline_pct)s,
+    %(active_minutes_delta)s,
+    %(baseline_window_days)s
+)
+ON CONFLICT (user_id, date)
+DO UPDATE SET
+    sleep_debt_minutes = EXCLUDED.sleep_debt_minutes,
+    sleep_vs_baseline_pct = EXCLUDED.sleep_vs_baseline_pct,
+    hrv_rmssd_zscore = EXCLUDED.hrv_rmssd_zscore,
+    resting_hr_delta = EXCLUDED.resting_hr_delta,
+    stress_percentile = EXCLUDED.stress_percentile,
+    steps_vs_baseline_pct = EXCLUDED.steps_vs_baseline_pct,
+    active_minutes_delta = EXCLUDED.active_minutes_delta,
+    baseline_window_days = EXCLUDED.baseline_window_days,
+    computed_at = NOW();
+"""
+
+# created_at feeds the conditional-GET version token, so writes stamp it
+# with clock_timestamp(): now() is the transaction's start, and a long
+# transaction would otherwise commit rows dated before a version a client
+# has already cached, which then keeps getting 304s.
+PREDICTION_UPSERT_SQL = """
+INSERT INTO predictions (
+    user_id,
+    date,
+    predicted_mood,
+    confidence,
+    explanation,
+    model_version,
+    created_at
+)
+VALUES (%s, %s, %s, %s, %s, %s, clock_timestamp())
+ON CONFLICT (user_id, date) DO UPDATE SET
+    predicted_mood = EXCLUDED.predicted_mood,
+    confidence = EXCLUDED.confidence,
+    explanation = EXCLUDED.explanation,
+    model_version = EXCLUDED.model_version,
+    created_at = clock_timestamp();
+"""
+
+MOOD_UPSERT_SQL = """
+INSERT INTO mood_labels (
+    user_id,
+    date,
+    mood,
+    note,
+    created_at
+)
+VALUES (%s, %s, %s, %s, clock_timestamp())
+ON CONFLICT (user_id, date)
+DO UPDATE SET
+    mood = EXCLUDED.mood,
+    note = EXCLUDED.note,
+    created_at = clock_timestamp()
+RETURNING date, mood, note, created_at
+"""
+
+# execute_values statement for POST /mood/bulk; xmax is 0 only on rows
+# this statement inserted (rather than updated)
+MOOD_BULK_UPSERT_SQL = """
+INSERT INTO mood_labels (
+    user_id,
+    date,
+    mood,
+    note,
+    created_at
+)
+VALUES %s
+ON CONFLICT (user_id, date)
+DO UPDATE SET
+    mood = EXCLUDED.mood,
+    note = EXCLUDED.note,
+    created_at = clock_timestamp()
+RETURNING date, mood, note, created_at, (xmax = 0) AS inserted
+"""
+
+MOOD_BULK_TEMPLATE = "(%s, %s, %s, %s, clock_timestamp())"
+
+UPLOADS_INSERT_SQL = """
+INSERT INTO garmin_uploads (
+    user_id,
+    filename,
+    file_hash,
+    status
+)
+VALUES %s
+ON CONFLICT (user_id, file_hash)
+DO UPDATE SET
+    filename = EXCLUDED.filename,
+    status = 'processing',
+    error_message = NULL
+WHERE garmin_uploads.status = 'failed'
+RETURNING file_hash;
+"""
+
+UPLOADS_MARK_SQL = """
+UPDATE garmin_uploads
+SET status = %s, error_message = %s
+WHERE user_id = %s
+  AND file_hash = ANY(%s);
+"""
+
+KNOWN_HASHES_SQL = """
+SELECT file_hash
+FROM garmin_uploads
+WHERE user_id = %s
+  AND file_hash = ANY(%s)
+  AND status <> 'failed';
+"""
+
+ARCHIVE_MEMBERS_INSERT_SQL = """
+INSERT INTO garmin_upload_archive_members (user_id, archive_hash, member_hash)
+VALUES %s
+ON CONFLICT DO NOTHING;
+"""
+
+# Processing archives containing any of the given members
+ARCHIVES_FOR_MEMBERS_SQL = """
+SELECT a.file_hash
+FROM garmin_uploads a
+WHERE a.user_id = %s
+  AND a.status = 'processing'
+  AND a.file_hash IN (
+      SELECT archive_hash
+      FROM garmin_upload_archive_members
+      WHERE user_id = %s
+        AND member_hash = ANY(%s)
+  )
+ORDER BY a.file_hash
+FOR UPDATE;
+"""
+
+ARCHIVES_SETTLE_SQL = """
+WITH settled AS (
+    SELECT m.archive_hash, bool_or(u.status = 'failed') AS failed
+    FROM garmin_upload_archive_members m
+    JOIN garmin_uploads u
+      ON u.user_id = m.user_id
+     AND u.file_hash = m.member_hash
+    WHERE m.user_id = %s
+      AND m.archive_hash = ANY(%s)
+    GROUP BY m.archive_hash
+    HAVING bool_or(u.status = 'failed') OR bool_and(u.status = 'success')
+)
+UPDATE garmin_uploads a
+SET status = CASE WHEN s.failed THEN 'failed' ELSE 'success' END,
+    error_message = CASE WHEN s.failed THEN %s END
+FROM settled s
+WHERE a.user_id = %s
+  AND a.file_hash = s.archive_hash
+  AND a.status = 'processing';
+"""
+
+
+# ─────────────────────────────────────────────
+# Repository
+# ─────────────────────────────────────────────
+
+class PostgresRepository(Repository):
+    """
+    Repository over a psycopg2 connection (normally a pool lease).
+    """
+
+    def __init__(self, conn):
+        super().__init__()
+        self.conn = conn
+
+    def _commit(self):
+        self.conn.commit()
+
+    def _rollback(self):
+        self.conn.rollback()
+
+    def _execute(self, statement: str):
+        with self.conn.cursor() as cur:
+            cur.execute(statement)
+
+    def _dict_cursor(self):
+        return self.conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+    # ── raw Garmin data ───────────────────────
+
+    def fetch_fingerprints(self, user_id, source, days):
+        with self.conn.cursor() as cur:
+            cur.execute(FINGERPRINT_SELECT_SQL, (user_id, source, days))
+            return {row[0].isoformat(): row[1] for row in cur.fetchall()}
+
+    def upsert_fingerprints(self, user_id, source, fingerprints):
+        if not fingerprints:
+            return
+
+        rows = [(user_id, source, day, fp) for day, fp in fingerprints.items()]
+        with self.conn.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur,
+                FINGERPRINT_UPSERT_SQL,
+                rows,
+                page_size=len(rows),
+            )
+
+    def upsert_sleep(self, rows):
+        if rows:
+            with self.conn.cursor() as cur:
+                cur.executemany(SLEEP_UPSERT_SQL, rows)
+
+    def upsert_physiology(self, rows):
+        if rows:
+            with self.conn.cursor() as cur:
+                cur.executemany(PHYSIOLOGY_UPSERT_SQL, rows)
+
+    def upsert_activity(self, rows):
+        if rows:
+            with self.conn.cursor() as cur:
+                cur.executemany(ACTIVITY_UPSERT_SQL, rows)
+
+    def upsert_stress_summaries(self, rows):
+        if rows:
+            with self.conn.cursor() as cur:
+                psycopg2.extras.execute_values(
+                    cur,
+                    STRESS_UPSERT_SQL,
+                    rows,
+                    template=STRESS_TEMPLATE,
+                    page_size=500,
+                )
+
+    def upsert_body_battery_summaries(self, rows):
+        if rows:
+            with self.conn.cursor() as cur:
+                psycopg2.extras.execute_values(
+                    cur,
+                    BODY_BATTERY_UPSERT_SQL,
+                    rows,
+                    template=BODY_BATTERY_TEMPLATE,
+                    page_size=500,
+                )
+
+    def upsert_intraday(self, rows):
+        if rows:
+            with self.conn.cursor() as cur:
+                psycopg2.extras.execute_values(
+                    cur,
+                    INTRADAY_UPSERT_SQL,
+                    rows,
+                    template="(%(user_id)s, %(metric)s, %(date)s, %(start_ts)s, %(sample_count)s, %(payload)s)",
+                    page_size=100,
+                )
+
+    def fetch_intraday_rows(self, user_id, metric, start, end):
+        with self.conn.cursor() as cur:
+            cur.execute(INTRADAY_SQL, (user_id, metric, start, end))
+            return cur.fetchall()
+
+    # ── features ──────────────────────────────
+
+    def fetch_user_ids(self):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT id FROM users;")
+            return [row[0] for row in cur.fetchall()]
+
+    def fetch_raw_dates(self, user_id):
+        with self.conn.cursor() as cur:
+            cur.execute(RAW_DATES_SQL, (user_id,) * 4)
+            return [row[0] for row in cur.fetchall()]
+
+    def fetch_baseline(self, user_id, start, end):
+        with self._dict_cursor() as cur:
+            cur.execute(BASELINE_SQL, (user_id,) * 8 + (start, end))
+            return cur.fetchall()
+
+    def fetch_day(self, user_id, day):
+        with self._dict_cursor() as cur:
+            cur.execute(DAY_SQL, (day,) + (user_id,) * 4)
+            return cur.fetchone() or {}
+
+    def upsert_features(self, user_id, day, features):
+        with self.conn.cursor() as cur:
+            cur.execute(
+                FEATURES_UPSERT_SQL,
+                {"user_id": user_id, "date": day, **features},
+            )
+        self._mark_changed(user_id, day)
+
+    # ── predictions ───────────────────────────
+
+    def fetch_unpredicted_days(self, user_id):
+        with self._dict_cursor() as cur:
+            cur.execute(UNPREDICTED_DAYS_SQL, (user_id,))
+            return [dict(row) for row in cur.fetchall()]
+
+    def insert_prediction(self, prediction):
+        with self.conn.cursor() as cur:
+            cur.execute(
+                PREDICTION_UPSERT_SQL,
+                (
+                    prediction["user_id"],
+                    prediction["date"],
+                    prediction["predicted_mood"],
+                    prediction["confidence"],
+                    prediction["explanation"],
+                    prediction["model_version"],
+                ),
+            )
+        self._mark_changed(prediction["user_id"], prediction["date"])
+
+    def fetch_prediction(self, user_id, day):
+        with self.conn.cursor() as cur:
+            cur.execute(TODAY_SQL, (user_id, day))
+            return cur.fetchone()
+
+    def fetch_predictions(self, user_id, start, end):
+        with self.conn.cursor() as cur:
+            cur.execute(HISTORY_SQL, (user_id, start, end))
+            return cur.fetchall()
+
+    def fetch_predictions_version(self, user_id, start, end):
+        with self.conn.cursor() as cur:
+            cur.execute(PREDICTIONS_VERSION_SQL, (user_id, start, end))
+            return cur.fetchone()
+
+    # ── mood labels ───────────────────────────
+
+    def upsert_mood(self, user_id, day, mood, note):
+        self._mark_changed(user_id, day)
+        with self.conn.cursor() as cur:
+            cur.execute(MOOD_UPSERT_SQL, (user_id, day, mood, note))
+            return cur.fetchone()
+
+    def upsert_moods(self, user_id, entries):
+        if not entries:
+            return []
+
+        self._mark_changed(user_id, *(day for day, _, _ in entries))
+        with self.conn.cursor() as cur:
+            rows = psycopg2.extras.execute_values(
+                cur,
+                MOOD_BULK_UPSERT_SQL,
+                [(user_id, day, mood, note) for day, mood, note in entries],
+                template=MOOD_BULK_TEMPLATE,
+                page_size=len(entries),
+                fetch=True,
+            )
+
+        # RETURNING order is not guaranteed to follow VALUES
+        by_date = {row[0]: tuple(row) for row in rows}
+        return [by_date[day] for day, _, _ in entries]
+
+    def fetch_moods(self, user_id, start, end):
+        with self.conn.cursor() as cur:
+            cur.execute(MOOD_HISTORY_SQL, (user_id, start, end))
+            return cur.fetchall()
+
+    def fetch_moods_version(self, user_id, start, end):
+        with self.conn.cursor() as cur:
+            cur.execute(MOODS_VERSION_SQL, (user_id, start, end))
+            return cur.fetchone()
+
+    def import_mood_labels(self, f: TextIO, user_id: Optional[str] = None) -> dict:
+        report = import_mood_labels(self.conn, f, user_id=user_id)
+
+        # The staging table lives until commit
+        with self.conn.cursor() as cur:
+            cur.execute(MOOD_IMPORT_RANGES_SQL)
+            for row_user, first, last in cur.fetchall():
+                self._mark_changed(row_user, first, last)
+
+        return report
+
+    # ── dashboard ─────────────────────────────
+
+    def fetch_dashboard(self, user_id, start, end):
+        with self.conn.cursor() as cur:
+            cur.execute(DASHBOARD_SQL, (start, end, user_id, user_id))
+            return cur.fetchall()
+
+    # ── rollups ───────────────────────────────
+
+    def refresh_rollups(self, user_id, granularity, first, last):
+        with self.conn.cursor() as cur:
+            cur.execute(
+                ROLLUP_REFRESH_SQL,
+                {"user_id": user_id, "granularity": granularity, "first": first, "last": last},
+            )
+
+    def fetch_rollups(self, user_id, granularity, start, end):
+        with self.conn.cursor() as cur:
+            cur.execute(ROLLUPS_SQL, (user_id, granularity, start, end))
+            return cur.fetchall()
+
+    # ── export ────────────────────────────────
+
+    def export_batches(self, user_id, batch_size):
+        # A named (server-side) cursor: rows stay in Postgres until fetched
+        with self.conn.cursor(name="export") as cur:
+            cur.itersize = batch_size
+            cur.execute(EXPORT_SQL, {"user_id": user_id})
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield rows
+
+    # ── upload tracking ───────────────────────
+
+    def record_uploads(self, user_id, uploads: list[tuple[Path, str]]):
+        if not uploads:
+            return set()
+
+        rows = [(user_id, path.name, fh, "processing") for path, fh in uploads]
+        with self.conn.cursor() as cur:
+            inserted = psycopg2.extras.execute_values(
+                cur,
+                UPLOADS_INSERT_SQL,
+                rows,
+                page_size=len(rows),
+                fetch=True,
+            )
+        return {row[0] for row in inserted}
+
+    def mark_uploads(self, user_id, file_hashes, status, error=None):
+        if not file_hashes:
+            return
+
+        with self.conn.cursor() as cur:
+            cur.execute(UPLOADS_MARK_SQL, (status, error, user_id, file_hashes))
+
+    def fetch_known_hashes(self, user_id, file_hashes):
+        if not file_hashes:
+            return set()
+
+        with self.conn.cursor() as cur:
+            cur.execute(KNOWN_HASHES_SQL, (user_id, file_hashes))
+            return {row[0] for row in cur.fetchall()}
+
+    def record_archive_members(self, user_id, archive_hash, member_hashes):
+        if not member_hashes:
+            return
+
+        rows = [(user_id, archive_hash, fh) for fh in set(member_hashes)]
+        with self.conn.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur, ARCHIVE_MEMBERS_INSERT_SQL, rows, page_size=len(rows)
+            )
+
+    def settle_archives(self, user_id, member_hashes):
+        if not member_hashes:
+            return
+
+        with self.conn.cursor() as cur:
+            # Lock the archives first: the settle below then runs on a
+            # snapshot taken after any other job settling the same
+            # archives has committed, so the last member to finish always
+            # sees the others
+            cur.execute(ARCHIVES_FOR_MEMBERS_SQL, (user_id, user_id, list(member_hashes)))
+            archives = [row[0] for row in cur.fetchall()]
+            if archives:
+                cur.execute(
+                    ARCHIVES_SETTLE_SQL,
+                    (user_id, archives, ARCHIVE_FAILED_MESSAGE, user_id),
+                )
@@ -0,0 +1,848 @@
+import csv
+import json
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional, TextIO
+
+from backend.storage.base import (
+    ARCHIVE_FAILED_MESSAGE,
+    EXPORT_TABLES,
+    ROLLUP_FEATURES,
+    Repository,
+)
+from scripts.ingest.mood_labels import MAX_REPORTED_REJECTS, validate_row
+
+# Columns are declared with these types so rows come back as the same
+# Python types psycopg2 returns; arrays are stored as JSON text.
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, datetime.isoformat)
+sqlite3.register_converter("date", lambda b: date.fromisoformat(b.decode()))
+sqlite3.register_converter("timestamp", lambda b: datetime.fromisoformat(b.decode()))
+sqlite3.register_converter("json", lambda b: json.loads(b))
+
+
+# ─────────────────────────────────────────────
+# Schema
+# ─────────────────────────────────────────────
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id text PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS garmin_record_fingerprints (
+    user_id text NOT NULL,
+    source text NOT NULL,
+    date date NOT NULL,
+    fingerprint text NOT NULL,
+    PRIMARY KEY (user_id, source, date)
+);
+
+CREATE TABLE IF NOT EXISTS sleep_summary (
+    user_id text NOT NULL,
+    date date NOT NULL,
+    total_sleep_minutes integer,
+    deep_sleep_minutes integer,
+    light_sleep_minutes integer,
+    rem_sleep_minutes integer,
+    awake_minutes integer,
+    sleep_score integer,
+    bedtime timestamp,
+    wake_time timestamp,
+    source text,
+    PRIMARY KEY (user_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS daily_physiology (
+    user_id text NOT NULL,
+    date date NOT NULL,
+    resting_hr integer,
+    respiration_rate real,
+    hrv_rmssd real,
+    source text,
+    PRIMARY KEY (user_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS daily_activity (
+    user_id text NOT NULL,
+    date date NOT NULL,
+    steps integer,
+    active_minutes integer,
+    calories_burned real,
+    distance_meters real,
+    source text,
+    PRIMARY KEY (user_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS daily_stress_summary (
+    user_id text NOT NULL,
+    date date NOT NULL,
+    avg_stress integer,
+    max_stress integer,
+    stress_duration integer,
+    rest_duration integer,
+    activity_duration integer,
+    total_duration integer,
+    agg_types json NOT NULL,
+    agg_avg_stress json NOT NULL,
+    agg_max_stress json NOT NULL,
+    agg_stress_duration json NOT NULL,
+    agg_rest_duration json NOT NULL,
+    agg_activity_duration json NOT NULL,
+    agg_total_duration json NOT NULL,
+    PRIMARY KEY (user_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS daily_body_battery_summary (
+    user_id text NOT NULL,
+    date date NOT NULL,
+    stat_types json NOT NULL,
+    stat_values json NOT NULL,
+    stat_timestamps json NOT NULL,
+    PRIMARY KEY (user_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS intraday_series (
+    user_id text NOT NULL,
+    metric text NOT NULL,
+    date date NOT NULL,
+    start_ts timestamp NOT NULL,
+    sample_count integer NOT NULL,
+    payload blob NOT NULL,
+    PRIMARY KEY (user_id, metric, date)
+);
+
+CREATE TABLE IF NOT EXISTS daily_features (
+    user_id text NOT NULL,
+    date date NOT NULL,
+    sleep_debt_minutes integer,
+    sleep_vs_baseline_pct real,
+    hrv_rmssd_zscore real,
+    resting_hr_delta real,
+    stress_percentile real,
+    steps_vs_baseline_pct real,
+    active_minutes_delta real,
+    baseline_window_days integer,
+    computed_at timestamp,
+    PRIMARY KEY (user_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS predictions (
+    user_id text NOT NULL,
+    date date NOT NULL,
+    predicted_mood real,
+    confidence text,
+    explanation json NOT NULL DEFAULT '[]',
+    model_version text,
+    created_at timestamp,
+    PRIMARY KEY (user_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS mood_labels (
+    user_id text NOT NULL,
+    date date NOT NULL,
+    mood integer NOT NULL,
+    note text,
+    created_at timestamp,
+    PRIMARY KEY (user_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS garmin_uploads (
+    user_id text NOT NULL,
+    filename text NOT NULL,
+    file_hash text NOT NULL,
+    status text NOT NULL,
+    error_message text,
+    created_at timestamp,
+    PRIMARY KEY (user_id, file_hash)
+);
+
+CREATE TABLE IF NOT EXISTS garmin_upload_archive_members (
+    user_id text NOT NULL,
+    archive_hash text NOT NULL,
+    member_hash text NOT NULL,
+    PRIMARY KEY (user_id, archive_hash, member_hash)
+);
+
+CREATE TABLE IF NOT EXISTS mood_rollups (
+    user_id text NOT NULL,
+    granularity text NOT NULL,
+    period_start date NOT NULL,
+    predicted_days integer NOT NULL,
+    predicted_mood_avg real,
+    mood_days integer NOT NULL,
+    mood_avg real,
+    feature_days integer NOT NULL,
+    %s,
+    updated_at timestamp,
+    PRIMARY KEY (user_id, granularity, period_start)
+);
+""" % ",\n    ".join(f"{c}_avg real" for c in ROLLUP_FEATURES)
+
+_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+
+# Sources of raw dates, as (table, columns read for features)
+_RAW_TABLES = (
+    ("sleep_summary", "ss", ("total_sleep_minutes",)),
+    ("daily_physiology", "dp", ("hrv_rmssd", "resting_hr")),
+    ("daily_activity", "da", ("steps", "active_minutes")),
+    ("daily_stress_summary", "ds", ("avg_stress",)),
+)
+
+_RAW_DATES = " UNION ".join(
+    f"SELECT date FROM {table} WHERE user_id = :user_id" for table, _, _ in _RAW_TABLES
+)
+_RAW_COLUMNS = ", ".join(
+    f"{alias}.{column}" for _, alias, columns in _RAW_TABLES for column in columns
+)
+_RAW_JOINS = "\n".join(
+    f"LEFT JOIN {table} {alias} ON {alias}.user_id = :user_id AND {alias}.date = d.date"
+    for table, alias, _ in _RAW_TABLES
+)
+
+RAW_DATES_SQL = f'SELECT DISTINCT date AS "date [date]" FROM ({_RAW_DATES}) ORDER BY 1'
+
+BASELINE_SQL = f"""
+SELECT d.date AS "date [date]", {_RAW_COLUMNS}
+FROM ({_RAW_DATES}) d
+{_RAW_JOINS}
+WHERE d.date >= :start AND d.date < :end
+ORDER BY d.date
+"""
+
+DAY_SQL = f"""
+SELECT {_RAW_COLUMNS}
+FROM (SELECT :day AS date) d
+{_RAW_JOINS}
+"""
+
+
+# Start of the week (Monday) / month containing d.date
+_PERIOD_START = {
+    "week": "date(d.date, 'weekday 0', '-6 days')",
+    "month": "date(d.date, 'start of month')",
+}
+
+_ROLLUP_AVG_COLUMNS = ", ".join(f"{c}_avg" for c in ROLLUP_FEATURES)
+
+
+def _rollup_refresh_sql(granularity: str) -> str:
+    feature_averages = ", ".join(f"avg(f.{c})" for c in ROLLUP_FEATURES)
+    feature_updates = ", ".join(f"{c}_avg = excluded.{c}_avg" for c in ROLLUP_FEATURES)
+    return f"""
+    WITH days AS (
+        SELECT date FROM predictions
+        WHERE user_id = :user_id AND date BETWEEN :first AND :last
+        UNION
+        SELECT date FROM mood_labels
+        WHERE user_id = :user_id AND date BETWEEN :first AND :last
+        UNION
+        SELECT date FROM daily_features
+        WHERE user_id = :user_id AND date BETWEEN :first AND :last
+    )
+    INSERT INTO mood_rollups (
+        user_id, granularity, period_start,
+        predicted_days, predicted_mood_avg, mood_days, mood_avg, feature_days,
+        {_ROLLUP_AVG_COLUMNS}, updated_at
+    )
+    SELECT
+        :user_id, :granularity, {_PERIOD_START[granularity]} AS period,
+        count(p.date), avg(p.predicted_mood), count(m.date), avg(m.mood), count(f.date),
+        {feature_averages}, {_NOW}
+    FROM days d
+    LEFT JOIN predictions p ON p.user_id = :user_id AND p.date = d.date
+    LEFT JOIN mood_labels m ON m.user_id = :user_id AND m.date = d.date
+    LEFT JOIN daily_features f ON f.user_id = :user_id AND f.date = d.date
+    WHERE true  -- lets SQLite parse ON CONFLICT after the joins
+    GROUP BY period
+    ON CONFLICT (user_id, granularity, period_start) DO UPDATE SET
+        predicted_days = excluded.predicted_days,
+        predicted_mood_avg = excluded.predicted_mood_avg,
+        mood_days = excluded.mood_days,
+        mood_avg = excluded.mood_avg,
+        feature_days = excluded.feature_days,
+        {feature_updates},
+        updated_at = excluded.updated_at
+    """
+
+
+ROLLUP_REFRESH_SQL = {g: _rollup_refresh_sql(g) for g in _PERIOD_START}
+
+_EXPORT_DAYS = " UNION ".join(
+    f"SELECT date FROM {table} WHERE user_id = :user_id" for table, _ in EXPORT_TABLES
+)
+_EXPORT_COLUMNS = ", ".join(
+    f"t{i}.{column}" for i, (_, columns) in enumerate(EXPORT_TABLES) for column in columns
+)
+_EXPORT_JOINS = "\n".join(
+    f"LEFT JOIN {table} t{i} ON t{i}.user_id = :user_id AND t{i}.date = d.date"
+    for i, (table, _) in enumerate(EXPORT_TABLES)
+)
+
+EXPORT_SQL = f"""
+SELECT d.date AS "date [date]", {_EXPORT_COLUMNS}
+FROM ({_EXPORT_DAYS}) d
+{_EXPORT_JOINS}
+ORDER BY d.date
+"""
+
+
+def _upsert_sql(table: str, columns: list[str], keys: list[str], coalesce: bool = False) -> str:
+    """
+    INSERT ... ON CONFLICT DO UPDATE for named parameters. With coalesce,
+    NULLs in the new row keep the stored value, like the Postgres upserts
+    for physiology and activity.
+    """
+    updates = []
+    for column in columns:
+        if column in keys:
+            continue
+        if coalesce and column != "source":
+            updates.append(f"{column} = COALESCE(excluded.{column}, {table}.{column})")
+        else:
+            updates.append(f"{column} = excluded.{column}")
+
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(':' + c for c in columns)}) "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {', '.join(updates)}"
+    )
+
+
+SLEEP_COLUMNS = [
+    "user_id", "date", "total_sleep_minutes", "deep_sleep_minutes",
+    "light_sleep_minutes", "rem_sleep_minutes", "awake_minutes",
+    "sleep_score", "bedtime", "wake_time", "source",
+]
+PHYSIOLOGY_COLUMNS = ["user_id", "date", "resting_hr", "respiration_rate", "hrv_rmssd", "source"]
+ACTIVITY_COLUMNS = [
+    "user_id", "date", "steps", "active_minutes", "calories_burned",
+    "distance_meters", "source",
+]
+STRESS_COLUMNS = [
+    "user_id", "date", "avg_stress", "max_stress", "stress_duration",
+    "rest_duration", "activity_duration", "total_duration", "agg_types",
+    "agg_avg_stress", "agg_max_stress", "agg_stress_duration",
+    "agg_rest_duration", "agg_activity_duration", "agg_total_duration",
+]
+BODY_BATTERY_COLUMNS = ["user_id", "date", "stat_types", "stat_values", "stat_timestamps"]
+INTRADAY_COLUMNS = ["user_id", "metric", "date", "start_ts", "sample_count", "payload"]
+FEATURE_COLUMNS = [
+    "user_id", "date", "sleep_debt_minutes", "sleep_vs_baseline_pct",
+    "hrv_rmssd_zscore", "resting_hr_delta", "stress_percentile",
+    "steps_vs_baseline_pct", "active_minutes_delta", "baseline_window_days",
+]
+
+SLEEP_UPSERT_SQL = _upsert_sql("sleep_summary", SLEEP_COLUMNS, ["user_id", "date"])
+PHYSIOLOGY_UPSERT_SQL = _upsert_sql("daily_physiology", PHYSIOLOGY_COLUMNS, ["user_id", "date"], coalesce=True)
+ACTIVITY_UPSERT_SQL = _upsert_sql("daily_activity", ACTIVITY_COLUMNS, ["user_id", "date"], coalesce=True)
+STRESS_UPSERT_SQL = _upsert_sql("daily_stress_summary", STRESS_COLUMNS, ["user_id", "date"])
+BODY_BATTERY_UPSERT_SQL = _upsert_sql("daily_body_battery_summary", BODY_BATTERY_COLUMNS, ["user_id", "date"])
+INTRADAY_UPSERT_SQL = _upsert_sql("intraday_series", INTRADAY_COLUMNS, ["user_id", "metric", "date"])
+
+FEATURES_UPSERT_SQL = (
+    _upsert_sql("daily_features", FEATURE_COLUMNS + ["computed_at"], ["user_id", "date"])
+    .replace(":computed_at", _NOW)
+)
+
+PREDICTION_UPSERT_SQL = f"""
+INSERT INTO predictions (user_id, date, predicted_mood, confidence, explanation, model_version, created_at)
+VALUES (?, ?, ?, ?, ?, ?, {_NOW})
+ON CONFLICT (user_id, date) DO UPDATE SET
+    predicted_mood = excluded.predicted_mood,
+    confidence = excluded.confidence,
+    explanation = excluded.explanation,
+    model_version = excluded.model_version,
+    created_at = excluded.created_at
+"""
+
+MOOD_UPSERT_SQL = f"""
+INSERT INTO mood_labels (user_id, date, mood, note, created_at)
+VALUES (?, ?, ?, ?, {_NOW})
+ON CONFLICT (user_id, date) DO UPDATE SET
+    mood = excluded.mood,
+    note = excluded.note,
+    created_at = excluded.created_at
+"""
+
+def _stored_arrays(rows: list[dict], columns: list[str]) -> list[dict]:
+    return [
+        {k: json.dumps(v, default=str) if k in columns else v for k, v in row.items()}
+        for row in rows
+    ]
+
+
+def _placeholders(values: list) -> str:
+    return ", ".join("?" * len(values))
+
+
+# ─────────────────────────────────────────────
+# Repository
+# ─────────────────────────────────────────────
+
+class SQLiteRepository(Repository):
+    """
+    Repository over an embedded SQLite database, for local runs, tests and
+    benchmarks without Postgres. The connection runs in autocommit mode
+    with an explicit BEGIN, so commits and savepoints behave as they do on
+    Postgres.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        super().__init__()
+        self.conn = conn
+        self.conn.execute("BEGIN")
+
+    def _commit(self):
+        self.conn.execute("COMMIT")
+        self.conn.execute("BEGIN")
+
+    def _rollback(self):
+        self.conn.execute("ROLLBACK")
+        self.conn.execute("BEGIN")
+
+    def _execute(self, statement: str):
+        self.conn.execute(statement)
+
+    def _dicts(self, sql: str, params) -> list[dict]:
+        cur = self.conn.execute(sql, params)
+        columns = [d[0].split(" [")[0] for d in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+    # ── raw Garmin data ───────────────────────
+
+    def fetch_fingerprints(self, user_id, source, days):
+        if not days:
+            return {}
+        rows = self.conn.execute(
+            f"""
+            SELECT date, fingerprint FROM garmin_record_fingerprints
+            WHERE user_id = ? AND source = ? AND date IN ({_placeholders(days)})
+            """,
+            (user_id, source, *days),
+        ).fetchall()
+        return {row[0].isoformat(): row[1] for row in rows}
+
+    def upsert_fingerprints(self, user_id, source, fingerprints):
+        self.conn.executemany(
+            """
+            INSERT INTO garmin_record_fingerprints (user_id, source, date, fingerprint)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (user_id, source, date) DO UPDATE SET fingerprint = excluded.fingerprint
+            """,
+            [(user_id, source, day, fp) for day, fp in fingerprints.items()],
+        )
+
+    def upsert_sleep(self, rows):
+        self.conn.executemany(SLEEP_UPSERT_SQL, rows)
+
+    def upsert_physiology(self, rows):
+        self.conn.executemany(PHYSIOLOGY_UPSERT_SQL, rows)
+
+    def upsert_activity(self, rows):
+        self.conn.executemany(ACTIVITY_UPSERT_SQL, rows)
+
+    def upsert_stress_summaries(self, rows):
+        self.conn.executemany(
+            STRESS_UPSERT_SQL,
+            _stored_arrays(rows, [c for c in STRESS_COLUMNS if c.startswith("agg_")]),
+        )
+
+    def upsert_body_battery_summaries(self, rows):
+        self.conn.executemany(
+            BODY_BATTERY_UPSERT_SQL,
+            _stored_arrays(rows, ["stat_types", "stat_values", "stat_timestamps"]),
+        )
+
+    def upsert_intraday(self, rows):
+        self.conn.executemany(INTRADAY_UPSERT_SQL, rows)
+
+    def fetch_intraday_rows(self, user_id, metric, start, end):
+        return self.conn.execute(
+            """
+            SELECT start_ts, sample_count, payload
+            FROM intraday_series
+            WHERE user_id = ? AND metric = ? AND date BETWEEN ? AND ?
+            ORDER BY date
+            """,
+            (user_id, metric, start, end),
+        ).fetchall()
+
+    # ── features ──────────────────────────────
+
+    def fetch_user_ids(self):
+        return [row[0] for row in self.conn.execute("SELECT id FROM users")]
+
+    def fetch_raw_dates(self, user_id):
+        cur = self.conn.execute(RAW_DATES_SQL, {"user_id": user_id})
+        return [row[0] for row in cur.fetchall()]
+
+    def fetch_baseline(self, user_id, start, end):
+        return self._dicts(BASELINE_SQL, {"user_id": user_id, "start": start, "end": end})
+
+    def fetch_day(self, user_id, day):
+        rows = self._dicts(DAY_SQL, {"user_id": user_id, "day": day})
+        return rows[0] if rows else {}
+
+    def upsert_features(self, user_id, day, features):
+        self.conn.execute(FEATURES_UPSERT_SQL, {"user_id": user_id, "date": day, **features})
+        self._mark_changed(user_id, day)
+
+    # ── predictions ───────────────────────────
+
+    def fetch_unpredicted_days(self, user_id):
+        return self._dicts(
+            """
+            SELECT
+                user_id,
+                date,
+                sleep_debt_minutes,
+                sleep_vs_baseline_pct,
+                hrv_rmssd_zscore,
+                resting_hr_delta,
+                stress_percentile,
+                steps_vs_baseline_pct,
+                active_minutes_delta
+            FROM daily_features df
+            WHERE user_id = ?
+              AND NOT EXISTS (
+                SELECT 1 FROM predictions p
+                WHERE p.user_id = df.user_id
+                  AND p.date = df.date
+              )
+            ORDER BY date
+            """,
+            (user_id,),
+        )
+
+    def insert_prediction(self, prediction):
+        self.conn.execute(
+            PREDICTION_UPSERT_SQL,
+            (
+                prediction["user_id"],
+                prediction["date"],
+                prediction["predicted_mood"],
+                prediction["confidence"],
+                json.dumps(prediction["explanation"]),
+                prediction["model_version"],
+            ),
+        )
+        self._mark_changed(prediction["user_id"], prediction["date"])
+
+    def fetch_prediction(self, user_id, day):
+        return self.conn.execute(
+            """
+            SELECT predicted_mood, confidence, explanation, model_version
+            FROM predictions
+            WHERE user_id = ? AND date = ?
+            """,
+            (user_id, day),
+        ).fetchone()
+
+    def fetch_predictions(self, user_id, start, end):
+        return self.conn.execute(
+            """
+            SELECT date, predicted_mood, confidence, explanation
+            FROM predictions
+            WHERE user_id = ? AND date BETWEEN ? AND ?
+            ORDER BY date
+            """,
+            (user_id, start, end),
+        ).fetchall()
+
+    def fetch_predictions_version(self, user_id, start, end):
+        return self.conn.execute(
+            """
+            SELECT count(*), max(created_at) AS "created_at [timestamp]"
+            FROM predictions
+            WHERE user_id = ? AND date BETWEEN ? AND ?
+            """,
+            (user_id, start, end),
+        ).fetchone()
+
+    # ── mood labels ───────────────────────────
+
+    def upsert_mood(self, user_id, day, mood, note):
+        self._mark_changed(user_id, day)
+        self.conn.execute(MOOD_UPSERT_SQL, (user_id, day, mood, note))
+        return self.conn.execute(
+            "SELECT date, mood, note, created_at FROM mood_labels WHERE user_id = ? AND date = ?",
+            (user_id, day),
+        ).fetchone()
+
+    def upsert_moods(self, user_id, entries):
+        if not entries:
+            return []
+
+        self._mark_changed(user_id, *(day for day, _, _ in entries))
+        days = [day for day, _, _ in entries]
+        existing = {
+            row[0]
+            for row in self.conn.execute(
+                f"""
+                SELECT date AS "date [date]" FROM mood_labels
+                WHERE user_id = ? AND date IN ({_placeholders(days)})
+                """,
+                (user_id, *days),
+            )
+        }
+
+        values = ", ".join(f"(?, ?, ?, ?, {_NOW})" for _ in entries)
+        self.conn.execute(
+            f"""
+            INSERT INTO mood_labels (user_id, date, mood, note, created_at)
+            VALUES {values}
+            ON CONFLICT (user_id, date) DO UPDATE SET
+                mood = excluded.mood,
+                note = excluded.note,
+                created_at = excluded.created_at
+            """,
+            [v for day, mood, note in entries for v in (user_id, day, mood, note)],
+        )
+
+        stored = {
+            row[0]: row
+            for row in self.conn.execute(
+                f"""
+                SELECT date, mood, note, created_at FROM mood_labels
+                WHERE user_id = ? AND date IN ({_placeholders(days)})
+                """,
+                (user_id, *days),
+            )
+        }
+        return [(*stored[day], day not in existing) for day in days]
+
+    def fetch_moods(self, user_id, start, end):
+        return self.conn.execute(
+            """
+            SELECT date, mood, note, created_at
+            FROM mood_labels
+            WHERE user_id = ? AND date BETWEEN ? AND ?
+            ORDER BY date
+            """,
+            (user_id, start, end),
+        ).fetchall()
+
+    def fetch_moods_version(self, user_id, start, end):
+        return self.conn.execute(
+            """
+            SELECT count(*), max(created_at) AS "created_at [timestamp]"
+            FROM mood_labels
+            WHERE user_id = ? AND date BETWEEN ? AND ?
+            """,
+            (user_id, start, end),
+        ).fetchone()
+
+    def import_mood_labels(self, f: TextIO, user_id: Optional[str] = None) -> dict:
+        reader = csv.DictReader(f)
+        columns = set(reader.fieldnames or [])
+
+        missing = {"date", "mood"} - columns
+        if user_id is None and "user_id" not in columns:
+            missing.add("user_id")
+        if missing:
+            raise ValueError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+
+        report = {"accepted": 0, "imported": 0, "rejected": 0, "errors": []}
+        # Later lines win when a file repeats (user_id, date)
+        latest = {}
+
+        for row in reader:
+            try:
+                clean = validate_row(row, user_id)
+            except ValueError as e:
+                report["rejected"] += 1
+                if len(report["errors"]) < MAX_REPORTED_REJECTS:
+                    report["errors"].append({"line": reader.line_num, "error": str(e)})
+                continue
+
+            report["accepted"] += 1
+            latest[clean[:2]] = clean
+
+        self.conn.executemany(MOOD_UPSERT_SQL, list(latest.values()))
+        for row_user, day in latest:
+            self._mark_changed(row_user, day)
+        report["imported"] = len(latest)
+        return report
+
+    # ── dashboard ─────────────────────────────
+
+    def fetch_dashboard(self, user_id, start, end):
+        return self.conn.execute(
+            """
+            WITH RECURSIVE days(day) AS (
+                SELECT date(?)
+                UNION ALL
+                SELECT date(day, '+1 day') FROM days WHERE day < date(?)
+            )
+            SELECT
+                day AS "date [date]",
+                p.predicted_mood,
+                p.confidence,
+                p.explanation AS "explanation [json]",
+                m.mood,
+                m.note
+            FROM days
+            LEFT JOIN predictions p ON p.user_id = ? AND p.date = day
+            LEFT JOIN mood_labels m ON m.user_id = ? AND m.date = day
+            ORDER BY day
+            """,
+            (start, end, user_id, user_id),
+        ).fetchall()
+
+    # ── rollups ───────────────────────────────
+
+    def refresh_rollups(self, user_id, granularity, first, last):
+        self.conn.execute(
+            ROLLUP_REFRESH_SQL[granularity],
+            {"user_id": user_id, "granularity": granularity, "first": first, "last": last},
+        )
+
+    def fetch_rollups(self, user_id, granularity, start, end):
+        return self.conn.execute(
+            f"""
+            SELECT
+                period_start AS "period_start [date]",
+                predicted_days,
+                predicted_mood_avg,
+                mood_days,
+                mood_avg,
+                feature_days,
+                {_ROLLUP_AVG_COLUMNS}
+            FROM mood_rollups
+            WHERE user_id = ? AND granularity = ? AND period_start BETWEEN ? AND ?
+            ORDER BY period_start
+            """,
+            (user_id, granularity, start, end),
+        ).fetchall()
+
+    # ── export ────────────────────────────────
+
+    def export_batches(self, user_id, batch_size):
+        # SQLite steps through the result as rows are fetched
+        cur = self.conn.execute(EXPORT_SQL, {"user_id": user_id})
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+
+    # ── upload tracking ───────────────────────
+
+    def record_uploads(self, user_id, uploads: list[tuple[Path, str]]):
+        new = set()
+        for path, fh in uploads:
+            cur = self.conn.execute(
+                f"""
+                INSERT INTO garmin_uploads (user_id, filename, file_hash, status, created_at)
+                VALUES (?, ?, ?, 'processing', {_NOW})
+                ON CONFLICT (user_id, file_hash) DO UPDATE SET
+                    filename = excluded.filename,
+                    status = 'processing',
+                    error_message = NULL
+                WHERE garmin_uploads.status = 'failed'
+                """,
+                (user_id, path.name, fh),
+            )
+            if cur.rowcount:
+                new.add(fh)
+        return new
+
+    def mark_uploads(self, user_id, file_hashes, status, error=None):
+        if not file_hashes:
+            return
+        self.conn.execute(
+            f"""
+            UPDATE garmin_uploads SET status = ?, error_message = ?
+            WHERE user_id = ? AND file_hash IN ({_placeholders(file_hashes)})
+            """,
+            (status, error, user_id, *file_hashes),
+        )
+
+    def fetch_known_hashes(self, user_id, file_hashes):
+        if not file_hashes:
+            return set()
+        rows = self.conn.execute(
+            f"""
+            SELECT file_hash FROM garmin_uploads
+            WHERE user_id = ? AND file_hash IN ({_placeholders(file_hashes)})
+              AND status <> 'failed'
+            """,
+            (user_id, *file_hashes),
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def record_archive_members(self, user_id, archive_hash, member_hashes):
+        self.conn.executemany(
+            """
+            INSERT INTO garmin_upload_archive_members (user_id, archive_hash, member_hash)
+            VALUES (?, ?, ?)
+            ON CONFLICT DO NOTHING
+            """,
+            [(user_id, archive_hash, fh) for fh in set(member_hashes)],
+        )
+
+    def settle_archives(self, user_id, member_hashes):
+        if not member_hashes:
+            return
+        # Member status counts per archive; SQLite has a single writer, so
+        # no locking is needed to see other jobs' results
+        members = """
+            SELECT count(*) FROM garmin_upload_archive_members m
+            JOIN garmin_uploads u ON u.user_id = m.user_id AND u.file_hash = m.member_hash
+            WHERE m.user_id = a.user_id AND m.archive_hash = a.file_hash
+        """
+        self.conn.execute(
+            f"""
+            UPDATE garmin_uploads AS a
+            SET status = CASE WHEN ({members} AND u.status = 'failed') > 0
+                              THEN 'failed' ELSE 'success' END,
+                error_message = CASE WHEN ({members} AND u.status = 'failed') > 0
+                                     THEN ? END
+            WHERE a.user_id = ?
+              AND a.status = 'processing'
+              AND a.file_hash IN (
+                  SELECT archive_hash FROM garmin_upload_archive_members
+                  WHERE user_id = ? AND member_hash IN ({_placeholders(member_hashes)})
+              )
+              AND (
+                  ({members} AND u.status = 'failed') > 0
+                  OR ({members} AND u.status <> 'success') = 0
+              )
+            """,
+            (ARCHIVE_FAILED_MESSAGE, user_id, user_id, *member_hashes),
+        )
+
+
+# ─────────────────────────────────────────────
+# Connections
+# ─────────────────────────────────────────────
+
+_initialised: set[str] = set()
+_init_lock = threading.Lock()
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Open path (creating the schema on first use in this process). Each
+    unit of work gets its own connection; WAL lets readers run alongside
+    the writer.
+    """
+    conn = sqlite3.connect(
+        path,
+        timeout=30,
+        isolation_level=None,
+        detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+        check_same_thread=False,
+    )
+
+    with _init_lock:
+        if path not in _initialised:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            _initialised.add(path)
+
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
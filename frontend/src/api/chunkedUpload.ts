@@ -0,0 +1,78 @@
+// src/api/chunkedUpload.ts
+import { authFetch } from "./authFetch";
+import { API_BASE_URL } from "./config";
+
+// Files above this size go through the resumable chunked upload protocol
+export const CHUNKED_UPLOAD_THRESHOLD = 32 * 1024 * 1024;
+
+const CHUNK_SIZE = 8 * 1024 * 1024;
+const MAX_CHUNK_RETRIES = 5;
+
+type ChunkedUpload = {
+  upload_id: string;
+  received_bytes: number;
+  max_chunk_bytes: number;
+};
+
+export async function sha256Hex(data: ArrayBuffer): Promise<string> {
+  const digest = await crypto.subtle.digest("SHA-256", data);
+  return Array.from(new Uint8Array(digest))
+    .map((b) => b.toString(16).padStart(2, "0"))
+    .join("");
+}
+
+async function fetchUpload(uploadId: string): Promise<ChunkedUpload> {
+  const res = await authFetch(`${API_BASE_URL}/garmin/uploads/${uploadId}`);
+  if (!res.ok) throw new Error("Failed to fetch upload state");
+  return res.json();
+}
+
+/**
+ * Upload one file in checksummed chunks, resuming from the server's
+ * received offset after a failed request. Returns the finalize response
+ * (a queued job, or a note that everything was already processed).
+ */
+export async function uploadFileChunked(file: File) {
+  const init = await authFetch(`${API_BASE_URL}/garmin/uploads`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ filename: file.name, total_size: file.size }),
+  });
+  if (!init.ok) throw new Error((await init.text()) || "Upload failed");
+
+  const upload: ChunkedUpload = await init.json();
+  const chunkSize = Math.min(CHUNK_SIZE, upload.max_chunk_bytes);
+  let offset = upload.received_bytes;
+  let failures = 0;
+
+  while (offset < file.size) {
+    const chunk = await file.slice(offset, offset + chunkSize).arrayBuffer();
+
+    try {
+      const res = await authFetch(
+        `${API_BASE_URL}/garmin/uploads/${upload.upload_id}/chunks?offset=${offset}`,
+        {
+          method: "PUT",
+          headers: { "X-Chunk-SHA256": await sha256Hex(chunk) },
+          body: chunk,
+        }
+      );
+      if (!res.ok) throw new Error((await res.text()) || "Chunk upload failed");
+
+      offset = (await res.json()).received_bytes;
+      failures = 0;
+    } catch (err) {
+      if (++failures > MAX_CHUNK_RETRIES) throw err;
+      // Resume from whatever the server actually committed
+      offset = (await fetchUpload(upload.upload_id)).received_bytes;
+    }
+  }
+
+  const res = await authFetch(
+    `${API_BASE_URL}/garmin/uploads/${upload.upload_id}/finalize`,
+    { method: "POST" }
+  );
+  if (!res.ok) throw new Error((await res.text()) || "Upload failed");
+
+  return res.json();
+}
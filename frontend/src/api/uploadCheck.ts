@@ -0,0 +1,44 @@
+// src/api/uploadCheck.ts
+import { authFetch } from "./authFetch";
+import { API_BASE_URL } from "./config";
+import { sha256Hex } from "./chunkedUpload";
+
+// Larger files are not hashed in the browser; they are always sent
+const MAX_HASHED_FILE_BYTES = 512 * 1024 * 1024;
+
+type UploadCheckFile = { filename: string; sha256: string };
+
+/**
+ * Hash files locally and ask the server which ones it has not processed
+ * yet, so re-uploading an export does not resend known files.
+ */
+export async function filterUnknownFiles(files: File[]): Promise<File[]> {
+  const hashes = new Map<File, string>();
+
+  for (const f of files) {
+    if (f.size <= MAX_HASHED_FILE_BYTES) {
+      hashes.set(f, await sha256Hex(await f.arrayBuffer()));
+    }
+  }
+
+  if (!hashes.size) return files;
+
+  const res = await authFetch(`${API_BASE_URL}/garmin/upload/check`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({
+      files: Array.from(hashes, ([f, sha256]) => ({ filename: f.name, sha256 })),
+    }),
+  });
+
+  // The check only saves bandwidth; fall back to sending everything
+  if (!res.ok) return files;
+
+  const { unknown }: { unknown: UploadCheckFile[] } = await res.json();
+  const unknownHashes = new Set(unknown.map((u) => u.sha256));
+
+  return files.filter((f) => {
+    const sha256 = hashes.get(f);
+    return sha256 === undefined || unknownHashes.has(sha256);
+  });
+}
@@ -1,42 +1,118 @@
 import { useRef, useState } from "react";
 import { authFetch } from "../api/authFetch";
 import { API_BASE_URL } from "../api/config";
+import {
+  CHUNKED_UPLOAD_THRESHOLD,
+  uploadFileChunked,
+} from "../api/chunkedUpload";
+import { filterUnknownFiles } from "../api/uploadCheck";
 
 type UploadState =
   | { status: "idle" }
-  | { status: "uploading" }
+  | { status: "uploading"; stage?: string }
   | { status: "success"; daysIngested: number; daysPredicted: number }
   | { status: "error"; message: string };
 
+type UploadJob = {
+  job_id: string;
+  status: "queued" | "running" | "success" | "failed";
+  stage: string | null;
+  progress: number;
+  result: { days_ingested: number; days_predicted: number } | null;
+  error: string | null;
+};
+
+const JOB_POLL_INTERVAL_MS = 2000;
+
+function sleep(ms: number) {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
 export function GarminUpload() {
   const inputRef = useRef<HTMLInputElement | null>(null);
   const [state, setState] = useState<UploadState>({ status: "idle" });
 
-  async function uploadFiles(files: FileList) {
-    if (!files.length) return;
+  async function waitForJob(jobId: string): Promise<UploadJob> {
+    for (;;) {
+      const res = await authFetch(`${API_BASE_URL}/garmin/jobs/${jobId}`);
+      if (!res.ok) {
+        throw new Error("Failed to fetch upload status");
+      }
 
+      const job: UploadJob = await res.json();
+      if (job.status === "success" || job.status === "failed") {
+        return job;
+      }
+
+      setState({ status: "uploading", stage: job.stage ?? job.status });
+      await sleep(JOB_POLL_INTERVAL_MS);
+    }
+  }
+
+  async function postFiles(files: File[]) {
     const form = new FormData();
-    Array.from(files).forEach((f) => form.append("files", f));
+    files.forEach((f) => form.append("files", f));
+
+    const res = await authFetch(`${API_BASE_URL}/garmin/upload`, {
+      method: "POST",
+      body: form,
+    });
+
+    if (!res.ok) {
+      const text = await res.text();
+      throw new Error(text || "Upload failed");
+    }
+
+    return res.json();
+  }
 
-    setState({ status: "uploading" });
+  async function uploadFiles(files: FileList) {
+    if (!files.length) return;
+
+    setState({ status: "uploading", stage: "Checking files" });
 
     try {
-      const res = await authFetch(`${API_BASE_URL}/garmin/upload`, {
-        method: "POST",
-        body: form,
-      });
+      // Only send files the server has not processed before
+      const all = await filterUnknownFiles(Array.from(files));
+      if (!all.length) {
+        setState({ status: "success", daysIngested: 0, daysPredicted: 0 });
+        return;
+      }
 
-      if (!res.ok) {
-        const text = await res.text();
-        throw new Error(text || "Upload failed");
+      const large = all.filter((f) => f.size > CHUNKED_UPLOAD_THRESHOLD);
+      const small = all.filter((f) => f.size <= CHUNKED_UPLOAD_THRESHOLD);
+
+      const responses = [];
+
+      if (small.length) {
+        responses.push(await postFiles(small));
       }
 
-      const json = await res.json();
-      setState({
-        status: "success",
-        daysIngested: json.days_ingested,
-        daysPredicted: json.days_predicted,
-      });
+      // Large exports go up in resumable chunks
+      for (const f of large) {
+        setState({ status: "uploading", stage: `Uploading ${f.name}` });
+        responses.push(await uploadFileChunked(f));
+      }
+
+      let daysIngested = 0;
+      let daysPredicted = 0;
+
+      for (const json of responses) {
+        // 202: processing continues in the background
+        if (json.job_id) {
+          const job = await waitForJob(json.job_id);
+          if (job.status === "failed" || !job.result) {
+            throw new Error(job.error || "Processing failed");
+          }
+          daysIngested += job.result.days_ingested;
+          daysPredicted += job.result.days_predicted;
+        } else {
+          daysIngested += json.days_ingested;
+          daysPredicted += json.days_predicted;
+        }
+      }
+
+      setState({ status: "success", daysIngested, daysPredicted });
     } catch (err) {
       setState({
         status: "error",
@@ -95,6 +171,9 @@ export function GarminUpload() {
             <p className="mt-2 text-sm text-gray-600">
               Processing Garmin data…
             </p>
+            {state.stage && (
+              <p className="mt-1 text-xs text-gray-500">{state.stage}</p>
+            )}
           </>
         )}
 
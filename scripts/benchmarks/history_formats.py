@@ -0,0 +1,105 @@
+"""
+Compare the day-object and columnar formats of /history and /mood.
+
+    python -m scripts.benchmarks.history_formats [--years 1 5 10] [--repeat 20]
+
+Seeds a throwaway SQLite database with ten years of predictions and mood
+labels (with gaps), then requests each range in both formats through the
+app in-process, with the response cache off so every request queries
+and serializes. Reports median latency and body size per route, range
+and format. Needs the packages in requirements-dev.txt.
+"""
+
+import os
+import time
+import uuid
+import random
+import argparse
+import tempfile
+import statistics
+from datetime import date, timedelta
+from pathlib import Path
+
+YEARS = (1, 5, 10)
+
+
+def seed(user_id: str, days: int, seed: int = 0):
+    from backend.storage import use_repository
+
+    rng = random.Random(seed)
+    end = date.today()
+
+    with use_repository() as repo:
+        for i in range(days):
+            day = end - timedelta(days=i)
+            if rng.random() < 0.9:
+                repo.insert_prediction({
+                    "user_id": user_id,
+                    "date": day,
+                    "predicted_mood": round(rng.uniform(1, 5), 2),
+                    "confidence": rng.choice(["low", "medium", "high"]),
+                    "explanation": ["Sleep relative to baseline (+0.3)"],
+                    "model_version": "rules_v1",
+                })
+            if rng.random() < 0.6:
+                repo.upsert_mood(user_id, day, rng.randint(1, 5), None)
+
+
+def time_requests(client, path: str, repeat: int) -> tuple[float, int]:
+    client.get(path).raise_for_status()
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        resp = client.get(path)
+        latencies.append(time.perf_counter() - started)
+        resp.raise_for_status()
+    return statistics.median(latencies), len(resp.content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, nargs="+", default=YEARS)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Read at import time, so set before the app loads
+        os.environ["STORAGE_BACKEND"] = "sqlite"
+        os.environ["STORAGE_SQLITE_PATH"] = str(Path(tmp) / "bench.sqlite3")
+        os.environ["RESPONSE_CACHE_TTL_SECONDS"] = "0"
+
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        from backend.api.routes import history, mood
+        from backend.auth.supabase import get_current_user
+
+        user_id = str(uuid.uuid4())
+        seed(user_id, max(args.years) * 366)
+
+        app = FastAPI()
+        app.include_router(history.router)
+        app.include_router(mood.router)
+        app.dependency_overrides[get_current_user] = lambda: {"sub": user_id}
+        client = TestClient(app)
+
+        end = date.today()
+        print(f"{'route':<8} {'years':>5} {'format':<8} {'median ms':>10} {'KiB':>8}")
+        for years in args.years:
+            start = end - timedelta(days=365 * years - 1)
+            for route in ("history", "mood"):
+                results = {}
+                for fmt in ("days", "columns"):
+                    path = f"/{route}?start={start}&end={end}&format={fmt}"
+                    results[fmt] = time_requests(client, path, args.repeat)
+                    seconds, size = results[fmt]
+                    print(
+                        f"{route:<8} {years:>5} {fmt:<8} "
+                        f"{seconds * 1000:>10.2f} {size / 1024:>8.1f}"
+                    )
+                speedup = results["days"][0] / results["columns"][0]
+                print(f"{'':<8} {'':>5} {'speedup':<8} {speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
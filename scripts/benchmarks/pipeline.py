@@ -0,0 +1,172 @@
+"""
+Time the Garmin upload pipeline end to end on a storage backend.
+
+    python -m scripts.benchmarks.pipeline [--backend sqlite|postgres] [--days 365] [--runs 2]
+
+Synthetic sleep, health status and UDS exports for --days days are written
+to a temp directory and pushed through process_garmin_upload: ingest,
+features and inference, per-stage timings and days/s. The first run
+inserts everything; later runs re-upload the same files, so they measure
+the fingerprint skip path. The sqlite backend uses a throwaway database
+file and needs nothing else; postgres needs DATABASE_URL.
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import date, datetime, timedelta
+
+
+def synthetic_days(days: int) -> list[date]:
+    end = date.today() - timedelta(days=1)
+    return [end - timedelta(days=i) for i in reversed(range(days))]
+
+
+def write_exports(workdir: Path, days: list[date], seed: int = 0) -> list[Path]:
+    rng = random.Random(seed)
+    sleep, health, uds = [], [], []
+
+    for day in days:
+        bedtime = datetime.combine(day - timedelta(days=1), datetime.min.time()) + timedelta(
+            hours=22, minutes=rng.randint(0, 120)
+        )
+        deep, light, rem, awake = (
+            rng.randint(3000, 7000),
+            rng.randint(10000, 16000),
+            rng.randint(4000, 8000),
+            rng.randint(300, 2400),
+        )
+        sleep.append({
+            "calendarDate": day.isoformat(),
+            "sleepStartTimestampGMT": bedtime.isoformat(),
+            "sleepEndTimestampGMT": (
+                bedtime + timedelta(seconds=deep + light + rem + awake)
+            ).isoformat(),
+            "deepSleepSeconds": deep,
+            "lightSleepSeconds": light,
+            "remSleepSeconds": rem,
+            "awakeSleepSeconds": awake,
+            "sleepScores": {"overallScore": rng.randint(50, 95)},
+        })
+
+        health.append({
+            "calendarDate": day.isoformat(),
+            "metrics": [
+                {"type": "HR", "value": rng.randint(48, 68)},
+                {"type": "HRV", "value": rng.randint(30, 90)},
+                {"type": "RESPIRATION", "value": round(rng.uniform(12, 17), 1)},
+            ],
+        })
+
+        uds.append({
+            "calendarDate": day.isoformat(),
+            "totalSteps": rng.randint(2000, 18000),
+            "totalKilocalories": rng.randint(1800, 3200),
+            "totalDistanceMeters": rng.randint(1500, 14000),
+            "moderateIntensityMinutes": rng.randint(0, 60),
+            "vigorousIntensityMinutes": rng.randint(0, 30),
+            "allDayStress": {
+                "aggregatorList": [
+                    {
+                        "type": t,
+                        "averageStressLevel": rng.randint(15, 60),
+                        "maxStressLevel": rng.randint(60, 99),
+                        "stressDuration": rng.randint(3600, 30000),
+                        "restDuration": rng.randint(3600, 30000),
+                        "totalDuration": 86400,
+                    }
+                    for t in ("TOTAL", "AWAKE", "ASLEEP")
+                ]
+            },
+            "bodyBattery": {
+                "bodyBatteryStatList": [
+                    {
+                        "bodyBatteryStatType": t,
+                        "statsValue": rng.randint(5, 100),
+                        "statTimestamp": f"{day.isoformat()}T{h:02d}:00:00.0",
+                    }
+                    for t, h in (("HIGHEST", 7), ("LOWEST", 22), ("ENDOFDAY", 23))
+                ]
+            },
+        })
+
+    paths = []
+    for name, records in (
+        ("bench_sleepData.json", sleep),
+        ("bench_healthStatusData.json", health),
+        ("UDSFile_bench.json", uds),
+    ):
+        path = workdir / name
+        path.write_text(json.dumps(records))
+        paths.append(path)
+    return paths
+
+
+def run_once(user_id: str, files: list[Path]) -> dict:
+    from backend.garmin.orchestrator import process_garmin_upload
+
+    timings: dict[str, float] = {}
+    current = {"stage": None, "started": time.perf_counter()}
+
+    def on_stage(stage: str):
+        now = time.perf_counter()
+        if current["stage"] is not None:
+            timings[current["stage"]] = now - current["started"]
+        current["stage"] = stage
+        current["started"] = now
+
+    started = time.perf_counter()
+    result = process_garmin_upload(user_id=user_id, files=files, on_stage=on_stage)
+    elapsed = time.perf_counter() - started
+    timings[current["stage"]] = time.perf_counter() - current["started"]
+
+    return {"seconds": elapsed, "timings": timings, "result": result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backend", choices=("sqlite", "postgres"), default="sqlite")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--user-id", default=str(uuid.uuid4()))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        # The backend is read at import time, so set it before the pipeline loads
+        os.environ["STORAGE_BACKEND"] = args.backend
+        os.environ.setdefault("STORAGE_SQLITE_PATH", str(tmp / "bench.sqlite3"))
+
+        if args.backend == "postgres":
+            from backend.db.connection import get_db_connection
+
+            with get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "INSERT INTO users (id) VALUES (%s) ON CONFLICT DO NOTHING;",
+                        (args.user_id,),
+                    )
+                conn.commit()
+
+        files = write_exports(tmp, synthetic_days(args.days))
+
+        for run in range(1, args.runs + 1):
+            stats = run_once(args.user_id, files)
+            stages = "  ".join(
+                f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in stats["timings"].items()
+            )
+            print(
+                f"run {run}: {stats['seconds']:.2f}s  "
+                f"{args.days / stats['seconds']:.0f} days/s  {stages}  "
+                f"{stats['result']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Compare the sync and async read endpoints under concurrent load.
+
+    python -m scripts.benchmarks.read_endpoints USER_ID [--concurrency 200] [--requests 2000]
+
+Each mode gets its own app holding only its read routes, driven in-process
+through httpx's ASGI transport with authentication stubbed out, so the
+numbers reflect how requests wait on Postgres: sync handlers queue for
+Starlette's threadpool, async handlers for the asyncpg pool. The response
+cache is turned off, so every request queries. Needs DATABASE_URL, the
+packages in requirements-dev.txt and a user with some predictions and
+mood labels.
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import statistics
+from datetime import date, timedelta
+
+import httpx
+from fastapi import FastAPI
+
+# Read at import time, so set before the app loads
+os.environ["RESPONSE_CACHE_TTL_SECONDS"] = "0"
+
+from backend.api.routes import today, history, mood, async_reads
+from backend.auth.supabase import get_current_user, get_current_user_async
+from backend.db.async_pool import close_async_pool
+from backend.db.pool import close_pool
+
+
+def build_app(mode: str, user_id: str) -> FastAPI:
+    app = FastAPI()
+    if mode == "async":
+        app.include_router(async_reads.router)
+    else:
+        app.include_router(today.router)
+        app.include_router(history.router)
+        app.include_router(mood.router)
+
+    app.dependency_overrides[get_current_user] = lambda: {"sub": user_id}
+    app.dependency_overrides[get_current_user_async] = lambda: {"sub": user_id}
+    return app
+
+
+def request_paths(days: int) -> list[str]:
+    end = date.today()
+    start = end - timedelta(days=days - 1)
+    return [
+        "/today",
+        f"/history?start={start}&end={end}",
+        f"/mood?start={start}&end={end}",
+    ]
+
+
+async def run_mode(mode: str, user_id: str, concurrency: int, total: int, days: int) -> dict:
+    app = build_app(mode, user_id)
+    paths = request_paths(days)
+    latencies: list[float] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+
+    for i in range(total):
+        queue.put_nowait(paths[i % len(paths)])
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up pools and caches before timing
+        for path in paths:
+            (await client.get(path)).raise_for_status()
+
+        async def worker():
+            nonlocal errors
+            while True:
+                try:
+                    path = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                resp = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                if resp.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("user_id")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=90, help="history/mood range length")
+    args = parser.parse_args()
+
+    try:
+        for mode in ("sync", "async"):
+            result = await run_mode(mode, args.user_id, args.concurrency, args.requests, args.days)
+            print(
+                f"{result['mode']:>5}: {result['rps']:>8} req/s  "
+                f"p50 {result['p50_ms']}ms  p95 {result['p95_ms']}ms  "
+                f"p99 {result['p99_ms']}ms  errors {result['errors']}"
+            )
+    finally:
+        close_pool()
+        await close_async_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
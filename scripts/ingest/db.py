@@ -1,5 +1,3 @@
-import os
-import psycopg2
 from contextlib import contextmanager
 from dotenv import load_dotenv
 from pathlib import Path
@@ -9,11 +7,10 @@ repo_root = Path(__file__).resolve().parents[2]
 env_path = repo_root / "backend" / ".env"
 load_dotenv(env_path)
 
+from backend.db.pool import get_pool
+
 
 @contextmanager
 def get_conn():
-    conn = psycopg2.connect(os.environ["DATABASE_URL"])
-    try:
+    with get_pool().connection() as conn:
         yield conn
-    finally:
-        conn.close()
\ No newline at end of file
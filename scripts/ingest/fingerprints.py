@@ -0,0 +1,93 @@
+import json
+import hashlib
+from collections import defaultdict
+from datetime import date
+
+
+# ─────────────────────────────────────────────
+# Fingerprints
+# ─────────────────────────────────────────────
+
+def record_fingerprint(raw: dict) -> str:
+    """
+    Stable content hash of one raw Garmin record (key order independent).
+    """
+    payload = json.dumps(raw, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def day_fingerprint(record_fingerprints) -> str:
+    """
+    Combine the fingerprints of all records for one day, ignoring the order
+    in which files happened to list them.
+    """
+    return hashlib.sha256("".join(sorted(record_fingerprints)).encode("ascii")).hexdigest()
+
+
+def filter_changed_records(
+    repo,
+    user_id: str,
+    source: str,
+    records: list[dict],
+) -> tuple[list[dict], dict[str, str]]:
+    """
+    Drop records whose calendar day is unchanged since it was last fully
+    processed (its fingerprint recorded; see PendingFingerprints).
+
+    Records are grouped per calendarDate and fingerprinted as a group, so a
+    day with several records is either kept whole or skipped whole.
+    Returns the records to ingest and the new fingerprints keyed by date.
+    """
+    by_date: dict[str, list[dict]] = defaultdict(list)
+    for r in records:
+        day = r.get("calendarDate")
+        if day:
+            by_date[day].append(r)
+
+    if not by_date:
+        return [], {}
+
+    stored = repo.fetch_fingerprints(user_id, source, list(by_date))
+
+    changed: list[dict] = []
+    fingerprints: dict[str, str] = {}
+
+    for day, day_records in by_date.items():
+        # Overlapping files in one upload repeat the same record verbatim
+        unique = {record_fingerprint(r): r for r in day_records}
+        fp = day_fingerprint(unique)
+        if stored.get(day) == fp:
+            continue
+
+        changed.extend(unique.values())
+        fingerprints[day] = fp
+
+    return changed, fingerprints
+
+
+def changed_dates(fingerprints: dict[str, str]) -> set[date]:
+    return {date.fromisoformat(day) for day in fingerprints}
+
+
+class PendingFingerprints:
+    """
+    Day fingerprints from one pipeline run's ingest, held back until the
+    days' features are computed.
+
+    A stored fingerprint means "this day was fully processed": ingest skips
+    days whose fingerprint is unchanged, so recording it before features
+    succeed would let a failed run's days be skipped for good. Ingest that
+    runs without a collector (e.g. the standalone scripts) records nothing,
+    and the next pipeline run processes those days again.
+    """
+
+    def __init__(self):
+        self._by_source: dict[str, dict[str, str]] = {}
+
+    def add(self, source: str, fingerprints: dict[str, str]):
+        self._by_source.setdefault(source, {}).update(fingerprints)
+
+    def record(self, repo, user_id: str):
+        for source, fingerprints in self._by_source.items():
+            repo.upsert_fingerprints(user_id, source, fingerprints)
+        self._by_source = {}
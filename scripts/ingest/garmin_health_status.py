@@ -1,33 +1,8 @@
 import json
 import gzip
 from pathlib import Path
-from scripts.ingest.db import get_conn
-
-
-HEALTH_STATUS_UPSERT_SQL = """
-INSERT INTO daily_physiology (
-  user_id,
-  date,
-  resting_hr,
-  respiration_rate,
-  hrv_rmssd,
-  source
-)
-VALUES (
-  %(user_id)s,
-  %(date)s,
-  %(resting_hr)s,
-  %(respiration_rate)s,
-  %(hrv_rmssd)s,
-  %(source)s
-)
-ON CONFLICT (user_id, date)
-DO UPDATE SET
-  resting_hr = COALESCE(EXCLUDED.resting_hr, daily_physiology.resting_hr),
-  respiration_rate = COALESCE(EXCLUDED.respiration_rate, daily_physiology.respiration_rate),
-  hrv_rmssd = COALESCE(EXCLUDED.hrv_rmssd, daily_physiology.hrv_rmssd),
-  source = EXCLUDED.source;
-"""
+from backend.storage import use_repository
+from scripts.ingest.fingerprints import changed_dates, filter_changed_records
 
 
 # ─────────────────────────────────────────────
@@ -119,7 +94,15 @@ def normalize_health_status_record(raw: dict, user_id: str):
 # Ingest
 # ─────────────────────────────────────────────
 
-def ingest_health_status(files: list[Path], user_id: str):
+def ingest_health_status(files: list[Path], user_id: str, repo=None, pending=None) -> set:
+    """
+    Upsert daily_physiology rows for days whose raw records changed.
+    Returns the set of changed dates.
+
+    Runs on repo when given (the caller commits), else on its own.
+    Day fingerprints go to pending, if given, for the caller to record
+    once features are computed (see PendingFingerprints).
+    """
     records = []
 
     for path in files:
@@ -127,22 +110,27 @@ def ingest_health_status(files: list[Path], user_id: str):
         print(f"Loaded {len(file_records)} records from {path.name}")
         records.extend(file_records)
 
-    rows = []
-    for r in records:
-        row = normalize_health_status_record(r, user_id)
-        if row:
-            rows.append(row)
+    with use_repository(repo) as repo:
+        records, fingerprints = filter_changed_records(
+            repo, user_id, "health_status", records
+        )
 
-    if not rows:
-        print("No daily_physiology rows to ingest")
-        return
+        rows = []
+        for r in records:
+            row = normalize_health_status_record(r, user_id)
+            if row:
+                rows.append(row)
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.executemany(HEALTH_STATUS_UPSERT_SQL, rows)
-        conn.commit()
+        repo.upsert_physiology(rows)
+        if pending is not None:
+            pending.add("health_status", fingerprints)
+
+    if not rows:
+        print("No new or changed daily_physiology rows to ingest")
+    else:
+        print(f"Upserted {len(rows)} daily_physiology rows")
 
-    print(f"Upserted {len(rows)} daily_physiology rows")
+    return changed_dates(fingerprints)
 
 
 def main():
@@ -0,0 +1,132 @@
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from backend.storage import use_repository
+from scripts.ingest.fingerprints import filter_changed_records
+from scripts.ingest.garmin_health_status import load_garmin_json
+
+
+# metric → (Garmin array field, index of the value within each sample).
+# Samples look like [timestamp_ms, value] or, for body battery,
+# [timestamp_ms, status, level, version].
+INTRADAY_FIELDS = {
+    "stress": ("stressValuesArray", 1),
+    "heart_rate": ("heartRateValues", 1),
+    "body_battery": ("bodyBatteryValuesArray", 2),
+}
+
+PAYLOAD_FORMAT = b"\x01"
+
+
+# ─────────────────────────────────────────────
+# Codec
+# ─────────────────────────────────────────────
+
+def encode_series(timestamps: np.ndarray, values: np.ndarray) -> bytes:
+    """
+    Delta-encode sorted epoch-second timestamps (int32) and integer values
+    (int16), then zlib the result. Regular sampling makes both delta
+    streams highly repetitive, so they compress very well.
+    """
+    ts_deltas = np.diff(timestamps, prepend=timestamps[0]).astype("<i4")
+    value_deltas = np.diff(values, prepend=0).astype("<i2")
+    return PAYLOAD_FORMAT + zlib.compress(ts_deltas.tobytes() + value_deltas.tobytes())
+
+
+def decode_series(start: int, sample_count: int, payload: bytes) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Inverse of encode_series. Returns (epoch seconds int64, values int32).
+    """
+    if payload[:1] != PAYLOAD_FORMAT:
+        raise ValueError(f"Unknown intraday payload format {payload[:1]!r}")
+
+    raw = zlib.decompress(payload[1:])
+    split = 4 * sample_count
+
+    ts_deltas = np.frombuffer(raw[:split], dtype="<i4")
+    value_deltas = np.frombuffer(raw[split:], dtype="<i2")
+
+    timestamps = start + np.cumsum(ts_deltas, dtype=np.int64)
+    values = np.cumsum(value_deltas, dtype=np.int32)
+    return timestamps, values
+
+
+# ─────────────────────────────────────────────
+# Parsing
+# ─────────────────────────────────────────────
+
+def parse_intraday(records: list[dict], user_id: str) -> list[dict]:
+    """
+    Extract intraday samples from raw Garmin day records into encoded
+    intraday_series rows. Samples for the same metric and day are merged
+    (a repeated timestamp keeps its last value); missing and negative
+    values (Garmin's "no reading" markers) are dropped.
+    """
+    samples: dict[tuple[str, str], dict[int, int]] = {}
+
+    for r in records:
+        day = r.get("calendarDate")
+        if not day:
+            continue
+
+        for metric, (field, value_index) in INTRADAY_FIELDS.items():
+            for sample in r.get(field) or []:
+                if not isinstance(sample, list) or len(sample) <= value_index:
+                    continue
+
+                ts_ms, value = sample[0], sample[value_index]
+                if ts_ms is None or not isinstance(value, (int, float)) or value < 0:
+                    continue
+
+                samples.setdefault((metric, day), {})[int(ts_ms) // 1000] = int(value)
+
+    rows = []
+    for (metric, day), by_ts in samples.items():
+        timestamps = np.fromiter(sorted(by_ts), dtype=np.int64)
+        values = np.fromiter((by_ts[t] for t in timestamps), dtype=np.int32)
+
+        rows.append({
+            "user_id": user_id,
+            "metric": metric,
+            "date": day,
+            "start_ts": datetime.fromtimestamp(int(timestamps[0]), tz=timezone.utc),
+            "sample_count": len(timestamps),
+            "payload": encode_series(timestamps, values),
+        })
+
+    return rows
+
+
+# ─────────────────────────────────────────────
+# Ingest
+# ─────────────────────────────────────────────
+
+def ingest_intraday(files: list[Path], user_id: str, repo=None, pending=None):
+    """
+    Ingest dedicated intraday files (stress / heart rate / body battery
+    details). Intraday arrays inside UDS files are handled by ingest_uds.
+
+    Runs on repo when given (the caller commits), else on its own.
+    Day fingerprints go to pending, if given, for the caller to record
+    once features are computed (see PendingFingerprints).
+    """
+    records = []
+
+    for path in files:
+        file_records = load_garmin_json(path)
+        print(f"Loaded {len(file_records)} records from {path.name}")
+        records.extend(file_records)
+
+    with use_repository(repo) as repo:
+        records, fingerprints = filter_changed_records(
+            repo, user_id, "intraday", records
+        )
+        rows = parse_intraday(records, user_id)
+        repo.upsert_intraday(rows)
+        if pending is not None:
+            pending.add("intraday", fingerprints)
+
+    print(f"Upserted {len(rows)} intraday_series rows")
@@ -6,47 +6,8 @@ from pathlib import Path
 
 load_dotenv()
 
-from scripts.ingest.db import get_conn
-
-SLEEP_UPSERT_SQL = """
-INSERT INTO sleep_summary (
-  user_id,
-  date,
-  total_sleep_minutes,
-  deep_sleep_minutes,
-  light_sleep_minutes,
-  rem_sleep_minutes,
-  awake_minutes,
-  sleep_score,
-  bedtime,
-  wake_time,
-  source
-)
-VALUES (
-  %(user_id)s,
-  %(date)s,
-  %(total_sleep_minutes)s,
-  %(deep_sleep_minutes)s,
-  %(light_sleep_minutes)s,
-  %(rem_sleep_minutes)s,
-  %(awake_minutes)s,
-  %(sleep_score)s,
-  %(bedtime)s,
-  %(wake_time)s,
-  %(source)s
-)
-ON CONFLICT (user_id, date)
-DO UPDATE SET
-  total_sleep_minutes = EXCLUDED.total_sleep_minutes,
-  deep_sleep_minutes = EXCLUDED.deep_sleep_minutes,
-  light_sleep_minutes = EXCLUDED.light_sleep_minutes,
-  rem_sleep_minutes = EXCLUDED.rem_sleep_minutes,
-  awake_minutes = EXCLUDED.awake_minutes,
-  sleep_score = EXCLUDED.sleep_score,
-  bedtime = EXCLUDED.bedtime,
-  wake_time = EXCLUDED.wake_time,
-  source = EXCLUDED.source;
-"""
+from backend.storage import use_repository
+from scripts.ingest.fingerprints import changed_dates, filter_changed_records
 
 USER_ID = "b1101f5b-a68d-4cb9-bf48-bfc4697a761a"
 
@@ -153,7 +114,15 @@ def load_sleep_file(path: Path) -> list[dict]:
 # Ingest
 # ---------------------------
 
-def ingest_sleep(files: list[Path], user_id: str):
+def ingest_sleep(files: list[Path], user_id: str, repo=None, pending=None) -> set:
+    """
+    Upsert sleep_summary rows for days whose raw records changed.
+    Returns the set of changed dates.
+
+    Runs on repo when given (the caller commits), else on its own.
+    Day fingerprints go to pending, if given, for the caller to record
+    once features are computed (see PendingFingerprints).
+    """
     records: list[dict] = []
 
     for path in files:
@@ -161,25 +130,30 @@ def ingest_sleep(files: list[Path], user_id: str):
         print(f"Loaded {len(file_records)} records from {path.name}")
         records.extend(file_records)
 
-    rows = []
-    for r in records:
-        if "sleepStartTimestampGMT" not in r:
-            continue
+    with use_repository(repo) as repo:
+        records, fingerprints = filter_changed_records(
+            repo, user_id, "sleep", records
+        )
 
-        row = normalize_sleep_record(raw=r, user_id=user_id)
-        if row:
-            rows.append(row)
+        rows = []
+        for r in records:
+            if "sleepStartTimestampGMT" not in r:
+                continue
 
-    if not rows:
-        print("No valid sleep rows to ingest")
-        return
+            row = normalize_sleep_record(raw=r, user_id=user_id)
+            if row:
+                rows.append(row)
+
+        repo.upsert_sleep(rows)
+        if pending is not None:
+            pending.add("sleep", fingerprints)
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.executemany(SLEEP_UPSERT_SQL, rows)
-        conn.commit()
+    if not rows:
+        print("No new or changed sleep rows to ingest")
+    else:
+        print(f"Upserted {len(rows)} sleep rows")
 
-    print(f"Upserted {len(rows)} sleep rows")
+    return changed_dates(fingerprints)
 
 
 # ---------------------------
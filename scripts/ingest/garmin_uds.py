@@ -1,84 +1,10 @@
 import json
 import gzip
 from pathlib import Path
-from scripts.ingest.db import get_conn
 
-
-# ─────────────────────────────────────────────
-# SQL
-# ─────────────────────────────────────────────
-
-ACTIVITY_UPSERT_SQL = """
-INSERT INTO daily_activity (
-  user_id,
-  date,
-  steps,
-  active_minutes,
-  calories_burned,
-  distance_meters,
-  source
-)
-VALUES (
-  %(user_id)s,
-  %(date)s,
-  %(steps)s,
-  %(active_minutes)s,
-  %(calories_burned)s,
-  %(distance_meters)s,
-  %(source)s
-)
-ON CONFLICT (user_id, date)
-DO UPDATE SET
-  steps = COALESCE(EXCLUDED.steps, daily_activity.steps),
-  active_minutes = COALESCE(EXCLUDED.active_minutes, daily_activity.active_minutes),
-  calories_burned = COALESCE(EXCLUDED.calories_burned, daily_activity.calories_burned),
-  distance_meters = COALESCE(EXCLUDED.distance_meters, daily_activity.distance_meters),
-  source = EXCLUDED.source;
-"""
-
-STRESS_INSERT_SQL = """
-INSERT INTO daily_stress (
-  user_id,
-  date,
-  stress_type,
-  avg_stress,
-  max_stress,
-  stress_duration,
-  rest_duration,
-  activity_duration,
-  total_duration
-)
-VALUES (
-  %(user_id)s,
-  %(date)s,
-  %(stress_type)s,
-  %(avg_stress)s,
-  %(max_stress)s,
-  %(stress_duration)s,
-  %(rest_duration)s,
-  %(activity_duration)s,
-  %(total_duration)s
-)
-ON CONFLICT DO NOTHING;
-"""
-
-BODY_BATTERY_INSERT_SQL = """
-INSERT INTO daily_body_battery (
-  user_id,
-  date,
-  stat_type,
-  value,
-  timestamp
-)
-VALUES (
-  %(user_id)s,
-  %(date)s,
-  %(stat_type)s,
-  %(value)s,
-  %(timestamp)s
-)
-ON CONFLICT DO NOTHING;
-"""
+from backend.storage import use_repository
+from scripts.ingest.fingerprints import changed_dates, filter_changed_records
+from scripts.ingest.garmin_intraday import parse_intraday
 
 
 # ─────────────────────────────────────────────
@@ -149,79 +75,136 @@ def normalize_activity(raw, user_id: str):
 
 
 
+# Garmin aggregator fields → daily_stress_summary columns
+STRESS_FIELDS = {
+    "avg_stress": "averageStressLevel",
+    "max_stress": "maxStressLevel",
+    "stress_duration": "stressDuration",
+    "rest_duration": "restDuration",
+    "activity_duration": "activityDuration",
+    "total_duration": "totalDuration",
+}
+
+
 def normalize_stress(raw, user_id: str):
+    """
+    Collapse a day's stress aggregators into one daily_stress_summary row.
+    A repeated aggregator type keeps its last occurrence.
+    """
     stress = raw.get("allDayStress")
     if not stress:
-        return []
+        return None
 
-    rows = []
+    aggs = {}
     for agg in stress.get("aggregatorList", []):
-        rows.append({
-            "user_id": user_id,
-            "date": raw.get("calendarDate"),
-            "stress_type": agg.get("type"),
-            "avg_stress": agg.get("averageStressLevel"),
-            "max_stress": agg.get("maxStressLevel"),
-            "stress_duration": agg.get("stressDuration"),
-            "rest_duration": agg.get("restDuration"),
-            "activity_duration": agg.get("activityDuration"),
-            "total_duration": agg.get("totalDuration"),
-        })
-    return rows
+        if agg.get("type"):
+            aggs[agg["type"]] = agg
+
+    if not aggs:
+        return None
+
+    types = sorted(aggs)
+    total = aggs.get("TOTAL", {})
+
+    row = {
+        "user_id": user_id,
+        "date": raw.get("calendarDate"),
+        "agg_types": types,
+    }
+    for column, field in STRESS_FIELDS.items():
+        row[column] = total.get(field)
+        row[f"agg_{column}"] = [aggs[t].get(field) for t in types]
+
+    return row
+
 
 def normalize_body_battery(raw, user_id: str):
+    """
+    Collapse a day's body battery stats into one row of parallel arrays.
+    A repeated stat type keeps its last occurrence.
+    """
     bb = raw.get("bodyBattery")
     if not bb:
-        return []
+        return None
 
-    rows = []
+    stats = {}
     for stat in bb.get("bodyBatteryStatList", []):
-        rows.append({
-            "user_id": user_id,
-            "date": raw.get("calendarDate"),
-            "stat_type": stat.get("bodyBatteryStatType"),
-            "value": stat.get("statsValue"),
-            "timestamp": stat.get("statTimestamp"),
-        })
-    return rows
+        if stat.get("bodyBatteryStatType"):
+            stats[stat["bodyBatteryStatType"]] = stat
+
+    if not stats:
+        return None
 
+    types = sorted(stats)
+
+    return {
+        "user_id": user_id,
+        "date": raw.get("calendarDate"),
+        "stat_types": types,
+        "stat_values": [stats[t].get("statsValue") for t in types],
+        "stat_timestamps": [stats[t].get("statTimestamp") for t in types],
+    }
 
 
 # ─────────────────────────────────────────────
 # Ingest
 # ─────────────────────────────────────────────
 
-def ingest_uds(files: list[Path], user_id: str):
-    activity_rows = []
-    stress_rows = []
-    body_battery_rows = []
+def ingest_uds(files: list[Path], user_id: str, repo=None, pending=None) -> set:
+    """
+    Upsert activity, stress, body battery and intraday rows for days whose
+    raw UDS records changed. Returns the set of changed dates.
+
+    Runs on repo when given (the caller commits), else on its own.
+    Day fingerprints go to pending, if given, for the caller to record
+    once features are computed (see PendingFingerprints).
+    """
+    records = []
 
     for path in files:
-        records = load_garmin_json(path)
-        print(f"Loaded {len(records)} records from {path.name}")
+        file_records = load_garmin_json(path)
+        print(f"Loaded {len(file_records)} records from {path.name}")
+        records.extend(file_records)
+
+    activity_rows = []
+    # Keyed by date: one compact row per day, last record wins
+    stress_rows = {}
+    body_battery_rows = {}
+
+    with use_repository(repo) as repo:
+        records, fingerprints = filter_changed_records(
+            repo, user_id, "uds", records
+        )
 
         for r in records:
             activity = normalize_activity(r, user_id)
             if activity:
                 activity_rows.append(activity)
 
-            stress_rows.extend(normalize_stress(r, user_id))
-            body_battery_rows.extend(normalize_body_battery(r, user_id))
+            stress = normalize_stress(r, user_id)
+            if stress:
+                stress_rows[stress["date"]] = stress
 
+            body_battery = normalize_body_battery(r, user_id)
+            if body_battery:
+                body_battery_rows[body_battery["date"]] = body_battery
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            if activity_rows:
-                cur.executemany(ACTIVITY_UPSERT_SQL, activity_rows)
-            if stress_rows:
-                cur.executemany(STRESS_INSERT_SQL, stress_rows)
-            if body_battery_rows:
-                cur.executemany(BODY_BATTERY_INSERT_SQL, body_battery_rows)
-        conn.commit()
+        repo.upsert_activity(activity_rows)
+        repo.upsert_stress_summaries(list(stress_rows.values()))
+        repo.upsert_body_battery_summaries(list(body_battery_rows.values()))
+
+        intraday_rows = parse_intraday(records, user_id)
+        repo.upsert_intraday(intraday_rows)
+
+        if pending is not None:
+            pending.add("uds", fingerprints)
 
     print(f"Upserted {len(activity_rows)} daily_activity rows")
-    print(f"Inserted {len(stress_rows)} daily_stress rows")
-    print(f"Inserted {len(body_battery_rows)} daily_body_battery rows")
+    print(f"Upserted {len(stress_rows)} daily_stress_summary rows")
+    print(f"Upserted {len(body_battery_rows)} daily_body_battery_summary rows")
+    print(f"Upserted {len(intraday_rows)} intraday_series rows")
+
+    return changed_dates(fingerprints)
 
 
 def main():
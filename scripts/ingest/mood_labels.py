@@ -1,63 +1,245 @@
-import os
+import io
+import sys
 import csv
-import psycopg2
+import uuid
+from datetime import date
+from typing import Iterable, Iterator, Optional, TextIO
+
 from dotenv import load_dotenv
 
 load_dotenv("backend/.env")
 
+from scripts.ingest.db import get_conn
+
 CSV_PATH = "data/raw/mood_labels.csv"
 
+# Validated rows are buffered into chunks of roughly this many characters
+# before being handed to COPY
+COPY_CHUNK_CHARS = 64 * 1024
 
-def get_conn():
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
-        raise RuntimeError("DATABASE_URL not set")
-    return psycopg2.connect(db_url)
+# Rejected rows are all counted, but only this many are reported back
+MAX_REPORTED_REJECTS = 1000
 
 
-def ingest_labels(csv_path):
-    conn = get_conn()
+STAGING_TABLE_SQL = """
+CREATE TEMP TABLE mood_labels_staging (
+    line_no bigint NOT NULL,
+    user_id uuid NOT NULL,
+    date date NOT NULL,
+    mood smallint NOT NULL,
+    note text
+) ON COMMIT DROP;
+"""
+
+COPY_SQL = """
+COPY mood_labels_staging (line_no, user_id, date, mood, note)
+FROM STDIN WITH (FORMAT csv);
+"""
+
+# Later lines win when a file repeats (user_id, date). created_at uses
+# clock_timestamp() as in backend.storage.postgres, for the version token.
+MERGE_SQL = """
+INSERT INTO mood_labels (
+    user_id,
+    date,
+    mood,
+    note,
+    created_at
+)
+SELECT DISTINCT ON (user_id, date)
+    user_id,
+    date,
+    mood,
+    note,
+    clock_timestamp()
+FROM mood_labels_staging
+ORDER BY user_id, date, line_no DESC
+ON CONFLICT (user_id, date)
+DO UPDATE SET
+    mood = EXCLUDED.mood,
+    note = EXCLUDED.note,
+    created_at = clock_timestamp();
+"""
+
 
-    with open(csv_path, newline="") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+# ─────────────────────────────────────────────
+# Validation
+# ─────────────────────────────────────────────
 
-    if not rows:
-        print("No rows found in CSV.")
-        return
+def validate_row(row: dict, user_id: Optional[str] = None) -> tuple:
+    """
+    Validate one CSV row. Returns (user_id, date, mood, note); raises
+    ValueError with a readable reason otherwise.
+
+    If user_id is given, every row is imported for that user and rows
+    naming a different user are rejected.
+    """
+    row_user = (row.get("user_id") or "").strip()
+    if user_id is not None:
+        if row_user and row_user != user_id:
+            raise ValueError("user_id does not match the authenticated user")
+        row_user = user_id
+
+    try:
+        row_user = str(uuid.UUID(row_user))
+    except ValueError:
+        raise ValueError(f"invalid user_id: {row_user!r}")
+
+    raw_date = (row.get("date") or "").strip()
+    try:
+        day = date.fromisoformat(raw_date)
+    except ValueError:
+        raise ValueError(f"invalid date: {raw_date!r}")
 
+    raw_mood = (row.get("mood") or "").strip()
     try:
-        with conn.cursor() as cur:
-            for row in rows:
-                cur.execute(
-                    """
-                    INSERT INTO mood_labels (
-                        user_id,
-                        date,
-                        mood,
-                        note
-                    )
-                    VALUES (%s, %s, %s, %s)
-                    ON CONFLICT (user_id, date)
-                    DO UPDATE SET
-                        mood = EXCLUDED.mood,
-                        note = EXCLUDED.note,
-                        created_at = now();
-                    """,
-                    (
-                        row["user_id"],
-                        row["date"],
-                        int(row["mood"]),
-                        row.get("note"),
-                    ),
-                )
-
-        conn.commit()
-        print(f"✔ Ingested {len(rows)} mood labels")
-
-    finally:
-        conn.close()
+        mood = int(raw_mood)
+    except ValueError:
+        raise ValueError(f"invalid mood: {raw_mood!r}")
+    if not 1 <= mood <= 5:
+        raise ValueError(f"mood out of range 1-5: {mood}")
+
+    note = (row.get("note") or "").strip() or None
+
+    return row_user, day, mood, note
+
+
+# ─────────────────────────────────────────────
+# Streaming COPY input
+# ─────────────────────────────────────────────
+
+class ChunkStream(io.TextIOBase):
+    """
+    Read-only file object over an iterator of text chunks, so COPY can
+    pull rows as they are validated instead of from a materialised list.
+
+    psycopg2 replaces any exception raised by read() during COPY with a
+    QueryCanceled, so an undecodable or malformed input file is kept in
+    error and the stream simply ends; the caller re-raises it once COPY
+    has returned.
+    """
+
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = iter(chunks)
+        self._buf = ""
+        self.error: Optional[Exception] = None
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        parts = [self._buf]
+        have = len(self._buf)
+
+        while size is None or size < 0 or have < size:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                break
+            except (UnicodeDecodeError, csv.Error) as e:
+                self.error = e
+                break
+            parts.append(chunk)
+            have += len(chunk)
+
+        data = "".join(parts)
+        if size is None or size < 0:
+            self._buf = ""
+            return data
+
+        self._buf = data[size:]
+        return data[:size]
+
+
+def copy_chunks(
+    reader: csv.DictReader,
+    user_id: Optional[str],
+    report: dict,
+) -> Iterator[str]:
+    """
+    Validate rows from reader and yield them as CSV text for COPY.
+    Accepted and rejected counts (and the first rejects) go into report.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+
+    for row in reader:
+        line_no = reader.line_num
+        try:
+            clean = validate_row(row, user_id)
+        except ValueError as e:
+            report["rejected"] += 1
+            if len(report["errors"]) < MAX_REPORTED_REJECTS:
+                report["errors"].append({"line": line_no, "error": str(e)})
+            continue
+
+        writer.writerow((line_no, *clean))
+        report["accepted"] += 1
+
+        if buf.tell() >= COPY_CHUNK_CHARS:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+    if buf.tell():
+        yield buf.getvalue()
+
+
+# ─────────────────────────────────────────────
+# Import
+# ─────────────────────────────────────────────
+
+def import_mood_labels(conn, f: TextIO, user_id: Optional[str] = None) -> dict:
+    """
+    Stream a mood label CSV (columns: [user_id,] date, mood[, note]) into
+    mood_labels: rows are validated as they are read, COPYed into a staging
+    table and merged with a single upsert. The caller commits.
+
+    Returns {"accepted", "imported", "rejected", "errors"}; "imported"
+    counts distinct (user_id, date) pairs written.
+    """
+    reader = csv.DictReader(f)
+    columns = set(reader.fieldnames or [])
+
+    missing = {"date", "mood"} - columns
+    if user_id is None and "user_id" not in columns:
+        missing.add("user_id")
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+
+    report = {"accepted": 0, "imported": 0, "rejected": 0, "errors": []}
+
+    with conn.cursor() as cur:
+        cur.execute(STAGING_TABLE_SQL)
+        stream = ChunkStream(copy_chunks(reader, user_id, report))
+        cur.copy_expert(COPY_SQL, stream)
+        if stream.error is not None:
+            raise stream.error
+
+        if report["accepted"]:
+            cur.execute(MERGE_SQL)
+            report["imported"] = cur.rowcount
+
+    return report
+
+
+def ingest_labels(csv_path):
+    # Through the repository so the imported days' rollups are refreshed
+    from backend.storage.postgres import PostgresRepository
+
+    with get_conn() as conn:
+        repo = PostgresRepository(conn)
+        with open(csv_path, newline="", encoding="utf-8-sig") as f:
+            report = repo.import_mood_labels(f)
+        repo.commit()
+
+    print(f"✔ Ingested {report['imported']} mood labels")
+
+    if report["rejected"]:
+        print(f"⚠️  Rejected {report['rejected']} rows:")
+        for reject in report["errors"]:
+            print(f"  line {reject['line']}: {reject['error']}")
 
 
 if __name__ == "__main__":
-    ingest_labels(CSV_PATH)
+    ingest_labels(sys.argv[1] if len(sys.argv) > 1 else CSV_PATH)